@@ -4,10 +4,8 @@ from config import DevelopmentConfig
 from database import db  # Importing the initialized database instance
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 import logging
-bcrypt = Bcrypt()  # Initialize Bcrypt globally
 
 def create_app():
     app = Flask(__name__)
@@ -53,8 +51,31 @@ def create_app():
     app.logger.info("Initializing extensions")
     db.init_app(app)
     Migrate(app, db)
-    bcrypt.init_app(app)
-    JWTManager(app)
+    # Query count and DB time per request (Server-Timing header + "app.sql" log)
+    from app.utils import sql_profiler
+    sql_profiler.init_app(app)
+
+    from app.utils.passwords import password_hasher
+    password_hasher.init_app(app)
+    jwt = JWTManager(app)
+
+    # Resolves flask_jwt_extended's `current_user` from a cached user snapshot
+    from app.utils import current_user as current_user_lookup
+    current_user_lookup.init_app(app, jwt)
+
+    from app.utils.notification_stream import notification_stream
+    notification_stream.init_app(app)
+    from app.utils.notifications import notification_dispatcher
+    notification_dispatcher.init_app(app)
+    from app.utils import notification_retention, notification_digests
+    notification_retention.init_app(app)
+    notification_digests.init_app(app)
+
+    from app.utils import catalogue
+    catalogue.init_app(app)
+
+    from app.utils.image_uploads import image_uploads
+    image_uploads.init_app(app)
 
     # Log JWT configuration for debugging
     app.logger.info(f"JWT_SECRET_KEY: {'set' if app.config['JWT_SECRET_KEY'] else 'not set'}")
@@ -87,6 +108,13 @@ def create_app():
     app.register_blueprint(public_bp, url_prefix="/public")
     app.logger.info("Blueprints registered successfully")
 
+    from app.utils.visit_stats import visit_stats_cli
+    app.cli.add_command(visit_stats_cli)
+    from app.utils.image_uploads import images_cli
+    app.cli.add_command(images_cli)
+    from app.utils.notifications import notifications_cli
+    app.cli.add_command(notifications_cli)
+
     # Create database tables
     # with app.app_context():
     #     app.logger.info("Creating database tables")
@@ -0,0 +1,19 @@
+# app/models/catalogue_version.py
+"""
+CatalogueVersion model: one counter per catalogue table (products, categories,
+images), bumped whenever a row in that table is written. Public endpoints derive
+their ETag / Last-Modified validators from these counters.
+"""
+from datetime import datetime
+from database import db
+
+
+class CatalogueVersion(db.Model):
+    __tablename__ = "catalogue_versions"
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CatalogueVersion {self.name} v{self.version}>"
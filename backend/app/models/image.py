@@ -13,7 +13,13 @@ class Image(BaseModel):
     url = db.Column(db.String(256), nullable=False)
     color = db.Column(db.String(32), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    # pending: spooled, waiting for the upload worker (url is empty); ready; failed
+    status = db.Column(db.String(16), nullable=False, default="ready", server_default="ready")
+    # SHA-256 of the uploaded file; identical uploads share stored files
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    # {"thumb": {"width", "height", "webp": url, "jpeg": url}, "medium": {...}, "large": {...}}
+    variants = db.Column(db.JSON, nullable=True)
 
     user = db.relationship('User', backref=db.backref('images', lazy=True))
     product = db.relationship('Product', backref=db.backref('images', lazy=True))
@@ -5,11 +5,19 @@ from app.models.base_model import BaseModel
 
 class Notification(BaseModel):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Backs ?unread_only=true and bulk mark-read on a user's inbox
+        db.Index("ix_notifications_user_id_is_read_created_at", "user_id", "is_read", "created_at"),
+        # Backs keyset pagination of the whole inbox (ORDER BY created_at DESC, id DESC)
+        db.Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        # Backs the retention job's age-based batch deletes
+        db.Index("ix_notifications_is_read_created_at", "is_read", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     message = db.Column(db.String(255), nullable=False)
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship("User", backref="notifications")
@@ -0,0 +1,21 @@
+# app/models/notification_outbox.py
+"""
+NotificationOutbox model: notifications committed with the data that caused
+them but not yet written to the notifications table. The async dispatcher
+(app/utils/notifications.py) moves rows from here to notifications and deletes
+them, so a notification survives a worker restart between the two steps.
+"""
+from datetime import datetime
+from database import db
+
+
+class NotificationOutbox(db.Model):
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<NotificationOutbox {self.id} for User {self.user_id}>"
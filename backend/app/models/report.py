@@ -3,6 +3,11 @@ from app.models.base_model import BaseModel
 
 class Report(BaseModel):
     __tablename__ = "reports"
+    __table_args__ = (
+        # Backs keyset pagination on GET /report/ (ORDER BY created_at DESC, id DESC)
+        db.Index("ix_reports_created_at_id", "created_at", "id"),
+        db.Index("ix_reports_user_id_created_at", "user_id", "created_at"),
+    )
 
     visit_id = db.Column(db.Integer, db.ForeignKey("visits.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)  # Track who created the report
@@ -0,0 +1,21 @@
+# app/models/token_blocklist.py
+"""
+TokenBlocklist model: refresh tokens that can no longer be used, keyed by JWT id.
+A refresh token is added when it is rotated (exchanged at /auth/refresh) or
+logged out. Rows are only needed until the token would have expired anyway.
+"""
+from datetime import datetime
+from database import db
+
+
+class TokenBlocklist(db.Model):
+    __tablename__ = "token_blocklist"
+
+    jti = db.Column(db.String(36), primary_key=True)
+    token_type = db.Column(db.String(10), nullable=False, default="refresh")
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TokenBlocklist {self.jti}>"
@@ -1,9 +1,7 @@
 # app/models/user.py
 from database import db
 from app.models.base_model import BaseModel
-from flask_bcrypt import Bcrypt
-
-bcrypt = Bcrypt()
+from app.utils.passwords import password_hasher
 
 class User(BaseModel):
     __tablename__ = "users"
@@ -20,12 +18,19 @@ class User(BaseModel):
     country = db.Column(db.String(50), nullable=True)
     postal_code = db.Column(db.String(20), nullable=True)
     about_me = db.Column(db.Text, nullable=True)
+    # Bumped to revoke every token issued so far (checked against the "ver" claim)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Visit notifications for admins: None/"realtime" (one row per visit), "hourly" or "daily"
+    notification_digest = db.Column(db.String(10), nullable=True)
+    # Visits created up to this time are covered by a sent digest (set while digests are on)
+    digest_sent_through = db.Column(db.DateTime, nullable=True)
 
+    # bcrypt runs on the bounded password pool; both raise PasswordHasherBusy when it is full
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
 
     def __repr__(self):
         return f"<User {self.username}>"
\ No newline at end of file
@@ -4,12 +4,21 @@ from datetime import datetime
 
 class Visit(BaseModel):
     __tablename__ = "visits"
+    __table_args__ = (
+        # Backs keyset pagination on GET /visit/ (ORDER BY visit_date DESC, id DESC)
+        db.Index("ix_visits_visit_date_id", "visit_date", "id"),
+        # Idempotency key for replayed offline visits (POST /visit/bulk)
+        db.UniqueConstraint("user_id", "client_ref", name="uq_visits_user_id_client_ref"),
+        # Backs the admin visit digests (visits created in a time window)
+        db.Index("ix_visits_created_at", "created_at"),
+    )
 
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)  # Renamed from marketer_id
     doctor_name = db.Column(db.String(100), nullable=False)
     location = db.Column(db.String(255), nullable=False)
     visit_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     notes = db.Column(db.Text, nullable=True)
+    client_ref = db.Column(db.String(64), nullable=True)  # Client-supplied idempotency key
 
     user = db.relationship("User", backref="visits")  # Renamed from marketer
 
@@ -0,0 +1,19 @@
+# app/models/visit_rollup.py
+"""
+VisitRollup model: pre-aggregated visit counts, maintained incrementally as
+visits are logged, updated and deleted (see app/utils/visit_stats.py).
+"""
+from database import db
+
+
+class VisitRollup(db.Model):
+    __tablename__ = "visit_rollups"
+
+    period = db.Column(db.String(5), primary_key=True)  # day, week, month
+    period_start = db.Column(db.Date, primary_key=True)
+    dimension = db.Column(db.String(10), primary_key=True)  # doctor, location, user ("total" is summed from user)
+    dimension_key = db.Column(db.String(255), primary_key=True)
+    visit_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VisitRollup {self.period} {self.period_start} {self.dimension}={self.dimension_key}: {self.visit_count}>"
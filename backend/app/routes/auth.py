@@ -1,16 +1,31 @@
 # app/routes/auth.py
 from datetime import timedelta
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import (
+    create_access_token, create_refresh_token, decode_token, jwt_required, get_jwt_identity, get_jwt, current_user
+)
+from jwt.exceptions import PyJWTError
+from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User
+from app.utils.current_user import token_claims, block_token, purge_expired_tokens
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.decorators import current_role
 from app.models.usergroups import UserGroup
 from app.models.notification import Notification
 from database import db
-from flask_bcrypt import Bcrypt
 
 auth_bp = Blueprint("auth", __name__)
-bcrypt = Bcrypt()
+
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+
+
+def _issue_tokens(user_id, claims):
+    """A new access/refresh token pair for `user_id` carrying `claims`."""
+    return {
+        "token": create_access_token(identity=str(user_id), additional_claims=claims, expires_delta=ACCESS_TOKEN_LIFETIME),
+        "refresh_token": create_refresh_token(identity=str(user_id), additional_claims=claims),
+    }
 
 # app/routes/auth.py
 @auth_bp.route("/register", methods=["POST"])
@@ -27,12 +42,7 @@ def register():
         user_id = get_jwt_identity()
         current_app.logger.debug(f"User ID from token: {user_id}")
 
-        user = User.query.get(user_id)
-        if not user:
-            current_app.logger.warning(f"User not found for ID: {user_id}")
-            return jsonify({"message": "User not found"}), 404
-
-        if user.role != "admin":
+        if current_role() != "admin":
             current_app.logger.warning(f"Non-admin user {user_id} attempted to register a new user")
             return jsonify({"message": "Only admins can register new users"}), 403
 
@@ -94,6 +104,9 @@ def register():
         current_app.logger.info(f"User registered successfully: {email}")
         return jsonify({"message": "User registered successfully"}), 201
 
+    except PasswordHasherBusy:
+        current_app.logger.warning("Password hashing pool is full; rejecting request")
+        raise
     except Exception as e:
         current_app.logger.error(f"Error during registration: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
@@ -120,17 +133,17 @@ def login():
             current_app.logger.warning(f"Password verification failed for email: {email}")
             return jsonify({"error": "Wrong email or password"}), 401
 
-        access_token = create_access_token(
-            identity=str(user.id),
-            expires_delta=timedelta(minutes=15)
-        )
-        
+        tokens = _issue_tokens(user.id, token_claims(user))
+
         current_app.logger.info(f"User logged in successfully: {email}")
         return jsonify({
-            "token": access_token,
+            **tokens,
             "role": user.role
         }), 200
 
+    except PasswordHasherBusy:
+        current_app.logger.warning("Password hashing pool is full; rejecting request")
+        raise
     except Exception as e:
         current_app.logger.error(f"Error during login: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -142,12 +155,7 @@ def protected():
         user_id = get_jwt_identity()
         current_app.logger.debug(f"User ID from token: {user_id}")
 
-        # Since user_id is now a string, convert it to an integer for the query
-        user = User.query.get(int(user_id))
-        if not user:
-            current_app.logger.warning(f"User not found for ID: {user_id}")
-            return jsonify({"error": "User not found"}), 404
-
+        user = current_user
         current_app.logger.info(f"User data retrieved: {user.id}, {user.username}")
         return jsonify({
             "id": user.id,
@@ -160,6 +168,37 @@ def protected():
         current_app.logger.error(f"Error in /protected endpoint: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Exchange a refresh token (Authorization: Bearer <refresh_token>) for a new token pair.
+# No password check: the presented refresh token is rotated (recorded as used) instead.
+@auth_bp.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        jwt_data = get_jwt()
+        user = current_user
+        current_app.logger.info(f"Refresh request for user {user.id}")
+
+        block_token(jwt_data)
+        purge_expired_tokens()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request rotated this refresh token first
+            db.session.rollback()
+            return jsonify({"error": "Token has been revoked."}), 401
+
+        # Claims are rebuilt from the users row instead of being copied along
+        # the refresh chain
+        claims = token_claims(db.session.get(User, user.id))
+        return jsonify({
+            **_issue_tokens(user.id, claims),
+            "role": user.role
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error during token refresh: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @auth_bp.route("/logout", methods=["POST"])
 def logout():
     try:
@@ -167,7 +206,21 @@ def logout():
         if not request.is_json:
             current_app.logger.warning("Logout request must be JSON")
             return jsonify({"error": "Request must be JSON"}), 400
-        
+
+        # Optional { "refresh_token": "..." }: revoke it so it cannot be exchanged again
+        refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+        if refresh_token:
+            try:
+                jwt_data = decode_token(refresh_token)
+            except PyJWTError:
+                jwt_data = None
+            if jwt_data and jwt_data.get("type") == "refresh":
+                block_token(jwt_data)
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    db.session.rollback()  # Already revoked
+
         current_app.logger.info("User logged out successfully")
         return jsonify({"message": "Logged out successfully"}), 200
     
@@ -1,8 +1,7 @@
 # app/routes/categories.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from database import db
-from app.models.user import User
 from app.models.category import Category
 
 categories_bp = Blueprint("categories", __name__, url_prefix="/categories")
@@ -14,19 +13,14 @@ def create_category():
     data = request.json
     name = data.get("name")
     description = data.get("description")
-    user_id = get_jwt_identity()
 
     if not name:
         return jsonify({"error": "Name is required."}), 400
 
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found."}), 404
-
     if Category.query.filter_by(name=name).first():
         return jsonify({"error": "Category with this name already exists."}), 400
 
-    category = Category(name=name, description=description, user_id=user_id)
+    category = Category(name=name, description=description, user_id=current_user.id)
     db.session.add(category)
     db.session.commit()
     return jsonify({"message": "Category created successfully", "category_id": category.id}), 201
@@ -1,14 +1,13 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from app.utils.decorators import role_required, current_role
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
 @dashboard_bp.route("/", methods=["GET"])
 @jwt_required()
 def dashboard():
-    current_user = get_jwt_identity()
-    print("JWT Identity:", current_user)  # Debugging
-    user_role = current_user.get("role")  # Assuming role is stored in JWT token
+    user_role = current_role()  # Signed role claim from the JWT
 
     if user_role == "admin":
         return jsonify({"message": "Welcome to the Admin Panel", "panel": "admin"})
@@ -17,29 +16,20 @@ def dashboard():
 
 
 @dashboard_bp.route("/admin/", methods=["GET"])
-@jwt_required()
+@role_required("admin", message="Unauthorized")
 def admin_panel():
-    current_user = get_jwt_identity()
-    if current_user.get("role") != "admin":
-        return jsonify({"error": "Unauthorized"}), 403
     return jsonify({"message": "Admin Panel"})
 
 
 @dashboard_bp.route("/admin/users", methods=["GET"])
-@jwt_required()
+@role_required("admin", message="Unauthorized")
 def manage_users():
-    current_user = get_jwt_identity()
-    if current_user.get("role") != "admin":
-        return jsonify({"error": "Unauthorized"}), 403
     return jsonify({"message": "Manage Users"})
 
 
 @dashboard_bp.route("/admin/settings", methods=["GET"])
-@jwt_required()
+@role_required("admin", message="Unauthorized")
 def admin_settings():
-    current_user = get_jwt_identity()
-    if current_user.get("role") != "admin":
-        return jsonify({"error": "Unauthorized"}), 403
     return jsonify({"message": "Admin Settings"})
 
 
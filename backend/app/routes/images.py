@@ -1,10 +1,12 @@
 # app/routes/images.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, url_for, current_app
+from flask_jwt_extended import jwt_required, current_user
 from database import db
 from app.models.user import User
+from app.utils.decorators import current_role
 from app.models.catalogue import Product
 from app.models.image import Image
+from app.utils.image_uploads import image_uploads
 import cloudinary
 import cloudinary.uploader
 import os
@@ -31,17 +33,16 @@ if not (_cfg.cloud_name and _cfg.api_key and _cfg.api_secret):
     print("Warning: Cloudinary config incomplete; uploads will fall back to local storage.")
 
 """
-POST /images/
+POST /images/upload
 Requires: multipart/form-data with 'file', 'name', 'color', 'product_id'
-Response: { "message": str, "image_id": int, "url": str }
+The file is spooled to local disk and pushed to Cloudinary (or local static storage)
+by a background worker; poll GET /images/<image_id>/status for the final URL.
+Response (202): { "message": str, "image_id": int, "status": "pending", "status_url": str }
 """
 @images_bp.route("/upload", methods=["POST"])
 @jwt_required()
 def upload_image():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
     if 'file' not in request.files:
         return jsonify({"error": "No file part in request."}), 400
     file = request.files['file']
@@ -54,38 +55,98 @@ def upload_image():
     if not product:
         return jsonify({"error": "Product not found."}), 404
 
-    # Try Cloudinary upload, fallback to local static folder
-    url = None
-    cloudinary_available = True
+    # Create the row first so the spooled file can be named after its id
+    image = Image(name=name, url="", color=color, user_id=user.id, product_id=product.id, status="pending")
+    db.session.add(image)
+    db.session.flush()
     try:
-        # Check if config values are set
-        if not (cloudinary.config().cloud_name and cloudinary.config().api_key and cloudinary.config().api_secret):
-            cloudinary_available = False
-    except Exception:
-        cloudinary_available = False
+        path = image_uploads.spool(image, file)
+    except OSError:
+        db.session.rollback()
+        return jsonify({"error": "Could not store the upload."}), 500
+    db.session.commit()
 
-    if cloudinary_available:
-        try:
-            result = cloudinary.uploader.upload(file)
-            url = result.get('secure_url')
-        except Exception:
-            cloudinary_available = False
+    image_uploads.enqueue(image.id, path, request.host_url)
+    return jsonify({
+        "message": "Image accepted for upload",
+        "image_id": image.id,
+        "status": image.status,
+        "status_url": url_for("images.get_image_status", image_id=image.id),
+    }), 202
 
-    if not cloudinary_available or not url:
-        # Save locally in static/images
-        from werkzeug.utils import secure_filename
-        static_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'images'))
-        os.makedirs(static_folder, exist_ok=True)
-        filename = secure_filename(file.filename)
-        local_path = os.path.join(static_folder, filename)
-        file.save(local_path)
-        # Generate absolute URL for frontend access
-        url = request.host_url.rstrip('/') + f"/static/images/{filename}"
+"""
+POST /images/upload-batch
+Requires: multipart/form-data with one or more 'files' parts and 'product_id';
+optional 'names' (one per file, in order; defaults to the file name) and 'color'
+All files are spooled concurrently and their Image rows are inserted in one
+transaction, then queued like single uploads.
+Response (202): { "message": str, "product_id": int,
+                  "images": [ { "image_id": int, "name": str, "status": "pending", "status_url": str } ] }
+"""
+@images_bp.route("/upload-batch", methods=["POST"])
+@jwt_required()
+def upload_image_batch():
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    names = request.form.getlist('names')
+    color = request.form.get('color')
+    product_id = request.form.get('product_id')
+    if not files or not product_id:
+        return jsonify({"error": "At least one file and product_id are required."}), 400
+    max_files = current_app.config["IMAGE_BATCH_MAX_FILES"]
+    if len(files) > max_files:
+        return jsonify({"error": f"At most {max_files} files per batch."}), 400
+    if names and len(names) != len(files):
+        return jsonify({"error": "Provide one name per file, or none."}), 400
+    product = db.session.get(Product, product_id)
+    if not product:
+        return jsonify({"error": "Product not found."}), 404
 
-    image = Image(name=name, url=url, color=color, user_id=user_id, product_id=product_id)
-    db.session.add(image)
+    images = [
+        Image(name=names[i] if names else os.path.splitext(f.filename)[0] or f.filename,
+              url="", color=color, user_id=current_user.id, product_id=product.id, status="pending")
+        for i, f in enumerate(files)
+    ]
+    db.session.add_all(images)
+    db.session.flush()  # One round-trip assigns every id
+    try:
+        paths = image_uploads.spool_many(images, files)
+    except OSError:
+        db.session.rollback()
+        return jsonify({"error": "Could not store the upload."}), 500
     db.session.commit()
-    return jsonify({"message": "Image uploaded successfully", "image_id": image.id, "url": url}), 201
+
+    for image, path in zip(images, paths):
+        image_uploads.enqueue(image.id, path, request.host_url)
+    return jsonify({
+        "message": f"{len(images)} image(s) accepted for upload",
+        "product_id": product.id,
+        "images": [
+            {
+                "image_id": image.id,
+                "name": image.name,
+                "status": image.status,
+                "status_url": url_for("images.get_image_status", image_id=image.id),
+            } for image in images
+        ],
+    }), 202
+
+"""
+GET /images/<int:image_id>/status
+Poll an upload started with POST /images/upload
+Response: { "image_id": int, "status": "pending" | "ready" | "failed", "url": str | null, "variants": dict | null }
+"""
+@images_bp.route("/<int:image_id>/status", methods=["GET"])
+@jwt_required()
+def get_image_status(image_id):
+    image = db.session.get(Image, image_id)
+    if not image:
+        return jsonify({"error": "Image not found."}), 404
+    return jsonify({
+        "image_id": image.id,
+        "status": image.status,
+        "url": image.url or None,
+        "variants": image.variants,
+    }), 200
 
 """
 GET /images/<int:product_id>
@@ -104,7 +165,9 @@ def get_images_for_product(product_id):
                 "url": img.url,
                 "color": img.color,
                 "user_id": img.user_id,
-                "product_id": img.product_id
+                "product_id": img.product_id,
+                "status": img.status,
+                "variants": img.variants
             } for img in images
         ]
     }), 200
@@ -117,12 +180,10 @@ Response: { "message": str }
 @images_bp.route("/<int:image_id>", methods=["DELETE"])
 @jwt_required()
 def delete_image(image_id):
-    user_id = get_jwt_identity()
     image = Image.query.get(image_id)
     if not image:
         return jsonify({"error": "Image not found."}), 404
-    user = User.query.get(user_id)
-    if not user or (user.id != image.user_id and user.role != "admin"):
+    if current_user.id != image.user_id and current_role() != "admin":
         return jsonify({"error": "Unauthorized."}), 403
     db.session.delete(image)
     db.session.commit()
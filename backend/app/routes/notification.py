@@ -1,22 +1,24 @@
 # app/routes/notification.py
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import time
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from datetime import timedelta
+from flask_jwt_extended import jwt_required, current_user, create_access_token, get_jwt, get_jwt_request_location
+from sqlalchemy import update
 from database import db
 from app.models.notification import Notification
 from app.models.user import User
+from app.utils.current_user import scoped_token_claims
+from app.utils.decorators import role_required, current_role
+from app.utils.notifications import notification_event, unread_count
+from app.utils.notification_stream import notification_stream, format_event, SubscriptionClosed
+from app.utils.pagination import limit_param, decode_cursor, seek_before, cut_page, InvalidCursor
 
 notification_bp = Blueprint("notification", __name__, url_prefix="/notifications")
 
 # Create a notification (admin or system-triggered)
 @notification_bp.route("/", methods=["POST"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can create notifications.")
 def create_notification():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can create notifications."}), 403
-
     data = request.json
     user_id = data.get("user_id")
     message = data.get("message")
@@ -34,46 +36,204 @@ def create_notification():
 
     return jsonify({"message": "Notification created successfully"}), 201
 
-# Get all notifications for the logged-in user
+def _serialize(notification):
+    return {
+        "id": notification.id,
+        "user_id": notification.user_id,
+        "message": notification.message,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+"""
+GET /notification/
+Optional query params: limit (default 50, max 500), cursor (from a previous next_cursor),
+unread_only (true/false). Without limit or cursor every notification is returned
+and next_cursor is null.
+Response: { "notifications": [ { ... } ], "next_cursor": str | null }
+Newest first by (created_at, id).
+"""
 @notification_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_notifications():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = current_user
 
-    if not user:
-        return jsonify({"error": "User not found."}), 404
+    query = Notification.query.filter(Notification.user_id == user.id)
+    if request.args.get("unread_only", "").lower() in ("1", "true", "yes"):
+        query = query.filter(Notification.is_read == db.false())
 
-    notifications = Notification.query.filter_by(user_id=current_user_id).order_by(Notification.created_at.desc()).all()
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+    if "limit" in request.args or "cursor" in request.args:
+        # Keyset pagination: seek past the last (created_at, id) of the previous page
+        limit = limit_param()
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                query = query.filter(seek_before(Notification.created_at, Notification.id, decode_cursor(cursor)))
+            except InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+        notifications, next_cursor = cut_page(query.limit(limit + 1).all(), limit, key=lambda n: (n.created_at, n.id))
+    else:
+        # Unpaged unless asked: the dashboard's inbox views read the whole list
+        notifications, next_cursor = query.all(), None
 
     return jsonify({
-        "notifications": [
-            {
-                "id": notification.id,
-                "user_id": notification.user_id,
-                "message": notification.message,
-                "is_read": notification.is_read,
-                "created_at": notification.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            }
-            for notification in notifications
-        ]
+        "notifications": [_serialize(notification) for notification in notifications],
+        "next_cursor": next_cursor,
+    }), 200
+
+"""
+POST /notification/stream-token
+Response: { "token": str, "expires_in": int }
+A token that only opens GET /notification/stream, valid for
+NOTIFICATION_STREAM_TOKEN_SECONDS. Pass it as ?jwt=; full access tokens are not
+accepted in the query string, where they would be written to access logs.
+"""
+@notification_bp.route("/stream-token", methods=["POST"])
+@jwt_required()
+def create_stream_token():
+    lifetime = int(current_app.config["NOTIFICATION_STREAM_TOKEN_SECONDS"])
+    token = create_access_token(
+        identity=str(current_user.id),
+        additional_claims=scoped_token_claims(current_user, "notification_stream"),
+        expires_delta=timedelta(seconds=lifetime),
+    )
+    return jsonify({"token": token, "expires_in": lifetime}), 200
+
+"""
+GET /notification/stream
+Server-Sent Events: pushes each new notification as
+    id: <notification id>\nevent: notification\ndata: { id, user_id, message, is_read, created_at }
+with a ": keep-alive" comment every NOTIFICATION_STREAM_HEARTBEAT seconds. The
+stream ends after NOTIFICATION_STREAM_MAX_SECONDS; EventSource then reconnects
+with Last-Event-ID (or ?last_event_id=) and missed notifications are replayed.
+EventSource cannot set headers, so a token from POST /notification/stream-token
+may be passed as ?jwt= (an Authorization header still works too).
+503 with Retry-After when this process already holds NOTIFICATION_STREAM_MAX_SUBSCRIBERS
+streams, or the caller NOTIFICATION_STREAM_MAX_PER_USER.
+"""
+@notification_bp.route("/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_notifications():
+    if get_jwt_request_location() == "query_string" and get_jwt().get("scope") != "notification_stream":
+        return jsonify({"error": "Use a token from POST /notification/stream-token in ?jwt=."}), 401
+
+    user_id = current_user.id
+    config = current_app.config
+    heartbeat = float(config["NOTIFICATION_STREAM_HEARTBEAT"])
+    deadline = time.monotonic() + float(config["NOTIFICATION_STREAM_MAX_SECONDS"])
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be a notification id."}), 400
+
+    if not notification_stream.reserve(user_id, int(config["NOTIFICATION_STREAM_MAX_SUBSCRIBERS"]),
+                                       int(config["NOTIFICATION_STREAM_MAX_PER_USER"])):
+        response = jsonify({"error": "Too many open notification streams. Retry later."})
+        response.headers["Retry-After"] = str(max(1, int(heartbeat)))
+        return response, 503
+
+    subscription = None
+    try:
+        # Subscribe before replaying so nothing written in between is missed
+        subscription = notification_stream.subscribe(user_id)
+        missed = []
+        if last_id is not None:
+            missed = [
+                notification_event(n) for n in Notification.query.filter(
+                    Notification.user_id == user_id, Notification.id > last_id
+                ).order_by(Notification.id).limit(int(config["NOTIFICATION_STREAM_REPLAY_LIMIT"]))
+            ]
+    except Exception:
+        if subscription is not None:
+            subscription.close()
+        notification_stream.release(user_id)
+        raise
+    # Release the pooled connection; the stream itself never touches the database
+    db.session.remove()
+
+    def events():
+        # Live events already sent by the replay, or seen before reconnecting, are skipped
+        seen = {event["id"] for event in missed}
+        floor = last_id or 0
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            for event in missed:
+                yield format_event(event)
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=heartbeat)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event["id"] > floor and event["id"] not in seen:
+                    yield format_event(event)
+        except SubscriptionClosed:
+            pass
+
+    def close():
+        # Runs when the server closes the response, even if the body was never iterated
+        subscription.close()
+        notification_stream.release(user_id)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+    })
+    response.call_on_close(close)
+    return response
+
+"""
+GET /notification/unread-count
+Response: { "unread": int }
+Counted through the (user_id, is_read, created_at) index.
+"""
+@notification_bp.route("/unread-count", methods=["GET"])
+@jwt_required()
+def get_unread_count():
+    return jsonify({"unread": unread_count(current_user.id)}), 200
+
+"""
+PUT /notification/read
+Requires: JSON { "ids": [int, ...] } to mark those notifications read, or { "all": true }
+Response: { "message": str, "updated": int, "unread": int }
+One UPDATE; ids belonging to other users or already read are ignored.
+"""
+@notification_bp.route("/read", methods=["PUT"])
+@jwt_required()
+def mark_notifications_as_read():
+    user = current_user
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    mark_all = data.get("all") is True
+    if not mark_all and (not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids)):
+        return jsonify({"error": "Provide ids as a non-empty list of integers, or all: true."}), 400
+
+    stmt = update(Notification).where(Notification.user_id == user.id, Notification.is_read == db.false())
+    if not mark_all:
+        stmt = stmt.where(Notification.id.in_(set(ids)))
+    updated = db.session.execute(
+        stmt.values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+
+    return jsonify({
+        "message": f"{updated} notification(s) marked as read",
+        "updated": updated,
+        "unread": unread_count(user.id),
     }), 200
 
 # Mark a notification as read
 @notification_bp.route("/<int:notification_id>/read", methods=["PUT"])
 @jwt_required()
 def mark_notification_as_read(notification_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-
-    if not user:
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
 
-    notification = Notification.query.get(notification_id)
+    notification = db.session.get(Notification, notification_id)
     if not notification:
         return jsonify({"error": "Notification not found."}), 404
 
-    if notification.user_id != current_user_id:
+    if notification.user_id != user.id:
         return jsonify({"error": "Unauthorized. You can only mark your own notifications as read."}), 403
 
     notification.is_read = True
@@ -85,17 +245,13 @@ def mark_notification_as_read(notification_id):
 @notification_bp.route("/<int:notification_id>", methods=["DELETE"])
 @jwt_required()
 def delete_notification(notification_id):
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-
-    if not user:
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
 
-    notification = Notification.query.get(notification_id)
+    notification = db.session.get(Notification, notification_id)
     if not notification:
         return jsonify({"error": "Notification not found."}), 404
 
-    if notification.user_id != current_user_id and user.role != "admin":
+    if notification.user_id != user.id and current_role() != "admin":
         return jsonify({"error": "Unauthorized. You can only delete your own notifications."}), 403
 
     db.session.delete(notification)
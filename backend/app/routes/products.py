@@ -1,10 +1,11 @@
 # app/routes/products.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from database import db
-from app.models.user import User
 from app.models.category import Category
 from app.models.catalogue import Product
+from app.utils.catalogue import images_by_product
+from app.utils.pagination import page_params
 
 products_bp = Blueprint("products", __name__, url_prefix="/products")
 
@@ -17,30 +18,36 @@ def create_product():
     description = data.get("description")
     price = data.get("price")
     category_id = data.get("category_id")
-    user_id = get_jwt_identity()
 
     if not all([name, price, category_id]):
         return jsonify({"error": "Name, price, and category_id are required."}), 400
 
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found."}), 404
-
     category = Category.query.get(category_id)
     if not category:
         return jsonify({"error": "Category not found."}), 404
 
-    product = Product(name=name, description=description, price=price, user_id=user_id, category_id=category_id)
+    product = Product(name=name, description=description, price=price, user_id=current_user.id, category_id=category_id)
     db.session.add(product)
     db.session.commit()
     return jsonify({"message": "Product created successfully", "product_id": product.id}), 201
 
-# Get all products
+# Get products. Without ?page= or ?per_page= every product is returned (the dashboard
+# relies on this); with either, the list is paginated (per_page default 20, max 100).
 @products_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_products():
-    products = Product.query.all()
+    query = Product.query.order_by(Product.id)
+    meta = {}
+    if "page" in request.args or "per_page" in request.args:
+        page, per_page = page_params()
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        products = pagination.items
+        meta = {"page": page, "per_page": per_page, "total": pagination.total, "pages": pagination.pages}
+    else:
+        products = query.all()
+    images = images_by_product([p.id for p in products])
     return jsonify({
+        **meta,
         "products": [
             {
                 "id": p.id,
@@ -55,7 +62,7 @@ def get_products():
                         "name": img.name,
                         "url": img.url,
                         "color": img.color
-                    } for img in getattr(p, 'images', [])
+                    } for img in images[p.id]
                 ]
             } for p in products
         ]
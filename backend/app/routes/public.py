@@ -1,11 +1,23 @@
 # app/routes/public.py
 """Public, read-only endpoints for external sites to query products, categories, and images.
 No authentication required. Returns simplified, cache-friendly payloads.
+
+Every response carries ETag / Last-Modified validators derived from the catalogue
+version counters and a configurable Cache-Control (PUBLIC_CACHE_CONTROL). A request
+whose If-None-Match (or If-Modified-Since) still matches gets a 304 before the
+endpoint runs its query.
 """
-from flask import Blueprint, jsonify, request, current_app
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import Blueprint, jsonify, request, current_app, make_response, g
 from app.models.catalogue import Product
 from app.models.category import Category
 from app.models.image import Image
+from app.utils.cache import response_cache
+from app.utils.catalogue import images_by_product, catalogue_versions
+from app.utils.pagination import page_params, count_mode_param, paginate
+from app.utils.search import contains_filter, relevance_order, suggest
 from sqlalchemy import asc, desc
 
 public_bp = Blueprint("public", __name__)
@@ -18,49 +30,93 @@ def _check_api_key():
             return False
     return True
 
-# Utility: pagination params
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
 
-def _pagination_params():
-    try:
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 20))
-    except ValueError:
-        page, per_page = 1, 20
-    per_page = min(per_page, 100)
-    return page, per_page
+def _public_endpoint(*tables):
+    """API-key check plus conditional GET, validated against the versions of `tables`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _check_api_key():
+                return jsonify({"error": "Invalid or missing API key"}), 401
 
-@public_bp.route("/products", methods=["GET"])
-def public_products():
-    if not _check_api_key():
-        return jsonify({"error": "Invalid or missing API key"}), 401
-    page, per_page = _pagination_params()
-    sort = request.args.get("sort", "created")  # name|price|created
+            versions = catalogue_versions(*tables)
+            g.catalogue_versions = versions
+            fingerprint = f"{sorted(versions.items())}|{request.full_path}"
+            etag = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+            last_modified = max((ts for _, ts in versions.values() if ts), default=None)
+            if last_modified:
+                last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = current_app.config.get("PUBLIC_CACHE_CONTROL", "public, max-age=60")
+            response.vary.add("X-API-Key")
+            return response
+        return wrapper
+    return decorator
+
+def _product_list_params():
+    """Normalize /public/products query params so equivalent requests share a cache entry."""
+    page, per_page = page_params()
+    sort = request.args.get("sort", "created")  # name|price|created|relevance
     direction = request.args.get("direction", "desc")  # asc|desc
-    q = request.args.get("q")
-    category_id = request.args.get("category_id")
+    q = request.args.get("q") or ""
+    try:
+        category_id = int(request.args["category_id"]) if request.args.get("category_id") else None
+    except ValueError:
+        category_id = None
+    return {
+        "q": q.lower() or None,  # the search is case-insensitive
+        "category_id": category_id,
+        "sort": sort if sort in ("name", "price", "created", "relevance") else "created",
+        "direction": "asc" if direction == "asc" else "desc",
+        "page": page,
+        "per_page": per_page,
+        "count": count_mode_param(),
+    }
 
+def _product_list_payload(params, versions):
     query = Product.query
-    if q:
-        like = f"%{q}%"
-        query = query.filter(Product.name.ilike(like))
-    if category_id:
-        try:
-            query = query.filter(Product.category_id == int(category_id))
-        except ValueError:
-            pass
+    if params["q"]:
+        query = query.filter(contains_filter(Product.name, params["q"]))
+    if params["category_id"] is not None:
+        query = query.filter(Product.category_id == params["category_id"])
 
     sort_map = {
         "name": Product.name,
         "price": Product.price,
         "created": Product.created_at if hasattr(Product, "created_at") else Product.id
     }
-    sort_col = sort_map.get(sort, sort_map["created"])  # default
-    if direction == "asc":
-        query = query.order_by(asc(sort_col))
+    if params["sort"] == "relevance" and params["q"]:
+        # Best matches first (trigram similarity on PostgreSQL); direction is ignored
+        query = query.order_by(*relevance_order(Product.name, params["q"]), Product.id)
     else:
-        query = query.order_by(desc(sort_col))
+        sort_col = sort_map.get(params["sort"], sort_map["created"])
+        if params["direction"] == "asc":
+            query = query.order_by(asc(sort_col))
+        else:
+            query = query.order_by(desc(sort_col))
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    count_key = (
+        "public_products_count",
+        {"q": params["q"], "category_id": params["category_id"], "version": versions["products"]},
+        ("products",),
+    )
+    pagination = paginate(query, params["page"], params["per_page"], count=params["count"], count_key=count_key)
+    images = images_by_product([p.id for p in pagination.items])
     items = [
         {
             "id": p.id,
@@ -68,21 +124,40 @@ def public_products():
             "description": p.description,
             "price": p.price,
             "category_id": p.category_id,
-            "image_urls": [img.url for img in getattr(p, 'images', [])]
+            "image_urls": [img.url for img in images[p.id]],
+            "image_variants": [img.variants for img in images[p.id]]
         } for p in pagination.items
     ]
-    return jsonify({
-        "page": page,
-        "per_page": per_page,
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "products": items
-    })
+    return {**pagination.meta(), "products": items}
+
+@public_bp.route("/products", methods=["GET"])
+@_public_endpoint("products", "images")
+def public_products():
+    params = _product_list_params()
+    # The catalogue versions are part of the key, so another worker's write can
+    # never be answered from this worker's cache.
+    key_params = {**params, "versions": g.catalogue_versions}
+    payload = response_cache.get_or_set(
+        "public_products", key_params, ("products", "images"),
+        lambda: _product_list_payload(params, g.catalogue_versions),
+    )
+    return jsonify(payload)
+
+@public_bp.route("/products/suggest", methods=["GET"])
+@_public_endpoint("products")
+def public_product_suggestions():
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"suggestions": []})
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 25)
+    except ValueError:
+        limit = 10
+    return jsonify({"suggestions": suggest(Product.name, q, limit=limit)})
 
 @public_bp.route("/categories", methods=["GET"])
+@_public_endpoint("categories")
 def public_categories():
-    if not _check_api_key():
-        return jsonify({"error": "Invalid or missing API key"}), 401
     categories = Category.query.order_by(Category.name.asc()).all()
     return jsonify({
         "categories": [
@@ -92,9 +167,8 @@ def public_categories():
     })
 
 @public_bp.route("/products/<int:product_id>", methods=["GET"])
+@_public_endpoint("products", "images")
 def public_product_detail(product_id):
-    if not _check_api_key():
-        return jsonify({"error": "Invalid or missing API key"}), 401
     product = Product.query.get_or_404(product_id)
     return jsonify({
         "id": product.id,
@@ -103,32 +177,28 @@ def public_product_detail(product_id):
         "price": product.price,
         "category_id": product.category_id,
         "images": [
-            {"id": img.id, "name": img.name, "url": img.url, "color": img.color}
-            for img in getattr(product, 'images', [])
+            {"id": img.id, "name": img.name, "url": img.url, "color": img.color, "variants": img.variants}
+            for img in getattr(product, 'images', []) if img.status == "ready"
         ]
     })
 
 @public_bp.route("/images", methods=["GET"])
+@_public_endpoint("images")
 def public_images():
-    if not _check_api_key():
-        return jsonify({"error": "Invalid or missing API key"}), 401
-    page, per_page = _pagination_params()
+    page, per_page = page_params()
     product_id = request.args.get("product_id")
-    query = Image.query
+    query = Image.query.filter(Image.status == "ready")
     if product_id:
         try:
-            query = query.filter(Image.product_id == int(product_id))
+            product_id = int(product_id)
+            query = query.filter(Image.product_id == product_id)
         except ValueError:
-            pass
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            product_id = None
+    count_key = ("public_images_count", {"product_id": product_id, "versions": g.catalogue_versions}, ("images",))
+    pagination = paginate(query.order_by(Image.id), page, per_page, count=count_mode_param(), count_key=count_key)
     items = [
-        {"id": img.id, "name": img.name, "url": img.url, "color": img.color, "product_id": img.product_id}
+        {"id": img.id, "name": img.name, "url": img.url, "color": img.color, "product_id": img.product_id,
+         "variants": img.variants}
         for img in pagination.items
     ]
-    return jsonify({
-        "page": page,
-        "per_page": per_page,
-        "total": pagination.total,
-        "pages": pagination.pages,
-        "images": items
-    })
+    return jsonify({**pagination.meta(), "images": items})
@@ -1,39 +1,107 @@
-from flask import Blueprint, jsonify, request
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
 from database import db
 from app.models.report import Report
+from app.models.user import User
 from app.models.visit import Visit
+from app.models.visit_rollup import VisitRollup
+from app.utils.pagination import limit_param, decode_cursor, seek_before, cut_page, InvalidCursor
+from app.utils.visit_stats import PERIODS, DIMENSIONS
+from app.utils.decorators import role_required, current_role
 
 report_bp = Blueprint("report", __name__, url_prefix="/report")
 
+# Rows fetched per round-trip from the server-side cursor, and rows per chunk written
+# to the response, when streaming exports.
+EXPORT_FETCH_SIZE = 1000
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FIELDS = ["id", "user_id", "doctor_name", "location", "visit_date", "notes", "created_at", "updated_at"]
+
+
+def _visit_report_row(visit):
+    return {
+        "id": visit.id,
+        "user_id": visit.user_id,
+        "doctor_name": visit.doctor_name,
+        "location": visit.location,
+        "visit_date": visit.visit_date.isoformat(),
+        "notes": visit.notes if visit.notes else "No notes provided",
+        "created_at": visit.created_at.isoformat() if visit.created_at else None,
+        "updated_at": visit.updated_at.isoformat() if visit.updated_at else None
+    }
+
+
+def _iter_visit_rows():
+    # yield_per streams through a server-side cursor, so only one fetch batch of
+    # column tuples is held in memory at a time.
+    stmt = (
+        select(*(getattr(Visit, field) for field in EXPORT_FIELDS))
+        .order_by(Visit.id)
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    for visit in db.session.execute(stmt):
+        yield _visit_report_row(visit)
+
+
+def _csv_chunks():
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(_iter_visit_rows(), start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks():
+    lines = []
+    for row in _iter_visit_rows():
+        lines.append(json.dumps(row))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _stream_visits_export(export_format):
+    chunks, mimetype = {
+        "csv": (_csv_chunks, "text/csv"),
+        "ndjson": (_ndjson_chunks, "application/x-ndjson"),
+    }[export_format]
+    filename = f"visits-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(chunks()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 # Get all reports (admin sees all, users see their own)
 # New route: Get all visits as a report (admin only)
+# Optional ?format=csv|ndjson streams the visits as a file download instead of JSON.
 @report_bp.route("/all-visits", methods=["GET"])
-@jwt_required()
+@role_required("admin", message="Unauthorized: Only admins can access this report.")
 def get_all_visits_report():
-    user_role = request.headers.get("X-User-Role")  # Assumes role is passed in headers
-
-    # Restrict access to admins only
-    if user_role != "admin":
-        return jsonify({"error": "Unauthorized: Only admins can access this report."}), 403
+    export_format = request.args.get("format", "json")
+    if export_format in ("csv", "ndjson"):
+        return _stream_visits_export(export_format)
+    if export_format != "json":
+        return jsonify({"error": "Invalid format. Use json, csv or ndjson."}), 400
 
     # Fetch all visits from the database
     visits = Visit.query.all()
 
     # Format the visits into a report-like structure
-    report_data = [
-        {
-            "id": visit.id,
-            "user_id": visit.user_id,
-            "doctor_name": visit.doctor_name,
-            "location": visit.location,
-            "visit_date": visit.visit_date.isoformat(),
-            "notes": visit.notes if visit.notes else "No notes provided",
-            "created_at": visit.created_at.isoformat(),
-            "updated_at": visit.updated_at.isoformat() if visit.updated_at else None
-        }
-        for visit in visits
-    ]
+    report_data = [_visit_report_row(visit) for visit in visits]
 
     return jsonify({
         "report": {
@@ -44,16 +112,136 @@ def get_all_visits_report():
         }
     }), 200
 
+# Visit statistics from the pre-aggregated rollups (admin only)
+# Query params: dimension=doctor|location|user|total (default doctor),
+# period=day|week|month (optional; omit for totals per key), start_date, end_date (YYYY-MM-DD)
+@report_bp.route("/stats", methods=["GET"])
+@role_required("admin", message="Unauthorized: Only admins can access visit statistics.")
+def get_visit_stats():
+    dimension = request.args.get("dimension", "doctor")
+    period = request.args.get("period")
+    if dimension not in DIMENSIONS:
+        return jsonify({"error": f"Invalid dimension. Use one of: {', '.join(DIMENSIONS)}."}), 400
+    if period is not None and period not in PERIODS:
+        return jsonify({"error": f"Invalid period. Use one of: {', '.join(PERIODS)}."}), 400
+
+    try:
+        start_date = request.args.get("start_date")
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        end_date = request.args.get("end_date")
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    # Totals are summed from the coarsest buckets that still respect the date range.
+    source_period = period or ("day" if start_date or end_date else "month")
+    # No rollup row is shared by every visit; "total" is the sum of the per-user rows
+    query = db.session.query(VisitRollup).filter(
+        VisitRollup.period == source_period,
+        VisitRollup.dimension == ("user" if dimension == "total" else dimension),
+    )
+    if start_date:
+        query = query.filter(VisitRollup.period_start >= start_date)
+    if end_date:
+        query = query.filter(VisitRollup.period_start <= end_date)
+
+    total = func.sum(VisitRollup.visit_count)
+    if period:
+        # "total" folds every marketer's row for a period into one key
+        columns = [VisitRollup.period_start] + ([] if dimension == "total" else [VisitRollup.dimension_key])
+        rows = query.with_entities(*columns, total).group_by(*columns).having(total > 0).order_by(*columns).all()
+        stats = [
+            {"period_start": row[0].isoformat(), "key": row[1] if len(row) == 3 else "", "count": int(row[-1])}
+            for row in rows
+        ]
+    elif dimension == "total":
+        count = int(query.with_entities(total).scalar() or 0)
+        stats = [{"key": "", "count": count}] if count > 0 else []
+    else:
+        rows = query.with_entities(VisitRollup.dimension_key, total).group_by(
+            VisitRollup.dimension_key
+        ).having(total > 0).order_by(total.desc()).all()
+        stats = [{"key": key, "count": int(count)} for key, count in rows]
+
+    if dimension == "user" and stats:
+        # Label marketer ids with names in one query
+        ids = {int(row["key"]) for row in stats}
+        names = {
+            user_id: f"{first_name or ''} {last_name or ''}".strip() or username
+            for user_id, username, first_name, last_name in db.session.query(
+                User.id, User.username, User.first_name, User.last_name
+            ).filter(User.id.in_(ids))
+        }
+        for row in stats:
+            row["label"] = names.get(int(row["key"]))
+
+    return jsonify({
+        "dimension": dimension,
+        "period": period,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "stats": stats
+    }), 200
+
+# List reports: admins see all, users see their own.
+# Query params: user_id (admin only), start_date, end_date (YYYY-MM-DD, on report created_at),
+# limit (default 50, max 500), cursor (from a previous next_cursor); without either,
+# every matching report is returned and next_cursor is null. Newest first.
 @report_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_reports():
-    current_user_id = get_jwt_identity()
-    user_role = request.headers.get("X-User-Role")  # Assumes role is passed in headers
+    current_user_id = int(get_jwt_identity())
+    user_role = current_role()
+
+    # Reports and the visit fields they show come back in one joined SELECT
+    # instead of a lazy Report.visit load per row.
+    query = db.session.query(
+        Report.id,
+        Report.visit_id,
+        Report.user_id,
+        Report.title,
+        Report.report_text,
+        Report.created_at,
+        Report.updated_at,
+        Visit.doctor_name,
+        Visit.location,
+        Visit.visit_date,
+    ).join(Visit, Visit.id == Report.visit_id)
 
     if user_role == "admin":
-        reports = Report.query.all()
+        user_id = request.args.get("user_id")
+        if user_id:
+            try:
+                query = query.filter(Report.user_id == int(user_id))
+            except ValueError:
+                return jsonify({"error": "Invalid user_id. Must be an integer."}), 400
+    else:
+        query = query.filter(Report.user_id == current_user_id)
+
+    try:
+        start_date = request.args.get("start_date")
+        if start_date:
+            query = query.filter(Report.created_at >= datetime.strptime(start_date, "%Y-%m-%d"))
+        end_date = request.args.get("end_date")
+        if end_date:
+            # end_date is inclusive: everything before the following midnight
+            query = query.filter(Report.created_at < datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1))
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    query = query.order_by(Report.created_at.desc(), Report.id.desc())
+    if "limit" in request.args or "cursor" in request.args:
+        limit = limit_param()
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                query = query.filter(seek_before(Report.created_at, Report.id, decode_cursor(cursor)))
+            except InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+        reports, next_cursor = cut_page(query.limit(limit + 1).all(), limit, key=lambda r: (r.created_at, r.id))
     else:
-        reports = Report.query.filter_by(user_id=current_user_id).all()
+        # Unpaged unless asked: the dashboard's report list reads the whole list
+        reports, next_cursor = query.all(), None
 
     return jsonify({
         "reports": [
@@ -66,23 +254,24 @@ def get_reports():
                 "created_at": report.created_at.isoformat(),
                 "updated_at": report.updated_at.isoformat(),
                 "visit": {
-                    "doctor_name": report.visit.doctor_name,
-                    "location": report.visit.location,
-                    "visit_date": report.visit.visit_date.isoformat()
+                    "doctor_name": report.doctor_name,
+                    "location": report.location,
+                    "visit_date": report.visit_date.isoformat()
                 }
             }
             for report in reports
-        ]
+        ],
+        "next_cursor": next_cursor
     }), 200
 
 # Get a single report by ID
 @report_bp.route("/<int:report_id>", methods=["GET"])
 @jwt_required()
 def get_report(report_id):
-    current_user_id = get_jwt_identity()
-    user_role = request.headers.get("X-User-Role")
+    current_user_id = int(get_jwt_identity())
+    user_role = current_role()
 
-    report = Report.query.get_or_404(report_id)
+    report = Report.query.options(joinedload(Report.visit)).filter(Report.id == report_id).first_or_404()
 
     if user_role != "admin" and report.user_id != current_user_id:
         return jsonify({"error": "Unauthorized access to this report."}), 403
@@ -106,7 +295,7 @@ def get_report(report_id):
 @report_bp.route("/", methods=["POST"])
 @jwt_required()
 def create_report():
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     data = request.get_json()
 
     if not data or not data.get("visit_id") or not data.get("title") or not data.get("report_text"):
@@ -133,8 +322,8 @@ def create_report():
 @report_bp.route("/<int:report_id>", methods=["PUT"])
 @jwt_required()
 def update_report(report_id):
-    current_user_id = get_jwt_identity()
-    user_role = request.headers.get("X-User-Role")
+    current_user_id = int(get_jwt_identity())
+    user_role = current_role()
 
     report = Report.query.get_or_404(report_id)
 
@@ -159,8 +348,8 @@ def update_report(report_id):
 @report_bp.route("/<int:report_id>", methods=["DELETE"])
 @jwt_required()
 def delete_report(report_id):
-    current_user_id = get_jwt_identity()
-    user_role = request.headers.get("X-User-Role")
+    current_user_id = int(get_jwt_identity())
+    user_role = current_role()
 
     report = Report.query.get_or_404(report_id)
 
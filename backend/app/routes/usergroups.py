@@ -2,13 +2,66 @@
 
 # app/routes/usergroups.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select, insert, delete, exists, literal
+from sqlalchemy.dialects import postgresql, sqlite
 from database import db
+from app.utils.current_user import invalidate_user
+from app.utils.decorators import role_required
 from app.models.user import User
-from app.models.usergroups import UserGroup
+from app.models.usergroups import UserGroup, user_group_association
 
 usergroups_bp = Blueprint("usergroups", __name__, url_prefix="/usergroups")
 
+
+def _add_members(group_id, user_ids):
+    """
+    Add every existing user in `user_ids` to the group with one
+    INSERT ... SELECT, skipping current members. Returns the ids added.
+    """
+    membership = user_group_association.c
+    candidates = select(User.id, literal(group_id)).where(User.id.in_(user_ids))
+    dialect = db.session.get_bind().dialect.name
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if dialect_insert is not None:
+        stmt = dialect_insert(user_group_association).from_select(
+            ["user_id", "group_id"], candidates
+        ).on_conflict_do_nothing(index_elements=["user_id", "group_id"]).returning(membership.user_id)
+        return db.session.execute(stmt).scalars().all()
+    # Portable fallback for dialects without ON CONFLICT
+    new_ids = db.session.execute(
+        select(User.id).where(
+            User.id.in_(user_ids),
+            ~exists().where(membership.user_id == User.id, membership.group_id == group_id),
+        )
+    ).scalars().all()
+    if new_ids:
+        db.session.execute(insert(user_group_association), [{"user_id": uid, "group_id": group_id} for uid in new_ids])
+    return new_ids
+
+
+def _remove_members(group_id, user_ids):
+    """Remove `user_ids` from the group with one DELETE. Returns the ids removed."""
+    membership = user_group_association.c
+    return db.session.execute(
+        delete(user_group_association)
+        .where(membership.group_id == group_id, membership.user_id.in_(user_ids))
+        .returning(membership.user_id)
+    ).scalars().all()
+
+
+def _invalidate_users(user_ids):
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+def _membership_user_ids():
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get("user_ids", [])
+    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(uid, int) for uid in user_ids):
+        return None
+    return sorted(set(user_ids))
+
 """
 GET /usergroups/all
 Returns all user groups
@@ -50,12 +103,8 @@ Response: { "message": str, "group_id": int }
 Admin only
 """
 @usergroups_bp.route("/create", methods=["POST"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can create groups.")
 def create_group():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can create groups."}), 403
     data = request.get_json()
     name = data.get("name")
     description = data.get("description")
@@ -73,68 +122,55 @@ def create_group():
 """
 POST /usergroups/<group_id>/assign
 Requires: JSON { "user_ids": [int, ...] }
-Response: { "message": str }
+Response: { "message": str, "added": int }
 Admin only
+One INSERT ... SELECT ... ON CONFLICT DO NOTHING; unknown ids and current members are skipped
 """
 @usergroups_bp.route("/<int:group_id>/assign", methods=["POST"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can assign users.")
 def assign_users_to_group(group_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can assign users."}), 403
-    group = UserGroup.query.get(group_id)
+    group = db.session.get(UserGroup, group_id)
     if not group:
         return jsonify({"error": "Group not found."}), 404
-    data = request.get_json()
-    user_ids = data.get("user_ids", [])
-    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(uid, int) for uid in user_ids):
+    user_ids = _membership_user_ids()
+    if user_ids is None:
         return jsonify({"error": "user_ids must be a non-empty list of integers."}), 400
-    users = User.query.filter(User.id.in_(user_ids)).all()
-    if not users:
-        return jsonify({"error": "No valid users found for provided IDs."}), 400
-    added = 0
-    for user in users:
-        if user not in group.users:
-            group.users.append(user)
-            added += 1
+    added_ids = _add_members(group.id, user_ids)
     db.session.commit()
+    _invalidate_users(added_ids)
+    added = len(added_ids)
     if added == 0:
-        return jsonify({"message": "No new users were assigned (all already in group)."}), 200
-    return jsonify({"message": f"{added} users assigned to group successfully"}), 200
+        # Only the no-op case pays for telling the two reasons apart
+        if not db.session.query(User.query.filter(User.id.in_(user_ids)).exists()).scalar():
+            return jsonify({"error": "No valid users found for provided IDs."}), 400
+        return jsonify({"message": "No new users were assigned (all already in group).", "added": 0}), 200
+    return jsonify({"message": f"{added} users assigned to group successfully", "added": added}), 200
 
 """
 POST /usergroups/<group_id>/remove
 Requires: JSON { "user_ids": [int, ...] }
-Response: { "message": str }
+Response: { "message": str, "removed": int }
 Admin only
+One DELETE ... WHERE user_id IN (...) RETURNING user_id.
 """
 @usergroups_bp.route("/<int:group_id>/remove", methods=["POST"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can remove users.")
 def remove_users_from_group(group_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can remove users."}), 403
-    group = UserGroup.query.get(group_id)
+    group = db.session.get(UserGroup, group_id)
     if not group:
         return jsonify({"error": "Group not found."}), 404
-    data = request.get_json()
-    user_ids = data.get("user_ids", [])
-    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(uid, int) for uid in user_ids):
+    user_ids = _membership_user_ids()
+    if user_ids is None:
         return jsonify({"error": "user_ids must be a non-empty list of integers."}), 400
-    users = User.query.filter(User.id.in_(user_ids)).all()
-    if not users:
-        return jsonify({"error": "No valid users found for provided IDs."}), 400
-    removed = 0
-    for user in users:
-        if user in group.users:
-            group.users.remove(user)
-            removed += 1
+    removed_ids = _remove_members(group.id, user_ids)
     db.session.commit()
+    _invalidate_users(removed_ids)
+    removed = len(removed_ids)
     if removed == 0:
-        return jsonify({"message": "No users were removed (none were in group)."}), 200
-    return jsonify({"message": f"{removed} users removed from group successfully"}), 200
+        if not db.session.query(User.query.filter(User.id.in_(user_ids)).exists()).scalar():
+            return jsonify({"error": "No valid users found for provided IDs."}), 400
+        return jsonify({"message": "No users were removed (none were in group).", "removed": 0}), 200
+    return jsonify({"message": f"{removed} users removed from group successfully", "removed": removed}), 200
 
 """
 DELETE /usergroups/<group_id>
@@ -143,15 +179,15 @@ Response: { "message": str }
 Admin only
 """
 @usergroups_bp.route("/<int:group_id>", methods=["DELETE"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can delete groups.")
 def delete_group(group_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can delete groups."}), 403
     group = UserGroup.query.get(group_id)
     if not group:
         return jsonify({"error": "Group not found."}), 404
+    member_ids = db.session.execute(
+        select(user_group_association.c.user_id).where(user_group_association.c.group_id == group.id)
+    ).scalars().all()
     db.session.delete(group)
     db.session.commit()
+    _invalidate_users(member_ids)
     return jsonify({"message": "Group deleted successfully"}), 200
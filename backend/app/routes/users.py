@@ -1,34 +1,29 @@
 
 # app/routes/user.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from app.models.user import User
 from database import db
-from flask_bcrypt import Bcrypt
-from app.models.notification import Notification
+from app.utils.current_user import invalidate_user, revoke_tokens
+from app.utils.notifications import notification_dispatcher
+from app.utils.notification_digests import set_digest_mode
+from app.utils.decorators import role_required
 
-bcrypt = Bcrypt()
 user_bp = Blueprint("user", __name__, url_prefix="/users")
 
 
-# Helper function to create a notification
+# Helper function to create a notification. Delivery goes through the dispatcher,
+# which writes the row once the caller commits and pushes it to live streams.
 def create_notification(user_id, message):
-    notification = Notification(user_id=user_id, message=message)
-    db.session.add(notification)
+    notification_dispatcher.dispatch([{"user_id": user_id, "message": message}])
 
 
 # --------------------------
 # GET ALL USERS (Admin Only)
 # --------------------------
 @user_bp.route("/users", methods=["GET"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can view users.")
 def get_all_users():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can view users."}), 403
-
     users = User.query.all()
     user_list = [
         {
@@ -78,14 +73,8 @@ def get_user(user_id):
 # UPDATE USER DETAILS (Admin Only)
 # ----------------------------
 @user_bp.route("/users/<int:user_id>", methods=["PUT"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can update users.")
 def update_user(user_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can update users."}), 403
-
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -93,7 +82,9 @@ def update_user(user_id):
     data = request.json
     user.username = data.get("username", user.username)
     user.email = data.get("email", user.email)
-    user.role = data.get("role", user.role)  # Only admin can change roles
+    if data.get("role", user.role) != user.role:
+        user.role = data["role"]  # Only admin can change roles
+        revoke_tokens(user)  # Outstanding tokens still carry the old role claim
     user.first_name = data.get("firstName", user.first_name)
     user.last_name = data.get("lastName", user.last_name)
     user.address = data.get("address", user.address)
@@ -103,20 +94,15 @@ def update_user(user_id):
     user.about_me = data.get("aboutMe", user.about_me)
 
     db.session.commit()
+    invalidate_user(user_id)
     return jsonify({"message": "User updated successfully"}), 200
 
 # ----------------------------
 # CHANGE PASSWORD FOR ANY USER (Admin Only)
 # ----------------------------
 @user_bp.route("/users/<int:user_id>/change-password", methods=["PUT"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can change user passwords.")
 def admin_change_user_password(user_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can change user passwords."}), 403
-
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -131,7 +117,9 @@ def admin_change_user_password(user_id):
         return jsonify({"error": "New password must be at least 6 characters long"}), 400
 
     user.set_password(new_password)
+    revoke_tokens(user)
     db.session.commit()
+    invalidate_user(user_id)
 
     return jsonify({"message": "Password updated successfully"}), 200
 
@@ -139,19 +127,13 @@ def admin_change_user_password(user_id):
 # DELETE USER (Admin Only)
 # ----------------------------
 @user_bp.route("/users/<int:user_id>", methods=["DELETE"])
-@jwt_required()
+@role_required("admin", message="Unauthorized. Only admins can delete users.")
 def delete_user(user_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Unauthorized. Only admins can delete users."}), 403
-
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    if user.id == current_user_id:
+    if user.id == current_user.id:
         return jsonify({"error": "Admins cannot delete their own account."}), 400
 
     admins = User.query.filter_by(role="admin").all()
@@ -163,13 +145,14 @@ def delete_user(user_id):
         db.session.delete(user)
 
         for admin in admins:
-            if admin.id != current_user_id:
+            if admin.id != current_user.id:
                 create_notification(
                     user_id=admin.id,
                     message=f"Admin {current_user.username} deleted user {username}."
                 )
 
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({"message": "User deleted successfully"}), 200
 
     except Exception as e:
@@ -181,8 +164,8 @@ def delete_user(user_id):
 @user_bp.route("/me", methods=["GET", "PUT"])
 @jwt_required()
 def manage_current_user():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    # The full profile is not part of the cached snapshot, so load the row
+    user = User.query.get(current_user.id)
 
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -200,10 +183,16 @@ def manage_current_user():
             "country": user.country,
             "postal_code": user.postal_code,
             "about_me": user.about_me,
+            "notification_digest": user.notification_digest or "realtime",
         }), 200
 
     if request.method == "PUT":
         data = request.json
+        if "notificationDigest" in data:
+            try:
+                set_digest_mode(user, data["notificationDigest"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
         user.username = data.get("username", user.username)
         user.email = data.get("email", user.email)
         user.first_name = data.get("firstName", user.first_name)
@@ -215,4 +204,5 @@ def manage_current_user():
         user.about_me = data.get("aboutMe", user.about_me)
 
         db.session.commit()
+        invalidate_user(current_user.id)
         return jsonify({"message": "Profile updated successfully"}), 200
\ No newline at end of file
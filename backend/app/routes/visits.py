@@ -1,21 +1,25 @@
+import json
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from database import db
 from app.models.visit import Visit
 from app.models.user import User
-from app.models.notification import Notification
+from app.utils.decorators import current_role
+from app.utils.notifications import notification_dispatcher
+from app.utils.search import contains_filter, suggest
+from app.utils.visit_stats import record_visit_changes, snapshot
+from app.utils.pagination import limit_param, decode_cursor, seek_before, cut_page, InvalidCursor
 
 visit_bp = Blueprint("visit", __name__, url_prefix="/visit")
 
-# Helper function to create a notification
-def create_notification(user_id, message, commit=False):
+# Helper function to create a notification. Delivery goes through the dispatcher,
+# which writes all recipients in one bulk INSERT once the caller commits.
+def create_notification(user_id, message):
     print(f"Creating notification for user_id {user_id}: {message}")
-    notification = Notification(user_id=user_id, message=message)
-    db.session.add(notification)
-    if commit:
-        print("Committing notification to database...")
-        db.session.commit()
+    notification_dispatcher.dispatch([{"user_id": user_id, "message": message}])
 
 """
 POST /visit/
@@ -26,13 +30,8 @@ Response: { "message": str }
 @jwt_required()
 def log_visit():
     print("Received POST request to /visit/")
-    current_user_id = get_jwt_identity()
-    print(f"Current user ID from JWT: {current_user_id}")
-
-    user = User.query.get(current_user_id)
-    if not user:
-        print("User not found.")
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
+    print(f"Current user ID from JWT: {user.id}")
 
     print(f"User found: {user.username}, Role: {user.role}")
 
@@ -59,7 +58,7 @@ def log_visit():
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD HH:MM:SS."}), 400
 
     new_visit = Visit(
-        user_id=current_user_id,
+        user_id=user.id,
         doctor_name=doctor_name,
         location=location,
         visit_date=visit_date,
@@ -68,54 +67,223 @@ def log_visit():
 
     print("Adding new visit to database...")
     db.session.add(new_visit)
-    db.session.commit()
-    print("Visit added successfully.")
+    record_visit_changes(added=[snapshot(new_visit)])
 
-    # Notify the user who logged the visit
-    print("Creating notification for user...")
+    # Notify the user who logged the visit and all real-time admins (digest admins
+    # get it in their hourly/daily summary). The dispatcher batches every
+    # recipient into one INSERT committed with the visit: into the outbox the
+    # background worker delivers from ("async" mode) or the inbox ("sync" mode).
+    current_app.logger.debug("Queueing visit notifications for user %s and admins", user.id)
     create_notification(
-        user_id=current_user_id,
+        user_id=user.id,
         message=f"You logged a visit with {doctor_name} at {location} on {visit_date.strftime('%Y-%m-%d %H:%M:%S')}.",
-        commit=True
+    )
+    notification_dispatcher.notify_admins(
+        f"User {user.username} logged a visit with {doctor_name} at {location} on {visit_date.strftime('%Y-%m-%d %H:%M:%S')}.",
+        realtime_only=True,
     )
 
-    # Notify all admins
-    admins = User.query.filter_by(role="admin").all()
-    print(f"Found {len(admins)} admins to notify.")
-    for admin in admins:
-        print(f"Notifying admin {admin.username}...")
-        create_notification(
-            user_id=admin.id,
-            message=f"User {user.username} logged a visit with {doctor_name} at {location} on {visit_date.strftime('%Y-%m-%d %H:%M:%S')}.",
-            commit=True
-        )
-
+    db.session.commit()
     print("Visit logged successfully, returning response.")
     return jsonify({"message": "Visit logged successfully"}), 201
 
+# Inserts retried when a concurrent upload claims the same client_refs first
+_BULK_INSERT_ATTEMPTS = 3
+
+
+def _read_bulk_items(max_items):
+    """
+    Items from a JSON array, a {"visits": [...]} object, or an NDJSON stream.
+    An NDJSON stream is read no further than max_items + 1 lines, enough for the
+    caller to reject it as too large.
+    """
+    if request.mimetype in ("application/x-ndjson", "application/ndjson"):
+        items = []
+        # Read line by line from the request stream rather than buffering the body
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            if len(items) > max_items:
+                break
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("visits")
+    return data if isinstance(data, list) else None
+
+
+def _validate_bulk_item(item):
+    """Return (row, error) for one submitted visit."""
+    if not isinstance(item, dict):
+        return None, "Item must be a JSON object."
+    missing = [field for field in ("doctor_name", "location", "visit_date") if not item.get(field)]
+    if missing:
+        return None, f"Missing required fields: {', '.join(missing)}."
+    try:
+        visit_date = datetime.strptime(item["visit_date"], "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None, "Invalid date format. Use YYYY-MM-DD HH:MM:SS."
+    notes = item.get("notes") if item.get("notes") is not None else ""
+    for field, value in (("doctor_name", item["doctor_name"]), ("location", item["location"]), ("notes", notes)):
+        # Checked here so one bad item cannot fail the whole multi-row INSERT
+        max_length = Visit.__table__.c[field].type.length
+        if not isinstance(value, str):
+            return None, f"{field} must be a string."
+        if max_length is not None and len(value) > max_length:
+            return None, f"{field} must be at most {max_length} characters."
+    client_ref = item.get("client_ref")
+    if client_ref is not None and (not isinstance(client_ref, str) or not 0 < len(client_ref) <= 64):
+        return None, "client_ref must be a string of 1-64 characters."
+    return {
+        "doctor_name": item["doctor_name"],
+        "location": item["location"],
+        "visit_date": visit_date,
+        "notes": notes,
+        "client_ref": client_ref,
+    }, None
+
+
+def _insert_bulk_visits(user, pending):
+    """
+    Insert `pending` [(index, row)] for `user`, skipping client_refs already
+    stored. Returns ({index: visit_id}, {index: existing_visit_id}).
+    """
+    refs = [row["client_ref"] for _, row in pending if row["client_ref"]]
+    existing = {}
+    if refs:
+        existing = dict(
+            db.session.query(Visit.client_ref, Visit.id)
+            .filter(Visit.user_id == user.id, Visit.client_ref.in_(refs))
+        )
+    duplicates = {index: existing[row["client_ref"]] for index, row in pending if row["client_ref"] in existing}
+    new_rows = [(index, row) for index, row in pending if index not in duplicates]
+
+    created = {}
+    if new_rows:
+        now = datetime.utcnow()
+        params = [{**row, "user_id": user.id, "created_at": now, "updated_at": now} for _, row in new_rows]
+        # One multi-row INSERT; RETURNING is matched back to items by parameter order
+        ids = db.session.execute(
+            insert(Visit).returning(Visit.id, sort_by_parameter_order=True), params
+        ).scalars().all()
+        created = {index: visit_id for (index, _), visit_id in zip(new_rows, ids)}
+        record_visit_changes(added=[
+            (user.id, row["doctor_name"], row["location"], row["visit_date"]) for _, row in new_rows
+        ])
+    return created, duplicates
+
+
+"""
+POST /visit/bulk
+Requires: a JSON array of visits (or { "visits": [...] }), or an NDJSON body
+(Content-Type: application/x-ndjson) with one visit per line. Each visit is
+{ "doctor_name", "location", "visit_date" (YYYY-MM-DD HH:MM:SS), "notes" (optional),
+  "client_ref" (optional idempotency key, unique per user) }.
+Replayed client_refs are not inserted again and report the stored visit id.
+Response: { "created": int, "duplicates": int, "invalid": int,
+            "results": [ { "index", "status": created|duplicate|invalid, "id"?, "client_ref"?, "error"? } ] }
+400 unreadable body, 413 more than VISIT_BULK_MAX_ITEMS, 409 concurrent uploads kept conflicting.
+"""
+@visit_bp.route("/bulk", methods=["POST"])
+@jwt_required()
+def bulk_log_visits():
+    user = current_user
+
+    max_items = current_app.config.get("VISIT_BULK_MAX_ITEMS", 1000)
+    items = _read_bulk_items(max_items)
+    if items is None:
+        return jsonify({"error": "Expected a JSON array of visits or an NDJSON body."}), 400
+    if len(items) > max_items:
+        return jsonify({"error": f"Too many visits in one request (max {max_items})."}), 413
+
+    results = [None] * len(items)
+    pending = []
+    seen_refs = {}
+    for index, item in enumerate(items):
+        row, error = _validate_bulk_item(item)
+        if error:
+            results[index] = {"index": index, "status": "invalid", "error": error}
+        elif row["client_ref"] and row["client_ref"] in seen_refs:
+            # Same key twice in one upload: keep the first
+            results[index] = {"index": index, "status": "duplicate", "client_ref": row["client_ref"],
+                              "duplicate_of": seen_refs[row["client_ref"]]}
+        else:
+            if row["client_ref"]:
+                seen_refs[row["client_ref"]] = index
+            pending.append((index, row))
+
+    for attempt in range(_BULK_INSERT_ATTEMPTS):
+        try:
+            created, duplicates = _insert_bulk_visits(user, pending)
+            break
+        except IntegrityError:
+            # A concurrent replay stored some of these client_refs first; retry so
+            # they are reported as duplicates.
+            db.session.rollback()
+    else:
+        return jsonify({"error": "Visits conflicted with a concurrent upload. Retry the request."}), 409
+
+    for index, row in pending:
+        status, visit_id = ("created", created[index]) if index in created else ("duplicate", duplicates[index])
+        results[index] = {"index": index, "status": status, "id": visit_id, "client_ref": row["client_ref"]}
+
+    if created:
+        count = len(created)
+        create_notification(user_id=user.id, message=f"You synced {count} visit(s).")
+        notification_dispatcher.notify_admins(
+            f"User {user.username} logged {count} visit(s) from a synced device.", realtime_only=True
+        )
+    db.session.commit()
+
+    for result in results:
+        if result.get("duplicate_of") is not None:
+            earlier = results[result.pop("duplicate_of")]
+            result["id"] = earlier.get("id")
+
+    return jsonify({
+        "created": len(created),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "invalid": sum(1 for r in results if r["status"] == "invalid"),
+        "results": results,
+    }), 200
+
 """
 GET /visit/
 Admin: Optional query params: start_date, end_date, user_id, doctor_name
-Non-admin: No params, returns own visits
-Response: { "visits": [ { ... } ] }
+Non-admin: No filter params, returns own visits
+All: Optional limit (default 50, max 500) and cursor (from a previous next_cursor);
+without either, every matching visit is returned and next_cursor is null
+Response: { "visits": [ { ... } ], "next_cursor": str | null }
+Visits are ordered newest first by (visit_date, id).
 """
 @visit_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_visits():
     print("Received GET request to /visit/")
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-
-    if not user:
-        print("User not found.")
-        return jsonify({"error": "User not found."}), 404
-
-    query = Visit.query
-
-    if user.role != "admin":
+    user = current_user
+
+    # Column-only projection joined to the marketer's name, so listing visits is a
+    # single SELECT instead of one lazy User load per row.
+    query = db.session.query(
+        Visit.id,
+        Visit.user_id,
+        Visit.doctor_name,
+        Visit.location,
+        Visit.visit_date,
+        Visit.notes,
+        User.first_name,
+        User.last_name,
+    ).join(User, User.id == Visit.user_id)
+
+    if current_role() != "admin":
         # Non-admin users can only see their own visits
         print("Filtering visits for user...")
-        query = query.filter_by(user_id=user.id)  # Updated from marketer_id
+        query = query.filter(Visit.user_id == user.id)  # Updated from marketer_id
     else:
         # Admins can see all visits, with optional filters
         print("Applying admin filters...")
@@ -135,11 +303,27 @@ def get_visits():
             except ValueError:
                 return jsonify({"error": "Invalid end_date format. Use YYYY-MM-DD."}), 400
         if user_id:
-            query = query.filter(Visit.user_id == int(user_id))  # Updated from marketer_id
+            try:
+                query = query.filter(Visit.user_id == int(user_id))  # Updated from marketer_id
+            except ValueError:
+                return jsonify({"error": "Invalid user_id. Must be an integer."}), 400
         if doctor_name:
-            query = query.filter(Visit.doctor_name.ilike(f"%{doctor_name}%"))
-
-    visits = query.all()
+            query = query.filter(contains_filter(Visit.doctor_name, doctor_name))
+
+    query = query.order_by(Visit.visit_date.desc(), Visit.id.desc())
+    if "limit" in request.args or "cursor" in request.args:
+        # Keyset pagination: seek past the last (visit_date, id) of the previous page
+        limit = limit_param()
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                query = query.filter(seek_before(Visit.visit_date, Visit.id, decode_cursor(cursor)))
+            except InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+        visits, next_cursor = cut_page(query.limit(limit + 1).all(), limit, key=lambda v: (v.visit_date, v.id))
+    else:
+        # Unpaged unless asked: the dashboard's visit list and reports read the whole list
+        visits, next_cursor = query.all(), None
     print(f"Returning {len(visits)} visits.")
 
     return jsonify({
@@ -147,16 +331,36 @@ def get_visits():
             {
                 "id": visit.id,
                 "user_id": visit.user_id,  # Updated from marketer_id
-                "user_name": f"{visit.user.first_name} {visit.user.last_name}".strip(),  # Updated from marketer_name
+                "user_name": f"{visit.first_name} {visit.last_name}".strip(),  # Updated from marketer_name
                 "doctor_name": visit.doctor_name,
                 "location": visit.location,
                 "visit_date": visit.visit_date.strftime("%Y-%m-%d %H:%M:%S"),
                 "notes": visit.notes,
             }
             for visit in visits
-        ]
+        ],
+        "next_cursor": next_cursor,
     }), 200
 
+"""
+GET /visit/doctors/suggest?q=<prefix>
+Doctor names starting with q (case-insensitive), from the caller's visits or, for admins, all visits.
+Response: { "suggestions": [ str ] }
+"""
+@visit_bp.route("/doctors/suggest", methods=["GET"])
+@jwt_required()
+def suggest_doctors():
+    user = current_user
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"suggestions": []}), 200
+
+    query = db.session.query(Visit.doctor_name)
+    if current_role() != "admin":
+        query = query.filter(Visit.user_id == user.id)
+    return jsonify({"suggestions": suggest(Visit.doctor_name, q, query=query)}), 200
+
 """
 PUT /visit/<visit_id>
 Requires: JSON { "doctor_name": str (optional), "location": str (optional), "visit_date": str (YYYY-MM-DD HH:MM:SS, optional), "notes": str (optional) }
@@ -166,21 +370,17 @@ Response: { "message": str }
 @jwt_required()
 def update_visit(visit_id):
     print(f"Received PUT request to /visit/{visit_id}")
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-
-    if not user:
-        print("User not found.")
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
 
     visit = Visit.query.get_or_404(visit_id)
 
-    if user.role != "admin" and visit.user_id != current_user_id:  # Updated from marketer_id
+    if current_role() != "admin" and visit.user_id != user.id:  # Updated from marketer_id
         print("Unauthorized: Not the owner of this visit.")
         return jsonify({"error": "Unauthorized. You can only update your own visits."}), 403
 
     data = request.json
     print(f"Received update data: {data}")
+    previous = snapshot(visit)
     visit.doctor_name = data.get("doctor_name", visit.doctor_name)
     visit.location = data.get("location", visit.location)
     visit.notes = data.get("notes", visit.notes)
@@ -193,6 +393,7 @@ def update_visit(visit_id):
             print("Invalid date format.")
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD HH:MM:SS."}), 400
 
+    record_visit_changes(added=[snapshot(visit)], removed=[previous])
     db.session.commit()
     print("Visit updated successfully.")
 
@@ -207,14 +408,9 @@ Response: { "message": str }
 @jwt_required()
 def delete_visit(visit_id):
     print(f"Received DELETE request to /visit/{visit_id}")
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-
-    if not user:
-        print("User not found.")
-        return jsonify({"error": "User not found."}), 404
+    user = current_user
 
-    if user.role != "admin" and user.id != Visit.query.get(visit_id).user_id:  # Updated from marketer_id
+    if current_role() != "admin" and user.id != Visit.query.get(visit_id).user_id:  # Updated from marketer_id
         print("Unauthorized: User is neither an admin nor the owner of this visit.")
         return jsonify({"error": "Unauthorized. You can only delete your own visits unless you are an admin."}), 403
 
@@ -226,14 +422,13 @@ def delete_visit(visit_id):
     visit_date = visit.visit_date.strftime("%Y-%m-%d %H:%M:%S")
 
     db.session.delete(visit)
+    record_visit_changes(removed=[snapshot(visit)])
 
-    visit_user = User.query.get(user_id)
-    if visit_user and visit_user.id != current_user_id:
+    if user_id != user.id:
         print("Notifying user of deletion...")
         create_notification(
-            user_id=visit_user.id,
+            user_id=user_id,
             message=f"Your visit with {doctor_name} at {location} on {visit_date} was deleted by {user.username}.",
-            commit=True
         )
 
     db.session.commit()
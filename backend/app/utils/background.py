@@ -0,0 +1,145 @@
+# app/utils/background.py
+"""
+A small in-process background worker: one daemon thread that drains a queue in
+batches and hands each batch to a handler inside an application context.
+
+The queue lives in memory only. On a normal interpreter exit the worker is given
+`shutdown_timeout` seconds to finish what is queued; items still queued after
+that, or when the process is killed, are lost.
+
+PeriodicTask runs a job on a timer instead; advisory_lock() keeps the copies of
+such a job in several worker processes from running at the same time.
+"""
+import atexit
+import queue
+import threading
+import logging
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    def __init__(self, name, handler, batch_size=500, shutdown_timeout=10):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.shutdown_timeout = shutdown_timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._app = None
+        self._drain_at_exit = False
+
+    def start(self, app):
+        """Start the worker thread for `app` if it is not already running."""
+        with self._lock:
+            self._app = app
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            if not self._drain_at_exit:
+                # Daemon threads still run while atexit handlers do
+                atexit.register(self.drain, self.shutdown_timeout)
+                self._drain_at_exit = True
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def join(self):
+        """Block until every queued item has been handled."""
+        self._queue.join()
+
+    def drain(self, timeout):
+        """
+        Wait up to `timeout` seconds for the queued items to be handled. Returns
+        False, and logs how many items were left, if the time ran out.
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("%s: %d item(s) still queued after %ss; dropping them",
+                                 self.name, self._queue.unfinished_tasks, timeout)
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                with self._app.app_context():
+                    self.handler(batch)
+            except Exception:
+                logger.exception("%s: failed to process batch of %d item(s)", self.name, len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class PeriodicTask:
+    """Run `handler()` every `interval` seconds on a daemon thread, inside an application context."""
+
+    def __init__(self, name, handler, interval):
+        self.name = name
+        self.handler = handler
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._app = None
+
+    def start(self, app):
+        """Start the timer thread for `app` if it is not already running."""
+        with self._lock:
+            self._app = app
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # The first run waits one interval, so a restart loop cannot hammer the job
+        while not self._stop.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    self.handler()
+            except Exception:
+                logger.exception("%s: scheduled run failed", self.name)
+
+
+@contextmanager
+def advisory_lock(key):
+    """
+    Yield whether this process holds PostgreSQL advisory lock `key` (not waiting
+    for it). Other databases have a single writer in practice, so it is always held.
+    """
+    if db.engine.dialect.name != "postgresql":
+        yield True
+        return
+    with db.engine.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
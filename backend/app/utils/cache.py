@@ -0,0 +1,179 @@
+# app/utils/cache.py
+"""
+Response cache for read-heavy endpoints.
+
+Entries are stored under a key built from a namespace, the normalized request
+parameters and the current generation of every tag the entry depends on.
+Invalidating a tag bumps its generation, so every key that embedded the old
+generation is never looked up again and ages out of the backend.
+
+Backends:
+- MemoryCacheBackend: per-process TTL + LRU dictionary (default).
+- SharedCacheBackend: any client with Redis-style get/set(ex=)/delete/incr, shared by
+  all workers. Configure with PUBLIC_CACHE_BACKEND=redis and PUBLIC_CACHE_URL, or
+  pass a client to ResponseCache.init_app(app, client=...).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    def __init__(self, maxsize=512, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def generation(self, tag):
+        # Kept outside the LRU so a generation is never evicted before the
+        # entries that embed it.
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            return self._generations[tag]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+
+
+class SharedCacheBackend:
+    """Adapter over a Redis-compatible client. Values are stored as JSON."""
+
+    def __init__(self, client, ttl=60, prefix="regex:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl if ttl is not None else self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def generation(self, tag):
+        raw = self.client.get(f"{self.prefix}tag:{tag}")
+        return int(raw) if raw is not None else 0
+
+    def bump(self, tag):
+        return self.client.incr(f"{self.prefix}tag:{tag}")
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, client=None):
+        app.config.setdefault("PUBLIC_CACHE_BACKEND", "memory")
+        app.config.setdefault("PUBLIC_CACHE_TTL", 60)
+        app.config.setdefault("PUBLIC_CACHE_MAXSIZE", 512)
+        ttl = int(app.config["PUBLIC_CACHE_TTL"])
+
+        if client is None and app.config["PUBLIC_CACHE_BACKEND"] == "redis":
+            try:
+                import redis
+                client = redis.Redis.from_url(app.config.get("PUBLIC_CACHE_URL") or "redis://localhost:6379/0")
+            except ImportError:
+                app.logger.warning("redis is not installed; public cache falls back to in-process memory.")
+
+        if client is not None:
+            self.backend = SharedCacheBackend(client, ttl=ttl)
+        else:
+            self.backend = MemoryCacheBackend(maxsize=int(app.config["PUBLIC_CACHE_MAXSIZE"]), ttl=ttl)
+        app.extensions["response_cache"] = self
+
+    def key(self, namespace, params, tags):
+        generations = {tag: self.backend.generation(tag) for tag in sorted(tags)}
+        raw = json.dumps([params, generations], sort_keys=True, default=str)
+        return f"{namespace}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def lookup(self, namespace, params, tags):
+        """Return the cached value for (namespace, params), or None."""
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(self.key(namespace, params, tags))
+        except Exception:
+            logger.exception("Response cache lookup failed.")
+            return None
+
+    def store(self, namespace, params, tags, value):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(self.key(namespace, params, tags), value)
+        except Exception:
+            logger.exception("Response cache store failed.")
+
+    def get_or_set(self, namespace, params, tags, compute):
+        """
+        Return the cached value for (namespace, params), or compute it, store it
+        and return it. `params` must be JSON-serializable and already normalized.
+        """
+        if self.backend is None:
+            return compute()
+        try:
+            key = self.key(namespace, params, tags)
+            value = self.backend.get(key)
+        except Exception:
+            logger.exception("Response cache lookup failed; serving uncached.")
+            return compute()
+        if value is None:
+            value = compute()
+            try:
+                self.backend.set(key, value)
+            except Exception:
+                logger.exception("Response cache store failed.")
+        return value
+
+    def invalidate_tags(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            try:
+                self.backend.bump(tag)
+            except Exception:
+                logger.exception("Failed to invalidate cache tag %s", tag)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,111 @@
+# app/utils/catalogue.py
+"""
+Shared catalogue helpers for the authenticated and public product routes.
+
+Catalogue versioning: any flush that writes a Product, Category or Image bumps
+the matching row in catalogue_versions, in the same transaction. Readers can
+then tell whether the catalogue changed with a primary-key lookup instead of
+re-running their query. Once the transaction commits, the response cache tags
+for the written tables are invalidated too.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, update, insert, select
+
+from database import db
+from app.models.catalogue import Product
+from app.models.category import Category
+from app.models.catalogue_version import CatalogueVersion
+from app.models.image import Image
+from app.utils.cache import response_cache
+
+CATALOGUE_TABLES = {
+    Product: "products",
+    Category: "categories",
+    Image: "images",
+}
+
+
+def images_by_product(product_ids):
+    """
+    Load the images for a page of products with one IN query and group them by
+    product id, instead of lazy-loading Product.images once per product.
+    Returns {product_id: [row, ...]} where rows have id, name, url, color, product_id, variants.
+    """
+    grouped = defaultdict(list)
+    if not product_ids:
+        return grouped
+    rows = db.session.query(
+        Image.id, Image.name, Image.url, Image.color, Image.product_id, Image.variants
+    ).filter(Image.product_id.in_(set(product_ids)), Image.status == "ready").order_by(Image.id)
+    for row in rows:
+        grouped[row.product_id].append(row)
+    return grouped
+
+
+def catalogue_versions(*names):
+    """Return {name: (version, updated_at)} for the requested catalogue tables."""
+    rows = db.session.query(
+        CatalogueVersion.name, CatalogueVersion.version, CatalogueVersion.updated_at
+    ).filter(CatalogueVersion.name.in_(names))
+    versions = {name: (0, None) for name in names}
+    versions.update({name: (version, updated_at) for name, version, updated_at in rows})
+    return versions
+
+
+def bump_catalogue_versions(connection, names):
+    """Increment the version counters for `names` on `connection`."""
+    names = sorted(set(names))
+    if not names:
+        return
+    now = datetime.utcnow()
+    result = connection.execute(
+        update(CatalogueVersion)
+        .where(CatalogueVersion.name.in_(names))
+        .values(version=CatalogueVersion.version + 1, updated_at=now)
+    )
+    if result.rowcount < len(names):
+        # First write to a table since the counters were created
+        existing = {row[0] for row in connection.execute(
+            select(CatalogueVersion.name).where(CatalogueVersion.name.in_(names))
+        )}
+        missing = [{"name": name, "version": 1, "updated_at": now} for name in names if name not in existing]
+        if missing:
+            connection.execute(insert(CatalogueVersion), missing)
+
+
+def _changed_tables(session):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = CATALOGUE_TABLES.get(type(obj))
+        if name and (obj in session.new or obj in session.deleted or session.is_modified(obj)):
+            changed.add(name)
+    return changed
+
+
+def _after_flush(session, flush_context):
+    # new/dirty/deleted still describe what this flush wrote
+    changed = _changed_tables(session)
+    if changed:
+        bump_catalogue_versions(session.connection(), changed)
+        session.info.setdefault("changed_catalogue_tables", set()).update(changed)
+
+
+def _after_commit(session):
+    changed = session.info.pop("changed_catalogue_tables", None)
+    if changed:
+        response_cache.invalidate_tags(*changed)
+
+
+def _after_rollback(session):
+    session.info.pop("changed_catalogue_tables", None)
+
+
+def init_app(app):
+    """Start versioning catalogue writes made through db.session."""
+    response_cache.init_app(app)
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
@@ -0,0 +1,180 @@
+# app/utils/current_user.py
+"""
+Authenticated-user lookup shared by every JWT-protected route.
+
+flask_jwt_extended calls the user_lookup_loader at most once per request and
+keeps the result on flask.g, so routes read `current_user` instead of running
+`User.query.get(get_jwt_identity())` themselves. The loader is served from a
+small TTL cache of user id -> snapshot, so most authenticated requests never
+touch the users table.
+
+Anything that changes a user's role or profile, or deletes the user, must call
+invalidate_user() once it has committed. Other worker processes keep their own
+cache and pick the change up when their entry expires (AUTH_USER_CACHE_TTL).
+
+Access tokens carry signed "role" and "ver" claims (token_claims()). Role
+checks read the claims; "ver" must match the user's token_version, so
+revoke_tokens() invalidates every token issued to a user so far. The version is
+compared with the cached snapshot, so authorization runs no query while the
+entry is fresh: a revocation (and with it a role change) applies at once on the
+worker that made it and within AUTH_USER_CACHE_TTL on the others.
+
+Scoped tokens carry a "scope" claim and are accepted only by the endpoints
+listed for that scope in TOKEN_SCOPES. GET /notification/stream takes its token
+in the query string (EventSource cannot set headers), so it gets a short-lived
+token that opens nothing else instead of a full access token that would end up
+in access logs.
+
+Refresh tokens are single use: /auth/refresh records the presented token in the
+TokenBlocklist and issues a new pair. Presenting a recorded refresh token again
+means it was copied, so every token issued to that user is revoked.
+"""
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+
+from database import db
+from app.models.user import User
+from app.models.token_blocklist import TokenBlocklist
+from app.utils.cache import MemoryCacheBackend
+
+# scope -> endpoints that accept tokens with that scope; every other endpoint rejects them
+TOKEN_SCOPES = {"notification_stream": {"notification.stream_notifications"}}
+
+_FIELDS = ("id", "username", "email", "role", "first_name", "last_name", "token_version")
+
+
+class AuthUser:
+    """Read-only snapshot of the authenticated user."""
+
+    __slots__ = _FIELDS
+
+    def __init__(self, **values):
+        for field in _FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(**{field: getattr(user, field) for field in _FIELDS})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in _FIELDS}
+
+    @property
+    def is_admin(self):
+        return self.role == "admin"
+
+    def __repr__(self):
+        return f"<AuthUser {self.username}>"
+
+
+def _cache():
+    return current_app.extensions["user_cache"]
+
+
+def load_user(user_id):
+    """Return the AuthUser for `user_id` (cached), or None if it does not exist."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    cache = _cache()
+    cached = cache.get(str(user_id))
+    if cached is not None:
+        return AuthUser(**cached)
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = AuthUser.from_model(user)
+    cache.set(str(user_id), snapshot.to_dict())
+    return snapshot
+
+
+def token_claims(user):
+    """Additional claims for an access token issued to `user`."""
+    return {"role": user.role, "ver": user.token_version or 0}
+
+
+def scoped_token_claims(user, scope):
+    """Claims for a token limited to the endpoints of `scope` (see TOKEN_SCOPES)."""
+    return {"scope": scope, "ver": user.token_version or 0}
+
+
+def revoke_tokens(user):
+    """
+    Invalidate every token issued to `user` so far. Takes effect once the caller
+    commits and calls invalidate_user().
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
+def block_token(jwt_data):
+    """Record a decoded token as used so it is rejected from now on (caller commits)."""
+    db.session.add(TokenBlocklist(
+        jti=jwt_data["jti"],
+        token_type=jwt_data["type"],
+        user_id=int(jwt_data[current_app.config.get("JWT_IDENTITY_CLAIM", "sub")]),
+        expires_at=datetime.utcfromtimestamp(jwt_data["exp"]),
+    ))
+
+
+def purge_expired_tokens():
+    """Delete blocklist rows for tokens that have expired anyway (caller commits)."""
+    return TokenBlocklist.query.filter(TokenBlocklist.expires_at < datetime.utcnow()).delete(
+        synchronize_session=False
+    )
+
+
+def _is_blocked(jwt_data):
+    return db.session.get(TokenBlocklist, jwt_data["jti"]) is not None
+
+
+def invalidate_user(user_id):
+    """Drop the cached snapshot for `user_id` in this process."""
+    _cache().delete(str(user_id))
+
+
+def init_app(app, jwt):
+    app.config.setdefault("AUTH_USER_CACHE_TTL", 60)
+    app.config.setdefault("AUTH_USER_CACHE_MAXSIZE", 1024)
+    app.extensions["user_cache"] = MemoryCacheBackend(
+        maxsize=int(app.config["AUTH_USER_CACHE_MAXSIZE"]),
+        ttl=int(app.config["AUTH_USER_CACHE_TTL"]),
+    )
+
+    @jwt.user_lookup_loader
+    def _lookup(jwt_header, jwt_data):
+        return load_user(jwt_data[app.config.get("JWT_IDENTITY_CLAIM", "sub")])
+
+    @jwt.user_lookup_error_loader
+    def _lookup_error(jwt_header, jwt_data):
+        return jsonify({"error": "User not found."}), 404
+
+    @jwt.token_in_blocklist_loader
+    def _token_revoked(jwt_header, jwt_data):
+        user = load_user(jwt_data[app.config.get("JWT_IDENTITY_CLAIM", "sub")])
+        # Unknown users are left to the lookup above, which answers 404
+        if user is None:
+            return False
+        if jwt_data.get("ver", 0) != (user.token_version or 0):
+            return True
+        scope = jwt_data.get("scope")
+        if scope is not None and request.endpoint not in TOKEN_SCOPES.get(scope, ()):
+            return True
+        # Access tokens are short-lived and only checked by version; refresh
+        # tokens are also checked against the blocklist (one primary-key read).
+        return jwt_data["type"] == "refresh" and _is_blocked(jwt_data)
+
+    @jwt.revoked_token_loader
+    def _revoked(jwt_header, jwt_data):
+        if jwt_data["type"] == "refresh" and _is_blocked(jwt_data):
+            # A rotated refresh token came back: treat it as stolen and end
+            # every session of this user.
+            user_id = int(jwt_data[app.config.get("JWT_IDENTITY_CLAIM", "sub")])
+            user = db.session.get(User, user_id)
+            if user is not None and jwt_data.get("ver", 0) == (user.token_version or 0):
+                revoke_tokens(user)
+                db.session.commit()
+                invalidate_user(user_id)
+                current_app.logger.warning(f"Refresh token reuse for user {user_id}; all tokens revoked")
+        return jsonify({"error": "Token has been revoked."}), 401
@@ -1,15 +1,28 @@
-from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, current_user
 from functools import wraps
 from flask import jsonify
 
-def role_required(required_role):
+
+def current_role():
+    """
+    Role of the authenticated user, read from the token's signed "role" claim.
+    Tokens issued before role claims existed fall back to the cached user lookup.
+    """
+    role = get_jwt().get("role")
+    return role if role is not None else current_user.role
+
+
+def role_required(*roles, message="Access denied"):
+    """
+    Require a valid JWT whose role claim is one of `roles`. Authorizes from the
+    token alone; revoked tokens are rejected earlier by the token-version check.
+    """
     def decorator(fn):
         @wraps(fn)
         @jwt_required()
         def wrapper(*args, **kwargs):
-            user = get_jwt_identity()
-            if user["role"] != required_role:
-                return jsonify({"message": "Access denied"}), 403
+            if current_role() not in roles:
+                return jsonify({"error": message}), 403
             return fn(*args, **kwargs)
         return wrapper
     return decorator
@@ -0,0 +1,77 @@
+# app/utils/image_derivatives.py
+"""
+Resized copies of uploaded images, and the content-addressed keys they are
+stored under.
+
+Each upload is hashed (SHA-256) and stored as
+
+    cas/<first two hex digits>/<hash>/original<ext>
+    cas/<first two hex digits>/<hash>/<variant>.<webp|jpeg>
+
+so identical uploads share one set of files, and a URL's content never changes
+and can be cached forever. Variants are bounded by their longest edge and are
+never upscaled.
+
+Derivatives need Pillow. Without it only the original is stored and `variants`
+stays empty.
+"""
+import hashlib
+import os
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:  # Optional: uploads still work, without derivatives
+    PILImage = None
+
+CAS_PREFIX = "cas"
+
+# Largest first: each variant is resized from the previous one
+VARIANTS = (("large", 1280), ("medium", 640), ("thumb", 160))
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def available():
+    return PILImage is not None
+
+
+def content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(digest, name):
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest}/{name}"
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def generate(path, out_dir):
+    """
+    Write every variant of the image at `path` into `out_dir`.
+    Returns [(variant, format, file path, (width, height)), ...].
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    largest = VARIANTS[0][1]
+    with PILImage.open(path) as opened:
+        # Lets the JPEG decoder downscale while decoding instead of after
+        opened.draft("RGB", (largest, largest))
+        working = ImageOps.exif_transpose(opened)
+        working = working.convert("RGBA" if _has_alpha(working) else "RGB")
+        for name, edge in VARIANTS:
+            working.thumbnail((edge, edge), PILImage.Resampling.LANCZOS)
+            for fmt, options in SAVE_OPTIONS.items():
+                target = os.path.join(out_dir, f"{name}.{fmt}")
+                frame = working if fmt == "webp" else working.convert("RGB")
+                frame.save(target, **options)
+                outputs.append((name, fmt, target, working.size))
+    return outputs
@@ -0,0 +1,279 @@
+# app/utils/image_uploads.py
+"""
+Image upload pipeline.
+
+POST /images/upload no longer talks to the CDN inside the request. It streams the
+file into a local spool directory, creates the Image row with status "pending"
+and queues the image id. A background worker pushes the spooled file to the
+remote store, fills in Image.url, marks it "ready" (or "failed") and removes the
+spooled copy. Clients poll GET /images/<id>/status for the final URL.
+
+Before pushing, a pool of IMAGE_DERIVATIVE_WORKERS threads hashes each file and
+renders its thumb/medium/large WebP and JPEG variants (see image_derivatives).
+Files are stored under content-hash keys, and an upload whose hash matches an
+image that is already stored reuses its URLs instead of uploading again.
+
+Stores:
+- CloudinaryStore: used when Cloudinary credentials are configured.
+- LocalStore: copies into app/static/images, as the old synchronous fallback did.
+  Also used when a Cloudinary upload fails, and handy as a stand-in in tests.
+  Content-addressed files are served with a one-year immutable Cache-Control.
+Pass store=... to init_app (or replace `image_uploads.store`) to use another one.
+
+Spooled files are named "<image_id>-<filename>", so `flask images resume` can
+re-queue pending uploads left behind by a restart.
+"""
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from werkzeug.utils import secure_filename
+
+from database import db
+from app.models.image import Image
+from app.utils.background import BackgroundQueue
+from app.utils import image_derivatives
+
+logger = logging.getLogger(__name__)
+
+STATIC_IMAGES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static", "images"))
+
+
+class CloudinaryStore:
+    def upload(self, path, key, base_url):
+        import cloudinary.uploader
+        # The key is content-addressed, so an existing asset is already correct
+        public_id = os.path.splitext(key)[0]
+        result = cloudinary.uploader.upload(path, public_id=public_id, overwrite=False, unique_filename=False)
+        return result["secure_url"]
+
+
+class LocalStore:
+    def __init__(self, directory=STATIC_IMAGES):
+        self.directory = directory
+
+    def upload(self, path, key, base_url):
+        target = os.path.join(self.directory, key)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+        return base_url.rstrip("/") + f"/static/images/{key}"
+
+
+def cloudinary_configured():
+    try:
+        import cloudinary
+        cfg = cloudinary.config()
+        return bool(cfg.cloud_name and cfg.api_key and cfg.api_secret)
+    except Exception:
+        return False
+
+
+class ImageUploads:
+    def __init__(self, app=None):
+        self.store = None
+        self.fallback = LocalStore()
+        self.worker = BackgroundQueue("image-uploader", self._process, batch_size=20)
+        self.pool = None
+        self.spool_pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, store=None):
+        app.config.setdefault(
+            "IMAGE_SPOOL_DIR", os.getenv("IMAGE_SPOOL_DIR") or os.path.join(app.instance_path, "upload_spool")
+        )
+        app.config.setdefault("IMAGE_UPLOAD_ATTEMPTS", 3)
+        app.config.setdefault("IMAGE_DERIVATIVE_WORKERS", min(4, os.cpu_count() or 1))
+        app.config.setdefault("IMAGE_SPOOL_WORKERS", 8)
+        app.config.setdefault("IMAGE_BATCH_MAX_FILES", 50)
+        app.config.setdefault("IMAGE_CACHE_CONTROL", "public, max-age=31536000, immutable")
+        if store is not None:
+            self.store = store
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(
+                max_workers=int(app.config["IMAGE_DERIVATIVE_WORKERS"]), thread_name_prefix="image-derivatives"
+            )
+        if self.spool_pool is None:
+            # Separate from the derivative pool so request-time copies never wait behind resizing
+            self.spool_pool = ThreadPoolExecutor(
+                max_workers=int(app.config["IMAGE_SPOOL_WORKERS"]), thread_name_prefix="image-spool"
+            )
+        if not image_derivatives.available():
+            app.logger.warning("Pillow is not installed; images are stored without derivatives.")
+        app.extensions["image_uploads"] = self
+
+        cas_path = f"images/{image_derivatives.CAS_PREFIX}/"
+
+        @app.after_request
+        def _immutable_images(response):
+            # Content-addressed files never change under the same URL
+            if request.endpoint == "static" and (request.view_args or {}).get("filename", "").startswith(cas_path):
+                response.headers["Cache-Control"] = app.config["IMAGE_CACHE_CONTROL"]
+            return response
+
+    def _store(self):
+        # Resolved on first use: Cloudinary is configured when the images blueprint loads
+        if self.store is None:
+            self.store = CloudinaryStore() if cloudinary_configured() else self.fallback
+        return self.store
+
+    def spool_path(self, image_id, filename):
+        return os.path.join(current_app.config["IMAGE_SPOOL_DIR"], f"{image_id}-{filename}")
+
+    @staticmethod
+    def _spool_to(directory, image_id, file_storage):
+        filename = secure_filename(file_storage.filename) or "upload"
+        path = os.path.join(directory, f"{image_id}-{filename}")
+        file_storage.save(path)  # Copies the request stream to disk without reading it whole
+        return path
+
+    def spool(self, image, file_storage):
+        """Stream an uploaded file into the spool directory in chunks."""
+        directory = current_app.config["IMAGE_SPOOL_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        return self._spool_to(directory, image.id, file_storage)
+
+    def spool_many(self, images, file_storages):
+        """
+        Spool several uploads concurrently on the spool pool. Returns their paths
+        in order; if any copy fails, the files already written are removed and
+        the error is raised.
+        """
+        directory = current_app.config["IMAGE_SPOOL_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        futures = [
+            self.spool_pool.submit(self._spool_to, directory, image.id, file_storage)
+            for image, file_storage in zip(images, file_storages)
+        ]
+        paths, error = [], None
+        for future in futures:
+            try:
+                paths.append(future.result())
+            except OSError as exc:
+                error = error or exc
+        if error is not None:
+            for path in paths:
+                self._discard(path)
+            raise error
+        return paths
+
+    def enqueue(self, image_id, path, base_url):
+        """Queue a spooled file for upload; call after the pending Image row is committed."""
+        self.worker.start(current_app._get_current_object())
+        self.worker.put({"image_id": image_id, "path": path, "base_url": base_url})
+
+    def flush(self):
+        """Block until every queued upload has been processed."""
+        self.worker.join()
+
+    def _push(self, job, path, key):
+        attempts = int(current_app.config["IMAGE_UPLOAD_ATTEMPTS"])
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._store().upload(path, key, job["base_url"])
+            except Exception:
+                logger.exception("Upload of image %s failed (attempt %d/%d)", job["image_id"], attempt, attempts)
+                if attempt < attempts:
+                    time.sleep(0.5 * attempt)
+        if self._store() is not self.fallback:
+            return self.fallback.upload(path, key, job["base_url"])
+        raise RuntimeError(f"Could not upload image {job['image_id']}")
+
+    @staticmethod
+    def _prepare(path):
+        """Hash a spooled file and render its variants. Runs on the pool, without an app context."""
+        digest = image_derivatives.content_hash(path)
+        derived = []
+        if image_derivatives.available():
+            try:
+                derived = image_derivatives.generate(path, path + ".derived")
+            except Exception:
+                logger.warning("Could not render variants of %s; storing the original only", path, exc_info=True)
+        return digest, derived
+
+    def _publish(self, image, job, digest, derived):
+        image.content_hash = digest
+        stored = Image.query.filter(
+            Image.content_hash == digest, Image.status == "ready", Image.id != image.id
+        ).first()
+        if stored is not None and (stored.variants or not derived):
+            image.url, image.variants = stored.url, stored.variants
+            return
+        ext = os.path.splitext(job["path"])[1].lower() or ".jpg"
+        image.url = self._push(job, job["path"], image_derivatives.content_key(digest, f"original{ext}"))
+        variants = {}
+        for name, fmt, path, (width, height) in derived:
+            entry = variants.setdefault(name, {"width": width, "height": height})
+            entry[fmt] = self._push(job, path, image_derivatives.content_key(digest, f"{name}.{fmt}"))
+        image.variants = variants or None
+
+    def _process(self, jobs):
+        pending = {
+            image.id: image
+            for image in Image.query.filter(Image.id.in_([job["image_id"] for job in jobs]), Image.status == "pending")
+        }
+        # Hashing and resizing is CPU-bound (Pillow releases the GIL), so the
+        # whole batch is prepared in parallel; the database work stays here.
+        prepared = {
+            job["image_id"]: self.pool.submit(self._prepare, job["path"])
+            for job in jobs if job["image_id"] in pending
+        }
+        for job in jobs:
+            image = pending.get(job["image_id"])
+            if image is None:
+                self._discard(job["path"])
+                continue
+            try:
+                self._publish(image, job, *prepared[image.id].result())
+                image.status = "ready"
+            except Exception:
+                logger.exception("Giving up on image %s", job["image_id"])
+                image.status = "failed"
+            db.session.commit()
+            shutil.rmtree(job["path"] + ".derived", ignore_errors=True)
+            if image.status == "ready":
+                self._discard(job["path"])
+
+    def _discard(self, path):
+        shutil.rmtree(path + ".derived", ignore_errors=True)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def resume(self, base_url):
+        """Re-queue spooled files whose Image is still pending. Returns the count."""
+        directory = current_app.config["IMAGE_SPOOL_DIR"]
+        if not os.path.isdir(directory):
+            return 0
+        spooled = {}
+        for name in os.listdir(directory):
+            image_id, _, _ = name.partition("-")
+            if image_id.isdigit() and os.path.isfile(os.path.join(directory, name)):
+                spooled[int(image_id)] = os.path.join(directory, name)
+        pending = db.session.query(Image.id).filter(Image.id.in_(spooled), Image.status == "pending")
+        count = 0
+        for (image_id,) in pending:
+            self.enqueue(image_id, spooled[image_id], base_url)
+            count += 1
+        return count
+
+
+image_uploads = ImageUploads()
+
+images_cli = AppGroup("images", help="Image upload pipeline.")
+
+
+@images_cli.command("resume")
+@click.option("--base-url", default="http://localhost:5000", help="Public base URL for locally stored images.")
+def resume_command(base_url):
+    """Re-queue pending uploads left in the spool and wait for them."""
+    count = image_uploads.resume(base_url)
+    image_uploads.flush()
+    click.echo(f"Processed {count} pending upload(s).")
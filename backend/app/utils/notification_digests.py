@@ -0,0 +1,154 @@
+# app/utils/notification_digests.py
+"""
+Hourly / daily visit digests for admins.
+
+By default every logged visit writes one notification per admin. Admins who set
+notification_digest to "hourly" or "daily" are skipped by
+notify_admins(realtime_only=True) and instead receive one summary row per
+period. The visits table itself is the buffer: a digest counts the visits
+created since the admin's digest_sent_through watermark, so nothing extra is
+written per visit.
+
+Watermarks are aligned to period boundaries, so admins on the same schedule
+share one aggregate query. Switching back to real-time sends a summary of the
+partial period at once and clears the watermark.
+
+Run with `flask notifications send-digests`, or let the scheduled task check
+every NOTIFICATION_DIGEST_INTERVAL seconds (0 disables).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import bindparam, func, select, update
+
+from database import db
+from app.models.user import User
+from app.models.visit import Visit
+from app.utils.background import PeriodicTask, advisory_lock
+from app.utils.notifications import notification_dispatcher, notifications_cli
+
+logger = logging.getLogger(__name__)
+
+_LOCK_KEY = 724310916
+
+DIGEST_MODES = ("realtime", "hourly", "daily")
+PERIODS = {"hourly": timedelta(hours=1), "daily": timedelta(days=1)}
+
+
+def period_start(moment, mode):
+    """Start of the hourly/daily period containing `moment`."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if mode == "daily" else moment
+
+
+def set_digest_mode(user, mode, now=None):
+    """Apply a preference from DIGEST_MODES to `user` (caller commits)."""
+    if mode not in DIGEST_MODES:
+        raise ValueError(f"notification digest must be one of {', '.join(DIGEST_MODES)}")
+    now = now or datetime.utcnow()
+    user.notification_digest = None if mode == "realtime" else mode
+    if mode == "realtime":
+        if user.digest_sent_through is not None:
+            # Summarize the partial period now; later visits arrive one by one
+            counts = _visit_counts(user.digest_sent_through, now)
+            if counts:
+                notification_dispatcher.dispatch([
+                    {"user_id": user.id, "message": _summary_message(user.digest_sent_through, now, counts)}
+                ])
+        user.digest_sent_through = None
+    elif user.digest_sent_through is None:
+        # Visits up to now were already delivered one by one
+        user.digest_sent_through = now
+
+
+def _summary_message(since, until, counts):
+    total = sum(count for _, count in counts)
+    names = ", ".join(f"{username} ({count})" for username, count in counts)
+    message = (
+        f"Visit summary {since.strftime('%Y-%m-%d %H:%M')} - {until.strftime('%Y-%m-%d %H:%M')} UTC: "
+        f"{total} visit(s) logged by {names}."
+    )
+    if len(message) > 255:
+        message = message[:240].rsplit(",", 1)[0] + ", and others."
+    return message
+
+
+def _visit_counts(since, until):
+    return db.session.execute(
+        select(User.username, func.count(Visit.id))
+        .join(User, User.id == Visit.user_id)
+        .where(Visit.created_at > since, Visit.created_at <= until)
+        .group_by(User.username)
+        .order_by(func.count(Visit.id).desc(), User.username)
+    ).all()
+
+
+def send_visit_digests(now=None):
+    """
+    Send every digest that is due. Returns the number of summary notifications
+    queued, or None if another process is already sending.
+    """
+    now = now or datetime.utcnow()
+    with advisory_lock(_LOCK_KEY) as acquired:
+        if not acquired:
+            return None
+        admins = db.session.query(User.id, User.notification_digest, User.digest_sent_through).filter(
+            User.role == "admin", User.notification_digest.in_(PERIODS), User.digest_sent_through.isnot(None)
+        ).all()
+
+        # (since, until) -> admin ids, so admins on the same schedule share a query
+        windows = defaultdict(list)
+        watermarks = []
+        for admin_id, mode, since in admins:
+            until = period_start(now, mode)
+            if until <= since:
+                continue
+            windows[(since, until)].append(admin_id)
+            watermarks.append({"b_id": admin_id, "b_through": until})
+
+        rows = []
+        for (since, until), admin_ids in windows.items():
+            counts = _visit_counts(since, until)
+            if counts:
+                message = _summary_message(since, until, counts)
+                rows.extend({"user_id": admin_id, "message": message} for admin_id in admin_ids)
+        notification_dispatcher.dispatch(rows)
+
+        if watermarks:
+            users = User.__table__
+            db.session.execute(
+                update(users).where(users.c.id == bindparam("b_id")).values(digest_sent_through=bindparam("b_through")),
+                watermarks,
+            )
+        db.session.commit()
+    if rows:
+        logger.info("Queued %d visit digest(s)", len(rows))
+    return len(rows)
+
+
+digest_task = PeriodicTask("visit-digests", send_visit_digests, interval=0)
+
+
+def init_app(app):
+    app.config.setdefault("NOTIFICATION_DIGEST_INTERVAL", 300)
+    interval = float(app.config["NOTIFICATION_DIGEST_INTERVAL"])
+    if interval > 0:
+        digest_task.interval = interval
+
+        # Started by the first request, so CLI commands and imports never spawn it
+        @app.before_request
+        def _start_digests():
+            digest_task.start(app)
+
+
+@notifications_cli.command("send-digests")
+def send_digests_command():
+    """Send hourly/daily visit digests that are due."""
+    sent = send_visit_digests()
+    if sent is None:
+        click.echo("Digests are already being sent by another process.")
+    else:
+        click.echo(f"Queued {sent} visit digest(s).")
+    notification_dispatcher.flush()
@@ -0,0 +1,256 @@
+# app/utils/notification_retention.py
+"""
+Notification retention.
+
+Every visit notifies every admin, so the notifications table grows as
+visits x admins. A retention run, in order:
+
+1. collapses "User X logged a visit ..." / "User X logged N visit(s) ..." rows older
+   than NOTIFICATION_DIGEST_AFTER_HOURS into one digest row per recipient per day,
+   reading one day of candidates at a time,
+2. deletes read notifications older than NOTIFICATION_RETENTION_READ_DAYS and
+   unread ones older than NOTIFICATION_RETENTION_UNREAD_DAYS.
+
+Rows are removed NOTIFICATION_RETENTION_BATCH_SIZE at a time, one transaction per
+batch, so a run never holds long locks. When NOTIFICATION_ARCHIVE_DIR is set,
+every removed row is first appended to a gzip-compressed NDJSON file there.
+
+Run it with `flask notifications prune`, typically from cron. Setting
+NOTIFICATION_RETENTION_INTERVAL (seconds; default 0, off) also runs it on a
+background thread in every web worker. On PostgreSQL an advisory
+lock keeps concurrent runs from several workers from overlapping.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import and_, delete, func, insert, or_, select
+
+from database import db
+from app.models.notification import Notification
+from app.utils.background import PeriodicTask, advisory_lock
+from app.utils.notifications import notifications_cli
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the retention job's advisory lock
+_LOCK_KEY = 724310915
+
+VISIT_MESSAGE = re.compile(r"^User (?P<actor>\S+) logged (?:a visit|(?P<count>\d+) visit\(s\))")
+
+_COLUMNS = (Notification.id, Notification.user_id, Notification.message, Notification.is_read, Notification.created_at)
+
+
+class _Archive:
+    """Appends removed rows to <dir>/notifications-<timestamp>.ndjson.gz, opened on first write."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = None
+        self._file = None
+        self.rows = 0
+
+    def write(self, rows):
+        if not self.directory or not rows:
+            return
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+            self.path = os.path.join(self.directory, f"notifications-{stamp}.ndjson.gz")
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+        for row in rows:
+            self._file.write(json.dumps({
+                "id": row.id,
+                "user_id": row.user_id,
+                "message": row.message,
+                "is_read": bool(row.is_read),
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }) + "\n")
+        # Written out before the rows are deleted
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _remove(rows, archive):
+    """Archive `rows` and delete them (caller commits)."""
+    archive.write(rows)
+    db.session.execute(
+        delete(Notification).where(Notification.id.in_([row.id for row in rows])).execution_options(
+            synchronize_session=False
+        )
+    )
+
+
+def _digest_message(day, actors):
+    total = sum(actors.values())
+    names = [f"{actor} ({count})" for actor, count in actors.most_common()]
+    message = f"Visit digest for {day.isoformat()}: {total} visit(s) logged by {', '.join(names)}."
+    if len(message) > 255:
+        message = message[:240].rsplit(",", 1)[0] + ", and others."
+    return message
+
+
+def _collapse_window(start, end, batch_size, archive):
+    """Collapse the visit notifications created in [start, end), which lies within one day."""
+    groups = defaultdict(lambda: {"ids": [], "actors": Counter(), "read": True, "latest": None})
+    candidates = select(*_COLUMNS).where(
+        Notification.created_at >= start, Notification.created_at < end, Notification.message.like("User % logged %")
+    ).execution_options(yield_per=batch_size)
+    for row in db.session.execute(candidates):
+        match = VISIT_MESSAGE.match(row.message)
+        if not match:
+            continue
+        group = groups[row.user_id]
+        group["ids"].append(row.id)
+        group["actors"][match.group("actor")] += int(match.group("count") or 1)
+        group["read"] = group["read"] and bool(row.is_read)
+        group["latest"] = max(group["latest"] or row.created_at, row.created_at)
+
+    collapsed = digests = 0
+    batch_ids, batch_digests = [], []
+
+    def flush_batch():
+        rows = db.session.execute(select(*_COLUMNS).where(Notification.id.in_(batch_ids))).all()
+        _remove(rows, archive)
+        db.session.execute(insert(Notification), batch_digests)
+        db.session.commit()
+        return len(rows)
+
+    for user_id, group in sorted(groups.items()):
+        if len(group["ids"]) < 2:
+            continue
+        batch_ids.extend(group["ids"])
+        batch_digests.append({
+            "user_id": user_id,
+            "message": _digest_message(start.date(), group["actors"]),
+            "is_read": group["read"],
+            "created_at": group["latest"],
+        })
+        if len(batch_ids) >= batch_size:
+            collapsed += flush_batch()
+            digests += len(batch_digests)
+            batch_ids, batch_digests = [], []
+    if batch_ids:
+        collapsed += flush_batch()
+        digests += len(batch_digests)
+    return collapsed, digests
+
+
+def collapse_visit_notifications(before, batch_size, archive):
+    """
+    Replace per-visit admin notifications older than `before` with daily digests.
+    Works through one day at a time, so memory is bounded by a single day's rows
+    however large the backlog is.
+    """
+    visit_rows = and_(Notification.created_at < before, Notification.message.like("User % logged %"))
+    collapsed = digests = 0
+    earliest = db.session.execute(select(func.min(Notification.created_at)).where(visit_rows)).scalar()
+    while earliest is not None:
+        day_start = datetime.combine(earliest.date(), time.min)
+        day_end = min(day_start + timedelta(days=1), before)
+        day_collapsed, day_digests = _collapse_window(day_start, day_end, batch_size, archive)
+        collapsed += day_collapsed
+        digests += day_digests
+        # Skip straight to the next day that has candidates
+        earliest = db.session.execute(
+            select(func.min(Notification.created_at)).where(visit_rows, Notification.created_at >= day_end)
+        ).scalar()
+    return collapsed, digests
+
+
+def prune_expired(now, read_days, unread_days, batch_size, archive):
+    """Delete notifications past their TTL, `batch_size` rows per transaction."""
+    expired = or_(
+        and_(Notification.is_read == db.true(), Notification.created_at < now - timedelta(days=read_days)),
+        and_(Notification.is_read == db.false(), Notification.created_at < now - timedelta(days=unread_days)),
+    )
+    deleted = 0
+    while True:
+        rows = db.session.execute(
+            select(*_COLUMNS).where(expired).limit(batch_size)
+        ).all()
+        if not rows:
+            return deleted
+        _remove(rows, archive)
+        db.session.commit()
+        deleted += len(rows)
+
+
+def run_retention(now=None, archive_dir=None):
+    """One retention pass with the app's settings. Returns counts, or None if another run holds the lock."""
+    config = current_app.config
+    now = now or datetime.utcnow()
+    batch_size = int(config["NOTIFICATION_RETENTION_BATCH_SIZE"])
+    archive = _Archive(archive_dir if archive_dir is not None else config["NOTIFICATION_ARCHIVE_DIR"])
+    with advisory_lock(_LOCK_KEY) as acquired:
+        if not acquired:
+            logger.info("Notification retention is already running elsewhere; skipping.")
+            return None
+        try:
+            collapsed, digests = 0, 0
+            if config["NOTIFICATION_DIGEST_AFTER_HOURS"]:
+                collapsed, digests = collapse_visit_notifications(
+                    now - timedelta(hours=float(config["NOTIFICATION_DIGEST_AFTER_HOURS"])), batch_size, archive
+                )
+            deleted = prune_expired(
+                now,
+                float(config["NOTIFICATION_RETENTION_READ_DAYS"]),
+                float(config["NOTIFICATION_RETENTION_UNREAD_DAYS"]),
+                batch_size,
+                archive,
+            )
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            archive.close()
+    result = {"collapsed": collapsed, "digests": digests, "deleted": deleted, "archive": archive.path}
+    logger.info("Notification retention: %s", result)
+    return result
+
+
+retention_task = PeriodicTask("notification-retention", run_retention, interval=0)
+
+
+def init_app(app):
+    app.config.setdefault("NOTIFICATION_RETENTION_READ_DAYS", 30)
+    app.config.setdefault("NOTIFICATION_RETENTION_UNREAD_DAYS", 90)
+    app.config.setdefault("NOTIFICATION_RETENTION_BATCH_SIZE", 1000)
+    app.config.setdefault("NOTIFICATION_ARCHIVE_DIR", None)
+    app.config.setdefault("NOTIFICATION_DIGEST_AFTER_HOURS", 24)
+    app.config.setdefault("NOTIFICATION_RETENTION_INTERVAL", 0)
+
+    interval = float(app.config["NOTIFICATION_RETENTION_INTERVAL"])
+    if interval > 0:
+        retention_task.interval = interval
+
+        # Started by the first request, so CLI commands and imports never spawn it
+        @app.before_request
+        def _start_retention():
+            retention_task.start(app)
+
+
+@notifications_cli.command("prune")
+@click.option("--archive-dir", default=None, help="Write removed rows here as NDJSON.gz (default: NOTIFICATION_ARCHIVE_DIR).")
+def prune_command(archive_dir):
+    """Collapse visit notifications into digests and delete expired notifications."""
+    result = run_retention(archive_dir=archive_dir)
+    if result is None:
+        click.echo("Another retention run is in progress.")
+        return
+    click.echo(
+        f"Collapsed {result['collapsed']} notification(s) into {result['digests']} digest(s); "
+        f"deleted {result['deleted']} expired notification(s)."
+    )
+    if result["archive"]:
+        click.echo(f"Archived to {result['archive']}")
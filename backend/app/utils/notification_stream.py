@@ -0,0 +1,183 @@
+# app/utils/notification_stream.py
+"""
+Live delivery of new notifications to GET /notification/stream (Server-Sent Events).
+
+Notifications are published once the transaction that wrote them has committed
+(see app.utils.notifications). Each connected stream subscribes to its user's
+channel on a broker:
+
+- LocalBroker: in-process queues (default). Only streams served by the process
+  that wrote the notification see it, which suits a single worker and tests.
+- RedisBroker: any client with Redis-style publish/pubsub, shared by all workers.
+  Configure with NOTIFICATION_BROKER=redis and NOTIFICATION_BROKER_URL, or pass a
+  broker to NotificationStream.init_app(app, broker=...).
+
+A subscriber that falls behind by more than NOTIFICATION_STREAM_QUEUE_SIZE events
+is closed; the browser reconnects with Last-Event-ID and the gap is replayed from
+the notifications table.
+
+Every open stream holds a server thread (or greenlet) until it ends, so the
+number of open streams is capped per process (NOTIFICATION_STREAM_MAX_SUBSCRIBERS)
+and per user (NOTIFICATION_STREAM_MAX_PER_USER). Keep the process cap below the
+worker's thread count so ordinary requests are still served.
+"""
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionClosed(Exception):
+    pass
+
+
+class LocalSubscription:
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        if self.overflowed:
+            raise SubscriptionClosed("Subscriber fell behind.")
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, user_id):
+        subscription = LocalSubscription(self, user_id, self.maxsize)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout):
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker:
+    def __init__(self, client, prefix="notifications:"):
+        self.client = client
+        self.prefix = prefix
+
+    def publish(self, user_id, event):
+        self.client.publish(f"{self.prefix}{user_id}", json.dumps(event))
+
+    def subscribe(self, user_id):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(f"{self.prefix}{user_id}")
+        return RedisSubscription(pubsub)
+
+
+class NotificationStream:
+    def __init__(self, app=None):
+        self.broker = None
+        self._open = defaultdict(int)
+        self._open_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, broker=None):
+        app.config.setdefault("NOTIFICATION_BROKER", "memory")
+        app.config.setdefault("NOTIFICATION_STREAM_HEARTBEAT", 15)
+        app.config.setdefault("NOTIFICATION_STREAM_MAX_SECONDS", 300)
+        app.config.setdefault("NOTIFICATION_STREAM_QUEUE_SIZE", 100)
+        app.config.setdefault("NOTIFICATION_STREAM_REPLAY_LIMIT", 100)
+        app.config.setdefault("NOTIFICATION_STREAM_MAX_SUBSCRIBERS", 32)
+        app.config.setdefault("NOTIFICATION_STREAM_MAX_PER_USER", 3)
+        app.config.setdefault("NOTIFICATION_STREAM_TOKEN_SECONDS", 60)
+
+        if broker is None and app.config["NOTIFICATION_BROKER"] == "redis":
+            try:
+                import redis
+                url = app.config.get("NOTIFICATION_BROKER_URL") or "redis://localhost:6379/0"
+                broker = RedisBroker(redis.Redis.from_url(url))
+            except ImportError:
+                app.logger.warning("redis is not installed; notification stream falls back to in-process delivery.")
+        if broker is not None:
+            self.broker = broker
+        elif self.broker is None:
+            self.broker = LocalBroker(maxsize=int(app.config["NOTIFICATION_STREAM_QUEUE_SIZE"]))
+        app.extensions["notification_stream"] = self
+
+    def publish(self, events):
+        """Publish committed notification events ({"id", "user_id", ...} dicts)."""
+        if self.broker is None:
+            return
+        for event in events:
+            try:
+                self.broker.publish(event["user_id"], event)
+            except Exception:
+                # Streams catch up from the table on reconnect
+                logger.exception("Could not publish notification %s", event.get("id"))
+
+    def subscribe(self, user_id):
+        return self.broker.subscribe(user_id)
+
+    def reserve(self, user_id, max_total, max_per_user):
+        """Claim a stream slot in this process; False if either limit is reached."""
+        with self._open_lock:
+            if sum(self._open.values()) >= max_total or self._open[user_id] >= max_per_user:
+                return False
+            self._open[user_id] += 1
+            return True
+
+    def release(self, user_id):
+        with self._open_lock:
+            self._open[user_id] -= 1
+            if self._open[user_id] <= 0:
+                del self._open[user_id]
+
+
+def format_event(event):
+    """One SSE message for a notification event."""
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+
+notification_stream = NotificationStream()
@@ -0,0 +1,195 @@
+# app/utils/notifications.py
+"""
+Notification fan-out.
+
+Routes hand the dispatcher a list of recipients instead of committing one
+Notification row at a time. Recipients are held on the session until it
+commits, and everything queued in that transaction is written with a single
+bulk INSERT, either:
+
+- "async" (default): the recipients go into notification_outbox inside the
+           caller's transaction, so they are durable as soon as the caller's own
+           rows are. After the commit a background worker moves outbox rows to
+           notifications and deletes them, one transaction per batch.
+- "sync":  straight into notifications, inside the caller's transaction.
+
+Select the mode with the NOTIFICATION_DISPATCH_MODE config value. The worker
+only holds wake-ups in memory: rows left in the outbox by a restarted worker
+are delivered by the next wake-up in any process, or by
+`flask notifications deliver`. On PostgreSQL workers claim outbox rows with
+FOR UPDATE SKIP LOCKED, so several processes can drain it at once.
+
+Unread counts are not stored: unread_count() counts through the
+(user_id, is_read, created_at) index, so fan-out never touches the users table.
+
+Every Notification written, by either path, is also collected on the session and
+published to notification_stream once the transaction commits, for clients
+connected to GET /notification/stream.
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, insert, or_, select
+
+from database import db
+from app.models.notification import Notification
+from app.models.notification_outbox import NotificationOutbox
+from app.models.user import User
+from app.utils.background import BackgroundQueue
+from app.utils.notification_stream import notification_stream
+
+notifications_cli = AppGroup("notifications", help="Notification maintenance.")
+
+_PENDING_KEY = "pending_notifications"
+_EVENTS_KEY = "notification_events"
+_OUTBOX_KEY = "notification_outbox_written"
+
+# Outbox rows moved to notifications per transaction
+_OUTBOX_BATCH_SIZE = 500
+
+
+def notification_event(row):
+    """Stream payload for a written notification (same fields as GET /notification/)."""
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "message": row.message,
+        "is_read": bool(row.is_read),
+        "created_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S") if row.created_at else None,
+    }
+
+
+def unread_count(user_id):
+    """
+    Unread notifications for `user_id`, counted through the
+    (user_id, is_read, created_at) index rather than kept in a counter, so
+    writing a notification never locks the recipient's users row.
+    """
+    return db.session.query(func.count(Notification.id)).filter(
+        Notification.user_id == user_id, Notification.is_read == db.false()
+    ).scalar()
+
+
+def _collect_events(session, flush_context):
+    created = [notification_event(obj) for obj in session.new if isinstance(obj, Notification)]
+    if created:
+        session.info.setdefault(_EVENTS_KEY, []).extend(created)
+
+
+class NotificationDispatcher:
+    def __init__(self, app=None):
+        self.worker = BackgroundQueue("notification-dispatcher", self._wake)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("NOTIFICATION_DISPATCH_MODE", "async")
+        app.extensions["notification_dispatcher"] = self
+        if not event.contains(db.session, "after_commit", self._after_commit):
+            event.listen(db.session, "after_flush", _collect_events)
+            event.listen(db.session, "before_commit", self._before_commit)
+            event.listen(db.session, "after_commit", self._after_commit)
+            event.listen(db.session, "after_rollback", self._after_rollback)
+
+    def dispatch(self, rows):
+        """
+        Queue notifications for delivery. `rows` is a list of
+        {"user_id": int, "message": str} dicts.
+        """
+        # Held on the session until it commits, so notifications are never
+        # written for data that was rolled back.
+        db.session().info.setdefault(_PENDING_KEY, []).extend(dict(row) for row in rows)
+
+    def notify_admins(self, message, exclude_user_id=None, realtime_only=False):
+        """
+        Queue `message` for every admin, optionally skipping one user. With
+        realtime_only, admins who chose digest delivery are skipped; they get the
+        event in their next summary (see notification_digests).
+        """
+        query = db.session.query(User.id).filter(User.role == "admin")
+        if exclude_user_id is not None:
+            query = query.filter(User.id != exclude_user_id)
+        if realtime_only:
+            query = query.filter(or_(User.notification_digest.is_(None), User.notification_digest == "realtime"))
+        self.dispatch([{"user_id": admin_id, "message": message} for (admin_id,) in query])
+
+    def flush(self):
+        """Block until this process's worker has handled every wake-up queued so far."""
+        self.worker.join()
+
+    def deliver_outbox(self, batch_size=_OUTBOX_BATCH_SIZE):
+        """
+        Move every row in notification_outbox to notifications, `batch_size` rows
+        per transaction. Returns the number delivered.
+        """
+        delivered = 0
+        try:
+            while True:
+                # Rows another process has claimed are skipped, not waited for
+                rows = db.session.execute(
+                    select(NotificationOutbox.id, NotificationOutbox.user_id,
+                           NotificationOutbox.message, NotificationOutbox.created_at)
+                    .order_by(NotificationOutbox.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                if not rows:
+                    db.session.commit()
+                    return delivered
+                self._insert([
+                    {"user_id": row.user_id, "message": row.message, "created_at": row.created_at} for row in rows
+                ])
+                db.session.execute(
+                    delete(NotificationOutbox).where(NotificationOutbox.id.in_([row.id for row in rows]))
+                )
+                db.session.commit()
+                delivered += len(rows)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _insert(self, rows):
+        written = db.session.execute(
+            insert(Notification).returning(
+                Notification.id, Notification.user_id, Notification.message,
+                Notification.is_read, Notification.created_at,
+            ),
+            rows,
+        ).all()
+        db.session().info.setdefault(_EVENTS_KEY, []).extend(notification_event(row) for row in written)
+
+    def _wake(self, wakeups):
+        # Any number of queued wake-ups is served by one pass over the outbox
+        self.deliver_outbox()
+
+    def _before_commit(self, session):
+        rows = session.info.pop(_PENDING_KEY, None)
+        if not rows:
+            return
+        if current_app.config["NOTIFICATION_DISPATCH_MODE"] == "sync":
+            self._insert(rows)
+        else:
+            session.execute(insert(NotificationOutbox), rows)
+            session.info[_OUTBOX_KEY] = True
+
+    def _after_commit(self, session):
+        events = session.info.pop(_EVENTS_KEY, None)
+        if events:
+            notification_stream.publish(events)
+        if session.info.pop(_OUTBOX_KEY, False):
+            self.worker.start(current_app._get_current_object())
+            self.worker.put(True)
+
+    def _after_rollback(self, session):
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_EVENTS_KEY, None)
+        session.info.pop(_OUTBOX_KEY, None)
+
+
+notification_dispatcher = NotificationDispatcher()
+
+
+@notifications_cli.command("deliver")
+def deliver_command():
+    """Write notifications still waiting in the outbox (e.g. after a worker restart)."""
+    click.echo(f"Delivered {notification_dispatcher.deliver_outbox()} notification(s) from the outbox.")
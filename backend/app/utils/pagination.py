@@ -0,0 +1,168 @@
+# app/utils/pagination.py
+"""
+Helpers for page-number and keyset (cursor) pagination.
+
+A cursor is an opaque, URL-safe token that encodes the sort key of the last row
+returned. The next page seeks past that key instead of using OFFSET, so the
+cost of a page stays the same no matter how deep into the table the client is.
+"""
+import base64
+import json
+import logging
+import math
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+
+from database import db
+from app.utils.cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_params(default_per_page=20, max_per_page=100):
+    """Read ?page= and ?per_page= from the request: page >= 1, per_page in [1, max_per_page]."""
+    try:
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", default_per_page))
+    except ValueError:
+        page, per_page = 1, default_per_page
+    return max(1, page), max(1, min(per_page, max_per_page))
+
+
+def count_mode_param():
+    """Read ?count=exact|estimate|none (default exact)."""
+    mode = request.args.get("count", "exact")
+    return mode if mode in COUNT_MODES else "exact"
+
+
+class Page:
+    def __init__(self, items, page, per_page, total, has_next, total_estimated=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.total_estimated = total_estimated
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return math.ceil(self.total / self.per_page) if self.total else 0
+
+    def meta(self):
+        return {
+            "page": self.page,
+            "per_page": self.per_page,
+            "total": self.total,
+            "pages": self.pages,
+            "has_next": self.has_next,
+            "total_estimated": self.total_estimated,
+        }
+
+
+def _planner_estimate(query):
+    """Row estimate for `query` from PostgreSQL's planner statistics, or None."""
+    connection = db.session.connection()
+    if connection.dialect.name != "postgresql":
+        return None
+    compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+    try:
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        logger.exception("Could not read planner estimate; falling back to COUNT(*).")
+        return None
+
+
+def paginate(query, page, per_page, count="exact", count_key=None):
+    """
+    Page-number pagination with a configurable cost for the total:
+
+    - exact:    COUNT(*) on every request (the Flask-SQLAlchemy default).
+    - estimate: a cached count for this filter, else the planner's row estimate
+                on PostgreSQL, else a COUNT(*) that is then cached.
+    - none:     no count; fetch one extra row to report has_next.
+
+    `count_key` is (namespace, params, tags) for the count cache; the cache tags
+    invalidate cached counts when the underlying tables are written.
+    """
+    page = max(page, 1)
+    if count == "exact":
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        if count_key:
+            response_cache.store(*count_key, pagination.total)
+        return Page(pagination.items, page, per_page, pagination.total, pagination.has_next)
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+    if count == "none":
+        return Page(items, page, per_page, None, has_next)
+
+    total = response_cache.lookup(*count_key) if count_key else None
+    estimated = False
+    if total is None:
+        total = _planner_estimate(query)
+        estimated = total is not None
+    if total is None:
+        total = query.order_by(None).count()
+        if count_key:
+            response_cache.store(*count_key, total)
+    # The estimate can never be below what this page has already proven exists
+    total = max(total, (page - 1) * per_page + len(items) + (1 if has_next else 0))
+    return Page(items, page, per_page, total, has_next, total_estimated=estimated)
+
+
+def limit_param(default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Read ?limit= from the request, clamped to [1, maximum]."""
+    try:
+        limit = int(request.args.get("limit", default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor produced by encode_cursor into (datetime, id)."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise InvalidCursor("Invalid cursor.")
+
+
+def seek_before(sort_col, id_col, cursor):
+    """Filter clause for rows after `cursor` in (sort_col DESC, id_col DESC) order."""
+    sort_value, row_id = cursor
+    return or_(sort_col < sort_value, and_(sort_col == sort_value, id_col < row_id))
+
+
+def cut_page(rows, limit, key):
+    """
+    Trim a result fetched with `limit + 1` rows to `limit` and build the next
+    cursor from the last row kept. `key` maps a row to its (sort, id) values.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
@@ -0,0 +1,98 @@
+# app/utils/passwords.py
+"""
+Password hashing off the request thread.
+
+bcrypt is deliberately slow (hundreds of milliseconds per hash or verify). Running
+it inline lets a burst of logins occupy every request worker. Instead, hashes and
+verifies run on a small bounded pool:
+
+- at most PASSWORD_HASH_WORKERS run at once (threads by default; bcrypt releases
+  the GIL, so threads scale across cores, or set PASSWORD_HASH_EXECUTOR=process),
+- at most PASSWORD_HASH_MAX_PENDING more may wait for a free worker,
+- anything beyond that, or a wait longer than PASSWORD_HASH_TIMEOUT seconds, raises
+  PasswordHasherBusy, which is answered with 503 and a Retry-After header.
+
+Outside an application that called init_app (scripts, shells) hashing runs inline.
+Hashes are plain bcrypt ($2b$), compatible with those written by Flask-Bcrypt.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+from flask import current_app, has_app_context, jsonify
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _verify(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:  # Malformed stored hash
+        return False
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+        app.config.setdefault("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 16)
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10)
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+
+        workers = int(app.config["PASSWORD_HASH_WORKERS"])
+        executor_cls = ProcessPoolExecutor if app.config["PASSWORD_HASH_EXECUTOR"] == "process" else ThreadPoolExecutor
+        app.extensions["password_hasher"] = {
+            "executor": executor_cls(max_workers=workers),
+            "slots": threading.BoundedSemaphore(workers + int(app.config["PASSWORD_HASH_MAX_PENDING"])),
+            "timeout": float(app.config["PASSWORD_HASH_TIMEOUT"]),
+        }
+
+        @app.errorhandler(PasswordHasherBusy)
+        def _busy(error):
+            response = jsonify({"error": "Server is busy, please retry shortly."})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+
+    def _run(self, fn, *args):
+        state = current_app.extensions.get("password_hasher") if has_app_context() else None
+        if state is None:
+            return fn(*args)
+        # Reject at once rather than queueing without bound
+        if not state["slots"].acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full.")
+        try:
+            future = state["executor"].submit(fn, *args)
+        except Exception:
+            state["slots"].release()
+            raise
+        future.add_done_callback(lambda _: state["slots"].release())
+        try:
+            return future.result(timeout=state["timeout"])
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("Password hashing timed out.")
+
+    def _rounds(self):
+        return int(current_app.config.get("BCRYPT_LOG_ROUNDS", 12)) if has_app_context() else 12
+
+    def hash(self, password):
+        return self._run(_hash, password, self._rounds())
+
+    def verify(self, password, password_hash):
+        if not password or not password_hash:
+            return False
+        return self._run(_verify, password, password_hash)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,62 @@
+# app/utils/search.py
+"""
+Name search shared by the product catalogue and visit listings.
+
+On PostgreSQL the substring filter is an ILIKE served by a pg_trgm GIN index and
+results are ranked with similarity(). Prefix autocomplete uses a
+lower(column) text_pattern_ops index. Other databases use the same SQL without
+the trigram functions and rank exact > prefix > substring matches instead.
+The indexes are created by migration 0b9e7d52c6a1_search_indexes.
+"""
+from sqlalchemy import case, func
+
+from database import db
+
+SUGGEST_LIMIT = 10
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _is_postgres():
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def contains_filter(column, term):
+    """Case-insensitive substring match on `column`."""
+    return column.ilike(f"%{_escape_like(term)}%", escape="\\")
+
+
+def prefix_filter(column, term):
+    """Case-insensitive prefix match that can use the lower(column) index."""
+    return func.lower(column).like(f"{_escape_like(term.lower())}%", escape="\\")
+
+
+def relevance_order(column, term):
+    """ORDER BY clauses ranking the best matches for `term` first."""
+    if _is_postgres():
+        return [func.similarity(column, term).desc(), func.length(column)]
+    lowered = func.lower(column)
+    term = term.lower()
+    rank = case(
+        (lowered == term, 0),
+        (prefix_filter(column, term), 1),
+        else_=2,
+    )
+    return [rank, func.length(column)]
+
+
+def suggest(column, term, query=None, limit=SUGGEST_LIMIT):
+    """Distinct values of `column` starting with `term`, shortest first."""
+    # GROUP BY rather than DISTINCT: PostgreSQL rejects SELECT DISTINCT ordered
+    # by an expression (length) that is not in the select list.
+    query = query if query is not None else db.session.query(column)
+    rows = (
+        query.with_entities(column)
+        .filter(prefix_filter(column, term))
+        .group_by(column)
+        .order_by(func.length(column), column)
+        .limit(limit)
+    )
+    return [value for (value,) in rows]
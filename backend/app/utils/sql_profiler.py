@@ -0,0 +1,134 @@
+# app/utils/sql_profiler.py
+"""
+Per-request SQL profiling.
+
+SQLAlchemy cursor events time every statement a request runs. When the request
+finishes, the totals are:
+
+- sent as a Server-Timing header (`db;dur=<ms>;desc="<n> queries", app;dur=<ms>`),
+  so browser dev tools show database time next to the network timing. Any client
+  can read it, so SQL_PROFILING_SERVER_TIMING is off unless the configuration
+  turns it on (DevelopmentConfig does), and
+- logged on the "app.sql" logger as one JSON line with the method, endpoint,
+  status, query count, database and request time, the slowest statements and
+  the most repeated one (the usual sign of an N+1 loop).
+
+Requests slower than SQL_PROFILING_SLOW_REQUEST_MS, running more than
+SQL_PROFILING_MAX_QUERIES statements, or with a statement slower than
+SQL_PROFILING_SLOW_QUERY_MS are logged as warnings; everything else at DEBUG.
+Bind parameters are never recorded.
+
+Work outside a request (background workers, CLI commands) is not profiled.
+SQLALCHEMY_ECHO remains available for statement-by-statement output.
+"""
+import json
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.sql")
+
+_STATEMENT_CHARS = 300
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.slowest = []  # (seconds, statement), slowest first
+
+    def record(self, statement, seconds, keep):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if keep and (len(self.slowest) < keep or seconds > self.slowest[-1][0]):
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[keep:]
+
+
+def _shorten(statement):
+    return " ".join(statement.split())[:_STATEMENT_CHARS]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and "sql_profile" in g:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile_started", None)
+    if started is None:
+        return
+    profile = g.get("sql_profile")
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - started, current_app.config["SQL_PROFILING_TOP_STATEMENTS"])
+
+
+def _start_profile():
+    if current_app.config["SQL_PROFILING"]:
+        g.sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    # Popped so statements run while a streamed body is generated are not counted
+    profile = g.pop("sql_profile", None)
+    if profile is None:
+        return response
+    config = current_app.config
+    db_ms = profile.seconds * 1000
+    request_ms = (time.perf_counter() - profile.started) * 1000
+
+    if config["SQL_PROFILING_SERVER_TIMING"]:
+        response.headers.add(
+            "Server-Timing", f'db;dur={db_ms:.1f};desc="{profile.count} queries", app;dur={request_ms:.1f}'
+        )
+
+    flags = []
+    if request_ms > config["SQL_PROFILING_SLOW_REQUEST_MS"]:
+        flags.append("slow_request")
+    if profile.count > config["SQL_PROFILING_MAX_QUERIES"]:
+        flags.append("too_many_queries")
+    if profile.slowest and profile.slowest[0][0] * 1000 > config["SQL_PROFILING_SLOW_QUERY_MS"]:
+        flags.append("slow_query")
+
+    summary = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "queries": profile.count,
+        "db_ms": round(db_ms, 1),
+        "request_ms": round(request_ms, 1),
+        "slowest": [{"ms": round(seconds * 1000, 1), "sql": _shorten(sql)} for seconds, sql in profile.slowest],
+        "flags": flags,
+    }
+    if profile.statements:
+        statement, count = profile.statements.most_common(1)[0]
+        if count > 1:
+            summary["most_repeated"] = {"count": count, "sql": _shorten(statement)}
+    logger.log(logging.WARNING if flags else logging.DEBUG, json.dumps(summary), extra={"sql_profile": summary})
+    return response
+
+
+def init_app(app):
+    app.config.setdefault("SQL_PROFILING", True)
+    app.config.setdefault("SQL_PROFILING_SERVER_TIMING", False)
+    app.config.setdefault("SQL_PROFILING_SLOW_REQUEST_MS", 500)
+    app.config.setdefault("SQL_PROFILING_SLOW_QUERY_MS", 100)
+    app.config.setdefault("SQL_PROFILING_MAX_QUERIES", 30)
+    app.config.setdefault("SQL_PROFILING_TOP_STATEMENTS", 3)
+
+    # Class-level listeners cover every engine; they only time statements of
+    # requests that _start_profile marked.
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
@@ -0,0 +1,150 @@
+# app/utils/visit_stats.py
+"""
+Incremental maintenance of the visit_rollups table.
+
+Every visit counts once per (period, dimension) pair: in its day, week
+(starting Monday) and month, under its doctor, location and marketer (user).
+Routes that change visits call record_visit_changes() in the same transaction,
+so the rollups always match the visits table and stats queries never have to
+scan it.
+
+There is no stored overall total: a single row per period that every visit
+increments would serialize all visit writes on its row lock. The "total"
+dimension is summed from the per-user rows when it is queried. Rows are upserted
+in key order so concurrent transactions lock shared buckets in the same order
+and cannot deadlock on each other.
+"""
+from collections import Counter
+from datetime import timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from app.models.visit import Visit
+from app.models.visit_rollup import VisitRollup
+
+PERIODS = ("day", "week", "month")
+# Dimensions kept in visit_rollups; "total" is derived from "user" at query time
+STORED_DIMENSIONS = ("doctor", "location", "user")
+DIMENSIONS = STORED_DIMENSIONS + ("total",)
+
+visit_stats_cli = AppGroup("visit-stats", help="Maintain pre-aggregated visit statistics.")
+
+
+def period_start(period, when):
+    day = when.date() if hasattr(when, "date") else when
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def snapshot(visit):
+    """The fields of a visit that its rollups depend on."""
+    return (visit.user_id, visit.doctor_name, visit.location, visit.visit_date)
+
+
+def _rollup_keys(snap):
+    user_id, doctor_name, location, visit_date = snap
+    dimension_keys = {
+        "doctor": doctor_name,
+        "location": location,
+        "user": str(user_id),
+    }
+    for period in PERIODS:
+        start = period_start(period, visit_date)
+        for dimension in STORED_DIMENSIONS:
+            yield (period, start, dimension, dimension_keys[dimension])
+
+
+def _deltas(added, removed):
+    deltas = Counter()
+    for snap in added:
+        for key in _rollup_keys(snap):
+            deltas[key] += 1
+    for snap in removed:
+        for key in _rollup_keys(snap):
+            deltas[key] -= 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def record_visit_changes(added=(), removed=()):
+    """
+    Apply the rollup deltas for visits added and removed in the current
+    transaction. An update is a removal of the old snapshot plus an addition of
+    the new one; unchanged keys cancel out.
+    """
+    deltas = _deltas(added, removed)
+    if not deltas:
+        return
+    rows = [
+        {"period": p, "period_start": s, "dimension": d, "dimension_key": k, "visit_count": delta}
+        for (p, s, d, k), delta in sorted(deltas.items())
+    ]
+
+    dialect = db.session.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is not None:
+        # One multi-row upsert for every affected bucket. Deltas are pre-aggregated
+        # so no row is touched twice by the statement.
+        stmt = insert(VisitRollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period", "period_start", "dimension", "dimension_key"],
+            set_={"visit_count": VisitRollup.visit_count + stmt.excluded.visit_count},
+        )
+        db.session.execute(stmt)
+        return
+
+    # Portable fallback for dialects without an upsert
+    for row in rows:
+        updated = db.session.query(VisitRollup).filter_by(
+            period=row["period"],
+            period_start=row["period_start"],
+            dimension=row["dimension"],
+            dimension_key=row["dimension_key"],
+        ).update({VisitRollup.visit_count: VisitRollup.visit_count + row["visit_count"]},
+                 synchronize_session=False)
+        if not updated:
+            db.session.add(VisitRollup(**row))
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Recompute all rollups from the visits table. Returns the number of visits counted.
+
+    On PostgreSQL the visits table is locked in SHARE mode for the whole rebuild:
+    reads continue, but visit writes wait until the new rollups are committed, so
+    none is lost or counted twice. On other databases run it while nothing else
+    writes visits.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE visits IN SHARE MODE"))
+    stmt = select(Visit.user_id, Visit.doctor_name, Visit.location, Visit.visit_date).execution_options(
+        yield_per=batch_size
+    )
+    visits = 0
+    counts = Counter()
+    for snap in db.session.execute(stmt):
+        visits += 1
+        for key in _rollup_keys(tuple(snap)):
+            counts[key] += 1
+
+    db.session.query(VisitRollup).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(VisitRollup, [
+        {"period": p, "period_start": s, "dimension": d, "dimension_key": k, "visit_count": n}
+        for (p, s, d, k), n in counts.items()
+    ])
+    db.session.commit()
+    return visits
+
+
+@visit_stats_cli.command("rebuild")
+@click.option("--batch-size", default=1000, show_default=True, help="Visits fetched per round-trip.")
+def rebuild_command(batch_size):
+    """Recompute visit_rollups from scratch (run once after migrating; visit writes wait meanwhile)."""
+    visits = rebuild_rollups(batch_size=batch_size)
+    click.echo(f"Rebuilt visit statistics from {visits} visits.")
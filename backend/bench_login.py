@@ -0,0 +1,88 @@
+# bench_login.py
+"""
+Benchmark token renewal: re-authenticating with POST /auth/login (a bcrypt
+verify per call) versus rotating a refresh token with POST /auth/refresh.
+
+Runs against the database named by BENCH_DATABASE_URL, which must be set
+explicitly and should be a throwaway database: missing tables are created there
+and a temporary user is added (and deleted afterwards).
+
+Usage: BENCH_DATABASE_URL=postgresql://.../wms_bench python bench_login.py [requests] [threads]
+"""
+
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+if not os.environ.get("BENCH_DATABASE_URL"):
+    sys.exit("Set BENCH_DATABASE_URL to a throwaway database; the benchmark creates tables and users there.")
+# Read by config.py at import time, so it must be set before the app is imported
+os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+
+from app import create_app
+from app.models.user import User
+from database import db
+
+
+def _run(label, count, threads, session, seeds):
+    """Run session(seed, n) on `threads` workers, n = count / threads calls each."""
+    per_thread = max(count // threads, 1)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = [status for batch in pool.map(session, seeds, [per_thread] * threads) for status in batch]
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for status in statuses if status != 200)
+    print(f"{label:<8} {len(statuses)} requests, {threads} thread(s): {elapsed:.2f}s, "
+          f"{len(statuses) / elapsed:.1f} req/s, {1000 * elapsed / len(statuses):.1f} ms/req, {failed} failed")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    app = create_app()
+    app.logger.setLevel("WARNING")
+    client = app.test_client()
+    suffix = uuid.uuid4().hex[:8]
+    email, password = f"bench-{suffix}@example.com", "bench-password"
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        user = User(username=f"bench-{suffix}", email=email, role="user")
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    def login():
+        return client.post("/auth/login", json={"email": email, "password": password})
+
+    def login_session(_, n):
+        return [login().status_code for _ in range(n)]
+
+    def refresh_session(token, n):
+        # Each worker rotates its own refresh token chain, as one client would
+        statuses = []
+        for _ in range(n):
+            response = client.post("/auth/refresh", headers={"Authorization": f"Bearer {token}"})
+            statuses.append(response.status_code)
+            if response.status_code != 200:
+                break
+            token = response.json["refresh_token"]
+        return statuses
+
+    try:
+        _run("login", count, threads, login_session, [None] * threads)
+        tokens = [login().json["refresh_token"] for _ in range(threads)]
+        _run("refresh", count, threads, refresh_session, tokens)
+    finally:
+        with app.app_context():
+            db.session.delete(db.session.get(User, user_id))
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
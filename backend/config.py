@@ -1,5 +1,6 @@
 # app/config.py
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -13,6 +14,19 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Print every SQL statement (noisy; prefer the per-request profile below)
+    SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "False").lower() in ("true", "1", "t")
+
+    # Per-request SQL profiling: one "app.sql" log line per request, a warning when
+    # it is slower than SLOW_REQUEST_MS, runs more than MAX_QUERIES statements or has
+    # a statement slower than SLOW_QUERY_MS. The Server-Timing header shows DB time
+    # and query counts to any client, so it is only on by default in development.
+    SQL_PROFILING = os.getenv("SQL_PROFILING", "True").lower() in ("true", "1", "t")
+    SQL_PROFILING_SERVER_TIMING = os.getenv("SQL_PROFILING_SERVER_TIMING", "False").lower() in ("true", "1", "t")
+    SQL_PROFILING_SLOW_REQUEST_MS = float(os.getenv("SQL_PROFILING_SLOW_REQUEST_MS", "500"))
+    SQL_PROFILING_SLOW_QUERY_MS = float(os.getenv("SQL_PROFILING_SLOW_QUERY_MS", "100"))
+    SQL_PROFILING_MAX_QUERIES = int(os.getenv("SQL_PROFILING_MAX_QUERIES", "30"))
+    SQL_PROFILING_TOP_STATEMENTS = int(os.getenv("SQL_PROFILING_TOP_STATEMENTS", "3"))
 
     # Boolean environment variable handling
     DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
@@ -23,10 +37,71 @@ class Config:
     # Public API key for unauthenticated read-only endpoints
     # Public API key (static fallback). Override in environment for production security.
     PUBLIC_API_KEY = os.getenv("PUBLIC_API_KEY", "public-demo-key-12345")
+    # Cache-Control sent with /public responses (they also carry ETag / Last-Modified)
+    PUBLIC_CACHE_CONTROL = os.getenv("PUBLIC_CACHE_CONTROL", "public, max-age=60")
+    # Server-side cache for /public query results: "memory" (per process) or "redis" (shared)
+    PUBLIC_CACHE_BACKEND = os.getenv("PUBLIC_CACHE_BACKEND", "memory")
+    PUBLIC_CACHE_URL = os.getenv("PUBLIC_CACHE_URL")
+    PUBLIC_CACHE_TTL = int(os.getenv("PUBLIC_CACHE_TTL", "60"))
+    PUBLIC_CACHE_MAXSIZE = int(os.getenv("PUBLIC_CACHE_MAXSIZE", "512"))
+
+    # Notification fan-out: "async" commits recipients to an outbox table with the
+    # request and writes the notifications in a background worker; "sync" writes
+    # them in the request's own transaction.
+    NOTIFICATION_DISPATCH_MODE = os.getenv("NOTIFICATION_DISPATCH_MODE", "async")
+
+    # GET /notification/stream: "memory" (per process) or "redis" pub/sub shared by
+    # all workers; seconds between heartbeats and before the client must reconnect
+    NOTIFICATION_BROKER = os.getenv("NOTIFICATION_BROKER", "memory")
+    NOTIFICATION_BROKER_URL = os.getenv("NOTIFICATION_BROKER_URL")
+    NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", "15"))
+    NOTIFICATION_STREAM_MAX_SECONDS = float(os.getenv("NOTIFICATION_STREAM_MAX_SECONDS", "300"))
+    # Open streams allowed per process and per user (each holds a server thread)
+    NOTIFICATION_STREAM_MAX_SUBSCRIBERS = int(os.getenv("NOTIFICATION_STREAM_MAX_SUBSCRIBERS", "32"))
+    NOTIFICATION_STREAM_MAX_PER_USER = int(os.getenv("NOTIFICATION_STREAM_MAX_PER_USER", "3"))
+    # Lifetime of the stream-only tokens passed to the stream as ?jwt=
+    NOTIFICATION_STREAM_TOKEN_SECONDS = int(os.getenv("NOTIFICATION_STREAM_TOKEN_SECONDS", "60"))
+
+    # Notification retention: run `flask notifications prune` from cron, or set
+    # NOTIFICATION_RETENTION_INTERVAL to run it every N seconds in the app (default 0: off)
+    NOTIFICATION_RETENTION_READ_DAYS = float(os.getenv("NOTIFICATION_RETENTION_READ_DAYS", "30"))
+    NOTIFICATION_RETENTION_UNREAD_DAYS = float(os.getenv("NOTIFICATION_RETENTION_UNREAD_DAYS", "90"))
+    NOTIFICATION_RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "1000"))
+    NOTIFICATION_DIGEST_AFTER_HOURS = float(os.getenv("NOTIFICATION_DIGEST_AFTER_HOURS", "24"))
+    NOTIFICATION_ARCHIVE_DIR = os.getenv("NOTIFICATION_ARCHIVE_DIR")
+    NOTIFICATION_RETENTION_INTERVAL = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL", "0"))
+
+    # Seconds between checks for due hourly/daily admin visit digests (0 disables)
+    NOTIFICATION_DIGEST_INTERVAL = float(os.getenv("NOTIFICATION_DIGEST_INTERVAL", "300"))
+
+    # Lifetime of refresh tokens issued at login and rotated by /auth/refresh
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("JWT_REFRESH_TOKEN_DAYS", "14")))
+
+    # Seconds an authenticated user's id -> role snapshot is cached per process
+    AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+    # Bounded pool for bcrypt hashing/verification: concurrent hashes, extra waiting
+    # requests, and seconds to wait before answering 503
+    PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # Largest batch accepted by POST /visit/bulk
+    VISIT_BULK_MAX_ITEMS = int(os.getenv("VISIT_BULK_MAX_ITEMS", "1000"))
+
+    # Attempts per image before the upload worker falls back to local storage
+    # (IMAGE_SPOOL_DIR sets the spool directory; default: <instance>/upload_spool)
+    IMAGE_UPLOAD_ATTEMPTS = int(os.getenv("IMAGE_UPLOAD_ATTEMPTS", "3"))
+    # Threads hashing uploads and rendering their thumb/medium/large variants
+    IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    # POST /images/upload-batch: files copied to the spool at once, and files per request
+    IMAGE_SPOOL_WORKERS = int(os.getenv("IMAGE_SPOOL_WORKERS", "8"))
+    IMAGE_BATCH_MAX_FILES = int(os.getenv("IMAGE_BATCH_MAX_FILES", "50"))
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_ECHO = True  # Show SQL queries in console (for debugging)
+    SQL_PROFILING_SERVER_TIMING = os.getenv("SQL_PROFILING_SERVER_TIMING", "True").lower() in ("true", "1", "t")
 
 class ProductionConfig(Config):
     DEBUG = False
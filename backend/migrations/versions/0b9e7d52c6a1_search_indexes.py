@@ -0,0 +1,38 @@
+"""search indexes
+
+Revision ID: 0b9e7d52c6a1
+Revises: 6a4f0c1e9d38
+Create Date: 2026-10-18 12:48:33.270915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9e7d52c6a1'
+down_revision = '6a4f0c1e9d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Trigram GIN indexes serve ILIKE '%term%' and similarity() ranking;
+        # text_pattern_ops indexes serve lower(col) LIKE 'term%' autocomplete.
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_products_name_trgm ON products USING gin (name gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_visits_doctor_name_trgm ON visits USING gin (doctor_name gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_products_name_lower ON products (lower(name) text_pattern_ops)')
+        op.execute('CREATE INDEX ix_visits_doctor_name_lower ON visits (lower(doctor_name) text_pattern_ops)')
+    else:
+        op.create_index('ix_products_name_lower', 'products', [sa.text('lower(name)')], unique=False)
+        op.create_index('ix_visits_doctor_name_lower', 'visits', [sa.text('lower(doctor_name)')], unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_visits_doctor_name_trgm', table_name='visits')
+        op.drop_index('ix_products_name_trgm', table_name='products')
+    op.drop_index('ix_visits_doctor_name_lower', table_name='visits')
+    op.drop_index('ix_products_name_lower', table_name='products')
@@ -0,0 +1,26 @@
+"""visit keyset index
+
+Revision ID: 3f1d9c2a7b64
+Revises: a57b05ce163a
+Create Date: 2026-10-18 09:12:41.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d9c2a7b64'
+down_revision = 'a57b05ce163a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('visits', schema=None) as batch_op:
+        batch_op.create_index('ix_visits_visit_date_id', ['visit_date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('visits', schema=None) as batch_op:
+        batch_op.drop_index('ix_visits_visit_date_id')
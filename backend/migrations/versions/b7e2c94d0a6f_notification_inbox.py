@@ -0,0 +1,43 @@
+"""notification inbox indexes and unread counter
+
+Revision ID: b7e2c94d0a6f
+Revises: 2f8a6d3c9e15
+Create Date: 2026-10-18 17:03:52.208417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c94d0a6f'
+down_revision = '2f8a6d3c9e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE notifications SET is_read = false WHERE is_read IS NULL")
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+        batch_op.create_index('ix_notifications_user_id_is_read_created_at', ['user_id', 'is_read', 'created_at'], unique=False)
+        batch_op.create_index('ix_notifications_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        "UPDATE users SET unread_notifications = ("
+        "SELECT count(*) FROM notifications "
+        "WHERE notifications.user_id = users.id AND notifications.is_read = false)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_id_created_at')
+        batch_op.drop_index('ix_notifications_user_id_is_read_created_at')
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=True, server_default=None)
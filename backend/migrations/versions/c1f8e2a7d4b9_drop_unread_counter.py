@@ -0,0 +1,33 @@
+"""drop users.unread_notifications
+
+Revision ID: c1f8e2a7d4b9
+Revises: a84c2f7e5d19
+Create Date: 2026-10-18 21:14:37.482911
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1f8e2a7d4b9'
+down_revision = 'a84c2f7e5d19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unread counts come from ix_notifications_user_id_is_read_created_at instead
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        "UPDATE users SET unread_notifications = ("
+        "SELECT count(*) FROM notifications "
+        "WHERE notifications.user_id = users.id AND notifications.is_read = false)"
+    )
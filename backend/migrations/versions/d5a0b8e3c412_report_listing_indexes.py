@@ -0,0 +1,28 @@
+"""report listing indexes
+
+Revision ID: d5a0b8e3c412
+Revises: 8c27e4f05a19
+Create Date: 2026-10-18 10:41:09.632871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a0b8e3c412'
+down_revision = '8c27e4f05a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.create_index('ix_reports_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_reports_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_index('ix_reports_user_id_created_at')
+        batch_op.drop_index('ix_reports_created_at_id')
@@ -0,0 +1,28 @@
+"""drop stored visit totals
+
+Revision ID: e2c7f9a4b153
+Revises: d8a4b1e6f372
+Create Date: 2026-10-18 23:41:12.518307
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7f9a4b153'
+down_revision = 'd8a4b1e6f372'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The "total" dimension is now summed from the per-user rows at query time
+    op.execute("DELETE FROM visit_rollups WHERE dimension = 'total'")
+
+
+def downgrade():
+    op.execute(
+        "INSERT INTO visit_rollups (period, period_start, dimension, dimension_key, visit_count) "
+        "SELECT period, period_start, 'total', '', SUM(visit_count) FROM visit_rollups "
+        "WHERE dimension = 'user' GROUP BY period, period_start"
+    )
@@ -58,3 +58,149 @@ def test_admin_access_allowed(client, admin_token):
 
     assert response.status_code == 200
     assert response.json["message"] == "Admin Panel"
+
+
+def test_current_user_cached_and_invalidated(client, app):
+    """
+    The authenticated user is served from the user cache, and a role change made
+    through /user/users/<id> revokes the tokens issued with the old role.
+    """
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+    from database import db
+    from app.models.user import User
+
+    with app.app_context():
+        admin = User(username="cacheadmin", email="cacheadmin@test.com", role="admin")
+        member = User(username="cachemember", email="cachemember@test.com", role="user")
+        admin.set_password("admin123")
+        member.set_password("user123")
+        db.session.add_all([admin, member])
+        db.session.commit()
+        admin_headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id))}"}
+        member_headers = {"Authorization": f"Bearer {create_access_token(identity=str(member.id))}"}
+        member_id = member.id
+        engine = db.engine
+
+    assert client.get("/user/users", headers=member_headers).status_code == 403
+
+    user_selects = []
+
+    def count_user_select(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM USERS" in statement.upper():
+            user_selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_user_select)
+    try:
+        assert client.get("/user/users", headers=member_headers).status_code == 403
+    finally:
+        event.remove(engine, "before_cursor_execute", count_user_select)
+    assert user_selects == []
+
+    response = client.put(f"/user/users/{member_id}", json={"role": "admin"}, headers=admin_headers)
+    assert response.status_code == 200
+    # The old token carries the old role, so the role change revokes it
+    assert client.get("/user/users", headers=member_headers).status_code == 401
+    login = client.post("/auth/login", json={"email": "cachemember@test.com", "password": "user123"})
+    assert login.status_code == 200
+    fresh_headers = {"Authorization": f"Bearer {login.json['token']}"}
+    assert client.get("/user/users", headers=fresh_headers).status_code == 200
+
+
+def test_refresh_rotates_and_detects_reuse(client, app):
+    """
+    /auth/refresh exchanges a refresh token once; replaying it revokes the user's tokens.
+    """
+    from database import db
+    from app.models.user import User
+
+    with app.app_context():
+        member = User(username="refresher", email="refresher@test.com", role="user")
+        member.set_password("user123")
+        db.session.add(member)
+        db.session.commit()
+
+    login = client.post("/auth/login", json={"email": "refresher@test.com", "password": "user123"})
+    assert login.status_code == 200
+    first_refresh = login.json["refresh_token"]
+
+    rotated = client.post("/auth/refresh", headers={"Authorization": f"Bearer {first_refresh}"})
+    assert rotated.status_code == 200
+    assert rotated.json["refresh_token"] != first_refresh
+    new_access = {"Authorization": f"Bearer {rotated.json['token']}"}
+    assert client.get("/auth/protected", headers=new_access).status_code == 200
+
+    replay = client.post("/auth/refresh", headers={"Authorization": f"Bearer {first_refresh}"})
+    assert replay.status_code == 401
+    assert client.get("/auth/protected", headers=new_access).status_code == 401
+
+
+def test_login_rejected_when_password_pool_full(client, app):
+    """
+    With no free password-hashing slot, login answers 503 at once instead of queueing.
+    """
+    import threading
+
+    app.extensions["password_hasher"]["slots"] = threading.BoundedSemaphore(1)
+    app.extensions["password_hasher"]["slots"].acquire()
+    response = client.post("/auth/login", json={"email": "nobody@test.com", "password": "whatever"})
+    # Unknown emails never reach bcrypt
+    assert response.status_code == 401
+
+    from database import db
+    from app.models.user import User
+    with app.app_context():
+        member = User(username="stormy", email="stormy@test.com", password_hash="x")
+        db.session.add(member)
+        db.session.commit()
+
+    response = client.post("/auth/login", json={"email": "stormy@test.com", "password": "whatever"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_revocation_by_another_worker_applies_after_cache_ttl(client, app, user_token):
+    """
+    A token version bumped elsewhere (no local cache invalidation) is honoured
+    while this worker's cached entry is fresh and rejected once it expires.
+    """
+    from database import db
+    from app.models.user import User
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/auth/protected", headers=headers).status_code == 200
+
+    with app.app_context():
+        user = db.session.query(User).filter_by(email="user@test.com").first()
+        user.token_version = (user.token_version or 0) + 1
+        db.session.commit()
+        user_id = user.id
+
+    assert client.get("/auth/protected", headers=headers).status_code == 200
+    # Stands in for the AUTH_USER_CACHE_TTL running out
+    app.extensions["user_cache"].delete(str(user_id))
+    assert client.get("/auth/protected", headers=headers).status_code == 401
+
+
+def test_tokens_carry_role_and_version_claims_only(client, app):
+    """
+    Login and refresh issue the same claims, read from the users row; membership
+    is not part of the token.
+    """
+    from flask_jwt_extended import decode_token
+    from database import db
+    from app.models.user import User
+
+    with app.app_context():
+        member = User(username="grouped", email="grouped@test.com", role="user")
+        member.set_password("user123")
+        db.session.add(member)
+        db.session.commit()
+
+    refresh_token = client.post("/auth/login", json={"email": "grouped@test.com", "password": "user123"}).json["refresh_token"]
+    rotated = client.post("/auth/refresh", headers={"Authorization": f"Bearer {refresh_token}"})
+    assert rotated.status_code == 200
+    with app.app_context():
+        for token in (refresh_token, rotated.json["token"], rotated.json["refresh_token"]):
+            claims = decode_token(token)
+            assert (claims["role"], claims["ver"]) == ("user", 0) and "groups" not in claims
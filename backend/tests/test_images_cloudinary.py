@@ -1,10 +1,12 @@
+import hashlib
 import io
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 from app import create_app
 from database import db as _db
 from app.models.user import User
 from app.models.catalogue import Product
+from app.utils import image_derivatives
 
 @pytest.fixture
 def app():
@@ -49,31 +51,144 @@ def auth_headers(app):
         token = create_access_token(identity=str(user.id))
         return {"Authorization": f"Bearer {token}"}
 
-def test_upload_image_cloudinary(client, auth_headers, app):
-    import cloudinary
-    with app.app_context():
-        product = Product.query.first()
-        # Print Cloudinary config keys
-        print("Cloudinary config:")
-        print("cloud_name:", cloudinary.config().cloud_name)
-        print("api_key:", cloudinary.config().api_key)
-        print("api_secret:", cloudinary.config().api_secret)
-    # Use the actual attached image file for upload
-    with open("tests/download.jpeg", "rb") as img_file:
-        data = {
-            "file": (img_file, "download.jpeg"),
-            "name": "Test Image",
-            "color": "red",
-            "product_id": str(product.id)
-        }
+def test_upload_image_cloudinary(client, auth_headers, app, tmp_path):
+    """The worker hands spooled files to Cloudinary under their content-hash keys."""
+    from app.utils.image_uploads import image_uploads, CloudinaryStore
+
+    def fake_upload(path, public_id, **options):
+        return {"secure_url": f"https://res.cloudinary.com/demo/image/upload/{public_id}"}
+
+    app.config["IMAGE_SPOOL_DIR"] = str(tmp_path / "spool")
+    previous, image_uploads.store = image_uploads.store, CloudinaryStore()
+    try:
+        with app.app_context():
+            product = Product.query.first()
+        with patch("cloudinary.uploader.upload", side_effect=fake_upload) as upload:
+            with open("tests/download.jpeg", "rb") as img_file:
+                response = client.post(
+                    "/images/upload",
+                    data={"file": (img_file, "download.jpeg"), "name": "Test Image", "color": "red", "product_id": str(product.id)},
+                    headers=auth_headers,
+                )
+            assert response.status_code == 202
+            json_data = response.get_json()
+            assert "image_id" in json_data
+            assert json_data["message"] == "Image accepted for upload"
+
+            # Wait for the background worker, then poll for the final URL
+            image_uploads.flush()
+
+        with open("tests/download.jpeg", "rb") as img_file:
+            digest = hashlib.sha256(img_file.read()).hexdigest()
+        public_ids = [call.kwargs["public_id"] for call in upload.call_args_list]
+        assert f"cas/{digest[:2]}/{digest}/original" in public_ids
+        assert all(call.kwargs["overwrite"] is False for call in upload.call_args_list)
+        status = client.get(json_data["status_url"], headers=auth_headers)
+        assert status.status_code == 200
+        assert status.get_json()["status"] == "ready"
+        assert status.get_json()["url"] == f"https://res.cloudinary.com/demo/image/upload/cas/{digest[:2]}/{digest}/original"
+        assert list((tmp_path / "spool").iterdir()) == []
+    finally:
+        image_uploads.store = previous
+
+
+def test_upload_image_local_stand_in(client, auth_headers, app, tmp_path):
+    """Uploads go through the spool and worker; a LocalStore stands in for Cloudinary."""
+    from app.models.image import Image
+    from app.utils.image_uploads import image_uploads, LocalStore
+    app.config["IMAGE_SPOOL_DIR"] = str(tmp_path / "spool")
+    previous, image_uploads.store = image_uploads.store, LocalStore(str(tmp_path / "remote"))
+    try:
+        with app.app_context():
+            product = Product.query.first()
         response = client.post(
             "/images/upload",
-            data=data,
-            headers=auth_headers
+            data={"file": (io.BytesIO(b"fake image bytes"), "stand in.jpg"), "name": "Stand-in", "product_id": str(product.id)},
+            headers=auth_headers,
+        )
+        assert response.status_code == 202
+        image_id = response.get_json()["image_id"]
+        image_uploads.flush()
+
+        # Stored under its content hash; not an image, so no variants
+        digest = hashlib.sha256(b"fake image bytes").hexdigest()
+        key = f"cas/{digest[:2]}/{digest}/original.jpg"
+        status = client.get(f"/images/{image_id}/status", headers=auth_headers).get_json()
+        assert status["status"] == "ready"
+        assert status["url"].endswith(f"/static/images/{key}")
+        assert status["variants"] is None
+        assert (tmp_path / "remote" / key).read_bytes() == b"fake image bytes"
+        assert list((tmp_path / "spool").iterdir()) == []  # Spooled copy removed once uploaded
+        with app.app_context():
+            assert _db.session.get(Image, image_id).status == "ready"
+    finally:
+        image_uploads.store = previous
+
+
+@pytest.mark.skipif(not image_derivatives.available(), reason="Pillow is not installed")
+def test_upload_generates_deduplicated_variants(client, auth_headers, app, tmp_path):
+    from app.utils.image_uploads import image_uploads, LocalStore
+    from PIL import Image as PILImage
+    app.config["IMAGE_SPOOL_DIR"] = str(tmp_path / "spool")
+    previous, image_uploads.store = image_uploads.store, LocalStore(str(tmp_path / "remote"))
+    picture = io.BytesIO()
+    PILImage.new("RGB", (2000, 1000), "red").save(picture, format="PNG")
+    try:
+        with app.app_context():
+            product = Product.query.first()
+        image_ids = []
+        for filename in ("first.png", "second.png"):
+            response = client.post(
+                "/images/upload",
+                data={"file": (io.BytesIO(picture.getvalue()), filename), "name": filename, "product_id": str(product.id)},
+                headers=auth_headers,
+            )
+            assert response.status_code == 202
+            image_ids.append(response.get_json()["image_id"])
+            image_uploads.flush()
+
+        first, second = (client.get(f"/images/{i}/status", headers=auth_headers).get_json() for i in image_ids)
+        assert first["variants"]["thumb"]["width"] == 160 and first["variants"]["thumb"]["height"] == 80
+        assert first["variants"]["large"]["width"] == 1280
+        assert first["variants"]["medium"]["webp"].endswith("/medium.webp")
+        # The second upload has the same bytes and reuses the stored files
+        assert second["url"] == first["url"] and second["variants"] == first["variants"]
+        assert sum(1 for path in (tmp_path / "remote").rglob("*") if path.is_file()) == 7
+
+        headers = {"X-API-Key": app.config["PUBLIC_API_KEY"]}
+        listing = client.get(f"/public/images?product_id={product.id}", headers=headers).get_json()
+        assert listing["images"][0]["variants"]["thumb"]["jpeg"].endswith("/thumb.jpeg")
+    finally:
+        image_uploads.store = previous
+
+
+def test_upload_batch_accepts_many_files(client, auth_headers, app, tmp_path):
+    from app.utils.image_uploads import image_uploads, LocalStore
+    app.config["IMAGE_SPOOL_DIR"] = str(tmp_path / "spool")
+    previous, image_uploads.store = image_uploads.store, LocalStore(str(tmp_path / "remote"))
+    try:
+        with app.app_context():
+            product = Product.query.first()
+        files = [(io.BytesIO(f"photo {i}".encode()), f"photo{i}.jpg") for i in range(5)]
+        response = client.post(
+            "/images/upload-batch",
+            data={"files": files, "product_id": str(product.id), "color": "blue"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 202
+        accepted = response.get_json()["images"]
+        assert [image["name"] for image in accepted] == [f"photo{i}" for i in range(5)]
+        image_uploads.flush()
+
+        listing = client.get(f"/images/{product.id}", headers=auth_headers).get_json()["images"]
+        assert sorted(image["id"] for image in listing) == sorted(image["image_id"] for image in accepted)
+        assert all(image["status"] == "ready" and image["color"] == "blue" for image in listing)
+
+        mismatched = client.post(
+            "/images/upload-batch",
+            data={"files": [(io.BytesIO(b"x"), "a.jpg")], "names": ["a", "b"], "product_id": str(product.id)},
+            headers=auth_headers,
         )
-        print("Response JSON:", response.get_json())
-    assert response.status_code == 201
-    json_data = response.get_json()
-    assert json_data["url"].startswith("http")
-    assert "image_id" in json_data
-    assert json_data["message"] == "Image uploaded successfully"
+        assert mismatched.status_code == 400
+    finally:
+        image_uploads.store = previous
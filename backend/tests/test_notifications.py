@@ -0,0 +1,260 @@
+import pytest
+from database import db
+from app.models.notification import Notification
+from app.models.user import User
+
+
+@pytest.fixture
+def inbox(app, user_token):
+    """Five notifications for the regular user, oldest first."""
+    with app.app_context():
+        user = User.query.filter_by(email="user@test.com").first()
+        for i in range(5):
+            db.session.add(Notification(user_id=user.id, message=f"Notification {i}"))
+            db.session.commit()
+        return {"Authorization": f"Bearer {user_token}"}
+
+
+def test_inbox_is_paginated_and_filterable(client, inbox):
+    first = client.get("/notification/?limit=3", headers=inbox).get_json()
+    assert [n["message"] for n in first["notifications"]] == ["Notification 4", "Notification 3", "Notification 2"]
+    second = client.get(f"/notification/?limit=3&cursor={first['next_cursor']}", headers=inbox).get_json()
+    assert [n["message"] for n in second["notifications"]] == ["Notification 1", "Notification 0"]
+    assert second["next_cursor"] is None
+
+    assert client.put(f"/notification/{first['notifications'][0]['id']}/read", headers=inbox).status_code == 200
+    unread = client.get("/notification/?unread_only=true", headers=inbox).get_json()["notifications"]
+    assert len(unread) == 4 and all(not n["is_read"] for n in unread)
+
+
+def test_inbox_is_unpaged_unless_asked(client, inbox, monkeypatch):
+    monkeypatch.setattr("app.routes.notification.limit_param", lambda: 2)
+    listed = client.get("/notification/", headers=inbox).get_json()
+    assert len(listed["notifications"]) == 5 and listed["next_cursor"] is None
+
+
+def test_unread_count_follows_bulk_mark_read(client, inbox, app):
+    assert client.get("/notification/unread-count", headers=inbox).get_json() == {"unread": 5}
+
+    ids = [n["id"] for n in client.get("/notification/?limit=2", headers=inbox).get_json()["notifications"]]
+    response = client.put("/notification/read", json={"ids": ids}, headers=inbox)
+    assert response.status_code == 200
+    assert response.get_json()["updated"] == 2 and response.get_json()["unread"] == 3
+
+    # Already-read ids are not counted twice
+    assert client.put("/notification/read", json={"ids": ids}, headers=inbox).get_json()["updated"] == 0
+    assert client.put("/notification/read", json={"all": True}, headers=inbox).get_json()["updated"] == 3
+    assert client.get("/notification/unread-count", headers=inbox).get_json() == {"unread": 0}
+    assert client.put("/notification/read", json={}, headers=inbox).status_code == 400
+
+    with app.app_context():
+        assert Notification.query.filter_by(is_read=False).count() == 0
+
+
+def test_stream_replays_and_pushes_new_notifications(client, inbox, app, admin_token):
+    from app.utils.notification_stream import notification_stream, LocalBroker
+    app.config.update(NOTIFICATION_STREAM_HEARTBEAT=0.05, NOTIFICATION_STREAM_MAX_SECONDS=5,
+                      NOTIFICATION_DISPATCH_MODE="sync")
+    previous, notification_stream.broker = notification_stream.broker, LocalBroker()
+    try:
+        with app.app_context():
+            user = User.query.filter_by(email="user@test.com").first()
+            user_id = user.id
+            third_id = Notification.query.filter_by(user_id=user_id).order_by(Notification.id).all()[2].id
+
+        # Reconnect after the third notification: the last two are replayed
+        response = client.get("/notification/stream", headers={**inbox, "Last-Event-ID": str(third_id)}, buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b"retry:")
+        assert b"Notification 3" in next(chunks)
+        assert b"Notification 4" in next(chunks)
+        assert next(chunks) == b": keep-alive\n\n"
+
+        created = client.post("/notification/", json={"user_id": user_id, "message": "Pushed live"},
+                              headers={"Authorization": f"Bearer {admin_token}"})
+        assert created.status_code == 201
+        pushed = next(chunks)
+        assert pushed.startswith(b"id: ") and b"Pushed live" in pushed
+        response.close()
+    finally:
+        notification_stream.broker = previous
+
+
+def test_stream_limits_open_streams_per_user(client, inbox, app):
+    app.config.update(NOTIFICATION_STREAM_MAX_PER_USER=1, NOTIFICATION_STREAM_HEARTBEAT=0.05)
+    first = client.get("/notification/stream", headers=inbox, buffered=False)
+    assert first.status_code == 200
+
+    second = client.get("/notification/stream", headers=inbox, buffered=False)
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "1"
+
+    # Closing the first stream frees its slot, even though its body was never read
+    first.close()
+    third = client.get("/notification/stream", headers=inbox, buffered=False)
+    assert third.status_code == 200
+    third.close()
+
+
+def test_stream_query_string_takes_only_stream_tokens(client, inbox, app, user_token):
+    app.config.update(NOTIFICATION_STREAM_HEARTBEAT=0.05)
+    issued = client.post("/notification/stream-token", headers=inbox)
+    assert issued.status_code == 200 and issued.json["expires_in"] == 60
+    stream_token = issued.json["token"]
+
+    response = client.get(f"/notification/stream?jwt={stream_token}", buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+    # A full access token must not travel in the URL...
+    assert client.get(f"/notification/stream?jwt={user_token}").status_code == 401
+    # ...and a stream token opens nothing but the stream
+    assert client.get("/notification/unread-count",
+                      headers={"Authorization": f"Bearer {stream_token}"}).status_code == 401
+
+
+def test_retention_collapses_visits_and_prunes_expired(app, tmp_path):
+    import gzip
+    import json
+    from datetime import datetime, timedelta
+    from app.utils.notification_retention import run_retention
+    from app.utils.notifications import unread_count
+
+    now = datetime.utcnow()
+    with app.app_context():
+        admin = User(username="retention-admin", email="retention@test.com", role="admin")
+        admin.set_password("admin123")
+        db.session.add(admin)
+        db.session.commit()
+        two_days_ago = now - timedelta(days=2)
+        db.session.add_all([
+            Notification(user_id=admin.id, message="User alice logged a visit with Dr A at Clinic on 2026-01-01.", created_at=two_days_ago),
+            Notification(user_id=admin.id, message="User alice logged a visit with Dr B at Clinic on 2026-01-01.", created_at=two_days_ago),
+            Notification(user_id=admin.id, message="User bob logged 3 visit(s) from a synced device.", created_at=two_days_ago, is_read=True),
+            Notification(user_id=admin.id, message="User bob logged a visit with Dr C at Clinic today.", created_at=now),
+            Notification(user_id=admin.id, message="Old and read", created_at=now - timedelta(days=31), is_read=True),
+            Notification(user_id=admin.id, message="Old but unread", created_at=now - timedelta(days=31)),
+            Notification(user_id=admin.id, message="Very old and unread", created_at=now - timedelta(days=91)),
+        ])
+        db.session.commit()
+        app.config["NOTIFICATION_RETENTION_BATCH_SIZE"] = 2
+
+        result = run_retention(now=now, archive_dir=str(tmp_path))
+        assert result["collapsed"] == 3 and result["digests"] == 1 and result["deleted"] == 2
+
+        messages = [n.message for n in Notification.query.filter_by(user_id=admin.id).order_by(Notification.created_at)]
+        assert messages == [
+            "Old but unread",
+            f"Visit digest for {two_days_ago.date().isoformat()}: 5 visit(s) logged by bob (3), alice (2).",
+            "User bob logged a visit with Dr C at Clinic today.",
+        ]
+        db.session.expire_all()
+        assert unread_count(admin.id) == 3
+
+        with gzip.open(result["archive"], "rt") as archive:
+            archived = [json.loads(line)["message"] for line in archive]
+        assert len(archived) == 5 and "Very old and unread" in archived
+
+
+def test_retention_collapses_each_day_separately(app):
+    from datetime import datetime, timedelta
+    from app.utils.notification_retention import collapse_visit_notifications, _Archive
+
+    with app.app_context():
+        admin = User(username="days-admin", email="days@test.com", role="admin")
+        admin.set_password("admin123")
+        db.session.add(admin)
+        db.session.commit()
+        # Two busy days separated by an empty week, plus a lone visit that stays as is
+        for day, count in ((datetime(2026, 1, 1, 8), 3), (datetime(2026, 1, 9, 8), 2), (datetime(2026, 1, 10, 8), 1)):
+            for i in range(count):
+                db.session.add(Notification(user_id=admin.id, created_at=day + timedelta(hours=i),
+                                            message=f"User alice logged a visit with Dr {i} at Clinic."))
+        db.session.commit()
+
+        collapsed, digests = collapse_visit_notifications(datetime(2026, 2, 1), 100, _Archive(None))
+        assert (collapsed, digests) == (5, 2)
+        messages = [n.message for n in Notification.query.filter_by(user_id=admin.id).order_by(Notification.created_at)]
+        assert messages == [
+            "Visit digest for 2026-01-01: 3 visit(s) logged by alice (3).",
+            "Visit digest for 2026-01-09: 2 visit(s) logged by alice (2).",
+            "User alice logged a visit with Dr 0 at Clinic.",
+        ]
+
+
+def test_digest_admins_get_one_summary_instead_of_per_visit_rows(client, app, admin_token, user_token):
+    from datetime import datetime, timedelta
+    from app.models.visit import Visit
+    from app.utils.notification_digests import send_visit_digests
+    from app.utils.notifications import notification_dispatcher
+
+    app.config["NOTIFICATION_DISPATCH_MODE"] = "sync"
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    assert client.put("/user/me", json={"notificationDigest": "weekly"}, headers=admin_headers).status_code == 400
+    assert client.put("/user/me", json={"notificationDigest": "hourly"}, headers=admin_headers).status_code == 200
+    assert client.get("/user/me", headers=admin_headers).get_json()["notification_digest"] == "hourly"
+
+    for doctor in ("Dr A", "Dr B", "Dr C"):
+        response = client.post("/visit/", json={"doctor_name": doctor, "location": "Clinic", "visit_date": "2026-01-05 10:00:00"},
+                               headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 201
+    notification_dispatcher.flush()
+
+    with app.app_context():
+        admin = User.query.filter_by(role="admin").first()
+        assert Notification.query.filter_by(user_id=admin.id).count() == 0
+        # The period has not ended yet
+        assert send_visit_digests() == 0
+        assert send_visit_digests(now=datetime.utcnow() + timedelta(hours=1)) == 1
+        digests = Notification.query.filter_by(user_id=admin.id).all()
+        assert len(digests) == 1 and "3 visit(s) logged by user (3)" in digests[0].message
+        # The watermark moved past those visits, so they are not summarized twice
+        assert send_visit_digests(now=datetime.utcnow() + timedelta(hours=2)) == 0
+        assert Visit.query.count() == 3
+
+
+def test_async_dispatch_commits_an_outbox_that_survives_the_worker(client, app, admin_token, monkeypatch):
+    """
+    In async mode a visit commits its notifications to the outbox; if the worker
+    never runs (a restart), `flask notifications deliver` still writes them.
+    """
+    from app.models.notification_outbox import NotificationOutbox
+    from app.utils.notifications import notification_dispatcher, unread_count
+
+    from config import Config
+    assert Config.NOTIFICATION_DISPATCH_MODE == "async"
+    app.config["NOTIFICATION_DISPATCH_MODE"] = "async"
+    wakeups = []
+    monkeypatch.setattr(notification_dispatcher.worker, "start", lambda app: None)
+    monkeypatch.setattr(notification_dispatcher.worker, "put", wakeups.append)
+
+    response = client.post("/visit/", json={"doctor_name": "Dr Out", "location": "Box", "visit_date": "2026-01-05 10:00:00"},
+                           headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 201 and wakeups == [True]
+    with app.app_context():
+        admin = User.query.filter_by(email="admin@test.com").first()
+        # The caller's copy and the admin copy (the caller is the only admin)
+        assert NotificationOutbox.query.count() == 2 and Notification.query.count() == 0
+        queued_at = {row.created_at for row in NotificationOutbox.query}
+
+    result = app.test_cli_runner().invoke(args=["notifications", "deliver"])
+    assert "Delivered 2 notification(s)" in result.output
+    with app.app_context():
+        assert NotificationOutbox.query.count() == 0
+        assert {n.created_at for n in Notification.query} == queued_at
+        assert unread_count(admin.id) == 2
+
+
+def test_background_queue_drains_within_its_timeout(app):
+    import threading
+    from app.utils.background import BackgroundQueue
+
+    handled, release = [], threading.Event()
+    worker = BackgroundQueue("test-queue", lambda batch: release.wait(5) and handled.extend(batch))
+    worker.start(app)
+    worker.put("item")
+    assert worker.drain(0.05) is False
+    release.set()
+    assert worker.drain(5) is True and handled == ["item"]
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+from database import db
+from app.models.catalogue import Product
+from app.models.category import Category
+from app.models.image import Image
+from app.models.user import User
+
+
+@pytest.fixture
+def products(app, admin_token):
+    """Five products with two images each."""
+    with app.app_context():
+        owner = User.query.filter_by(email="admin@test.com").first()
+        category = Category(name="Supplements", user_id=owner.id)
+        db.session.add(category)
+        db.session.flush()
+        for i in range(5):
+            product = Product(name=f"Vitamin {i}", price=10.0, user_id=owner.id, category_id=category.id)
+            db.session.add(product)
+            db.session.flush()
+            for side in ("front", "back"):
+                db.session.add(Image(name=side, url=f"https://img.test/{i}/{side}.jpg", user_id=owner.id,
+                                     product_id=product.id))
+        db.session.commit()
+    return {"Authorization": f"Bearer {admin_token}"}
+
+
+def _selects(app, client, url, headers):
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_get_products_loads_images_in_one_query(client, app, products):
+    response, statements = _selects(app, client, "/products/", products)
+    assert response.status_code == 200
+    listed = response.json["products"]
+    assert len(listed) == 5
+    assert all(len(p["images"]) == 2 for p in listed)
+    assert len([s for s in statements if "FROM images" in s]) == 1
+    assert len([s for s in statements if "FROM products" in s]) == 1
+
+
+def test_get_products_is_unpaged_unless_asked(client, products):
+    unpaged = client.get("/products/", headers=products).json
+    assert set(unpaged) == {"products"}
+
+    paged = client.get("/products/?per_page=2&page=3", headers=products).json
+    assert (paged["page"], paged["per_page"], paged["total"], paged["pages"]) == (3, 2, 5, 3)
+    assert [p["name"] for p in paged["products"]] == ["Vitamin 4"]
@@ -0,0 +1,189 @@
+import pytest
+from database import db
+from app.models.user import User
+from app.models.category import Category
+from app.models.catalogue import Product
+
+
+@pytest.fixture
+def api_headers(app):
+    return {"X-API-Key": app.config["PUBLIC_API_KEY"]}
+
+
+@pytest.fixture
+def catalogue(app):
+    with app.app_context():
+        owner = User(username="owner", email="owner@test.com", role="admin")
+        owner.set_password("owner123")
+        db.session.add(owner)
+        db.session.flush()
+        category = Category(name="Supplements", user_id=owner.id)
+        db.session.add(category)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(Product(name=f"Vitamin {i}", price=10.0 + i, user_id=owner.id, category_id=category.id))
+        db.session.commit()
+        return {"owner_id": owner.id, "category_id": category.id}
+
+
+def test_public_products_sets_validators(client, api_headers, catalogue):
+    response = client.get("/public/products", headers=api_headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+
+def test_public_products_not_modified(client, api_headers, catalogue):
+    etag = client.get("/public/products", headers=api_headers).headers["ETag"]
+
+    response = client.get("/public/products", headers={**api_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_public_products_etag_changes_on_write(client, app, api_headers, catalogue):
+    etag = client.get("/public/products", headers=api_headers).headers["ETag"]
+
+    with app.app_context():
+        product = Product.query.first()
+        product.price = 99.0
+        db.session.commit()
+
+    response = client.get("/public/products", headers={**api_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_public_requires_api_key(client, catalogue):
+    response = client.get("/public/categories")
+    assert response.status_code == 401
+
+
+class FakeSharedCache:
+    """Local stand-in for a Redis client (get/set/delete/incr)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+@pytest.fixture(params=["memory", "shared"])
+def response_cache(app, request):
+    from app.utils.cache import response_cache
+    response_cache.init_app(app, client=FakeSharedCache() if request.param == "shared" else None)
+    yield response_cache
+    response_cache.init_app(app)
+
+
+def _count_product_queries(app, client, url, headers):
+    from sqlalchemy import event
+
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM products" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, len(statements)
+
+
+def test_public_products_served_from_cache(client, app, api_headers, catalogue, response_cache):
+    first, queries = _count_product_queries(app, client, "/public/products?q=VITAMIN", api_headers)
+    assert first.status_code == 200
+    assert queries > 0
+
+    # Same normalized parameters: no product query at all
+    second, queries = _count_product_queries(app, client, "/public/products?q=vitamin&sort=bogus", api_headers)
+    assert queries == 0
+    assert second.json == first.json
+
+
+def test_public_products_cache_invalidated_by_write(client, app, api_headers, catalogue, response_cache):
+    client.get("/public/products", headers=api_headers)
+
+    with app.app_context():
+        db.session.add(Product(name="Vitamin X", price=5.0, user_id=catalogue["owner_id"],
+                               category_id=catalogue["category_id"]))
+        db.session.commit()
+
+    response, queries = _count_product_queries(app, client, "/public/products", api_headers)
+    assert queries > 0
+    assert response.json["total"] == 4
+
+
+def test_public_products_count_none(client, api_headers, catalogue):
+    response = client.get("/public/products?per_page=2&count=none", headers=api_headers)
+    assert response.status_code == 200
+    assert response.json["total"] is None
+    assert response.json["has_next"] is True
+    assert len(response.json["products"]) == 2
+
+    last = client.get("/public/products?per_page=2&page=2&count=none", headers=api_headers)
+    assert last.json["has_next"] is False
+
+
+def test_public_products_count_estimate(client, api_headers, catalogue):
+    response = client.get("/public/products?per_page=2&count=estimate", headers=api_headers)
+    assert response.status_code == 200
+    assert response.json["total"] >= 3
+    assert response.json["has_next"] is True
+
+
+@pytest.mark.parametrize("query", ["per_page=0", "per_page=-5", "page=0&per_page=2", "page=-3&per_page=2"])
+def test_public_products_clamps_paging_params(client, api_headers, catalogue, query):
+    response = client.get(f"/public/products?{query}", headers=api_headers)
+    assert response.status_code == 200
+    assert response.json["page"] == 1
+    assert response.json["per_page"] >= 1
+    assert response.json["pages"] >= 1
+
+
+@pytest.fixture
+def vitamins(app, catalogue):
+    with app.app_context():
+        for name in ("Multivitamin Plus", "Vitamin Complex", "Vitamins", "Vitamin", "Vitamin Complex", "Zinc"):
+            db.session.add(Product(name=name, price=1.0, user_id=catalogue["owner_id"],
+                                   category_id=catalogue["category_id"]))
+        db.session.commit()
+
+
+def test_public_products_search_ranks_best_matches_first(client, api_headers, vitamins):
+    response = client.get("/public/products?q=vitamin&sort=relevance&per_page=100", headers=api_headers)
+    assert response.status_code == 200
+    names = [p["name"] for p in response.json["products"]]
+    assert "Zinc" not in names
+    assert names[:2] == ["Vitamin", "Vitamins"]
+    assert names[-1] == "Multivitamin Plus"
+
+
+def test_public_product_suggestions_are_distinct_prefixes_shortest_first(client, api_headers, vitamins):
+    response = client.get("/public/products/suggest?q=VITAMIN", headers=api_headers)
+    assert response.status_code == 200
+    suggestions = response.json["suggestions"]
+    assert suggestions[:2] == ["Vitamin", "Vitamins"]
+    assert suggestions.count("Vitamin Complex") == 1
+    assert "Multivitamin Plus" not in suggestions
+    assert [len(s) for s in suggestions] == sorted(len(s) for s in suggestions)
+
+    assert client.get("/public/products/suggest?q=vitamin&limit=1", headers=api_headers).json["suggestions"] == ["Vitamin"]
+    assert client.get("/public/products/suggest?q=", headers=api_headers).json["suggestions"] == []
@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from database import db
+from app.models.report import Report
+from app.models.user import User
+from app.models.visit import Visit
+
+
+@pytest.fixture
+def reports(app, admin_token):
+    """Seven reports on separate visits, one per day from 2025-05-01 at 15:00."""
+    with app.app_context():
+        admin = User.query.filter_by(email="admin@test.com").first()
+        for i in range(7):
+            visit = Visit(user_id=admin.id, doctor_name=f"Dr {i}", location="Nairobi",
+                          visit_date=datetime(2025, 5, 1 + i, 9, 0, 0))
+            db.session.add(visit)
+            db.session.flush()
+            db.session.add(Report(visit_id=visit.id, user_id=admin.id, title=f"Report {i}", report_text="...",
+                                  created_at=datetime(2025, 5, 1 + i, 15, 0, 0)))
+        db.session.commit()
+    return {"Authorization": f"Bearer {admin_token}"}
+
+
+def _count_selects(app, client, url, headers):
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_reports_include_visit_fields_in_one_query(client, app, reports):
+    response, statements = _count_selects(app, client, "/report/?limit=100", reports)
+    assert response.status_code == 200
+    listed = response.json["reports"]
+    assert len(listed) == 7
+    assert listed[0]["title"] == "Report 6" and listed[0]["visit"]["doctor_name"] == "Dr 6"
+    # The caller's user row, then one joined SELECT for the page
+    assert len([s for s in statements if "FROM reports" in s]) == 1
+    assert len(statements) <= 2, statements
+
+
+def test_reports_cursor_walks_every_report_once(client, reports):
+    seen, cursor = [], None
+    while True:
+        url = "/report/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=reports)
+        assert response.status_code == 200
+        seen.extend(r["title"] for r in response.json["reports"])
+        cursor = response.json["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"Report {i}" for i in range(6, -1, -1)]
+
+    assert client.get("/report/?cursor=bogus", headers=reports).status_code == 400
+
+
+def test_reports_unpaged_unless_asked(client, reports, monkeypatch):
+    monkeypatch.setattr("app.routes.reports.limit_param", lambda: 2)
+    response = client.get("/report/", headers=reports)
+    assert len(response.json["reports"]) == 7 and response.json["next_cursor"] is None
+    assert len(client.get("/report/?limit=2", headers=reports).json["reports"]) == 2
+
+
+def test_reports_date_filters_include_the_end_date(client, reports):
+    response = client.get("/report/?start_date=2025-05-02&end_date=2025-05-04", headers=reports)
+    assert response.status_code == 200
+    assert [r["title"] for r in response.json["reports"]] == ["Report 3", "Report 2", "Report 1"]
+
+    assert client.get("/report/?end_date=05/04/2025", headers=reports).status_code == 400
+
+
+@pytest.fixture
+def small_export_batches(monkeypatch):
+    from app.routes import reports as report_routes
+    # Seven visits span several fetch batches and several response chunks
+    monkeypatch.setattr(report_routes, "EXPORT_FETCH_SIZE", 2)
+    monkeypatch.setattr(report_routes, "EXPORT_CHUNK_ROWS", 3)
+
+
+def test_export_visits_csv_streams_every_row(client, reports, small_export_batches):
+    import csv
+    import io
+
+    response = client.get("/report/all-visits?format=csv", headers=reports, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"].startswith("attachment; filename=visits-")
+    chunks = [chunk.decode("utf-8") for chunk in response.response]
+    assert len(chunks) == 3  # header + 3 rows, 3 rows, 1 row
+
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert [r["doctor_name"] for r in rows] == [f"Dr {i}" for i in range(7)]
+    assert rows[0]["visit_date"] == "2025-05-01T09:00:00"
+    assert rows[0]["notes"] == "No notes provided"
+
+
+def test_export_visits_ndjson_streams_every_row(client, reports, small_export_batches):
+    import json
+
+    response = client.get("/report/all-visits?format=ndjson", headers=reports, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    body = b"".join(response.response).decode("utf-8")
+    assert body.endswith("\n")
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+    assert [r["doctor_name"] for r in rows] == [f"Dr {i}" for i in range(7)]
+    assert set(rows[0]) == {"id", "user_id", "doctor_name", "location", "visit_date", "notes", "created_at",
+                            "updated_at"}
+
+    assert client.get("/report/all-visits?format=xml", headers=reports).status_code == 400
@@ -0,0 +1,40 @@
+import json
+import logging
+
+
+def test_server_timing_reports_request_queries(client, user_token):
+    response = client.get("/notification/unread-count", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=") and "queries" in timing and "app;dur=" in timing
+
+
+def test_request_over_query_budget_is_logged(client, app, user_token, caplog):
+    app.config.update(SQL_PROFILING_MAX_QUERIES=0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        client.get("/notification/unread-count", headers={"Authorization": f"Bearer {user_token}"})
+
+    records = [r for r in caplog.records if r.name == "app.sql"]
+    assert len(records) == 1
+    summary = json.loads(records[0].getMessage())
+    assert summary == records[0].sql_profile
+    assert summary["endpoint"] == "notification.get_unread_count" and summary["queries"] >= 1
+    assert "too_many_queries" in summary["flags"]
+    assert summary["slowest"] and summary["slowest"][0]["sql"].startswith("SELECT")
+
+
+def test_profiling_can_be_disabled(client, app, user_token):
+    app.config.update(SQL_PROFILING=False)
+    response = client.get("/notification/unread-count", headers={"Authorization": f"Bearer {user_token}"})
+    assert "Server-Timing" not in response.headers
+
+
+def test_server_timing_is_off_in_production_but_still_logged(client, app, user_token, caplog):
+    from config import ProductionConfig
+    assert ProductionConfig.SQL_PROFILING_SERVER_TIMING is False
+
+    app.config.update(SQL_PROFILING_SERVER_TIMING=False, SQL_PROFILING_MAX_QUERIES=0)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        response = client.get("/notification/unread-count", headers={"Authorization": f"Bearer {user_token}"})
+    assert "Server-Timing" not in response.headers
+    assert [r for r in caplog.records if r.name == "app.sql"]
@@ -126,3 +126,52 @@ def test_delete_group(client, token, app):
     assert response.status_code == 200
     json_data = response.get_json()
     assert json_data["message"] == "Group deleted successfully"
+
+# Membership changes are set-based and report counts
+def test_membership_changes_report_counts(client, app, admin_user, users):
+    from app.utils.current_user import token_claims
+    with app.app_context():
+        admin = db.session.get(User, admin_user)
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id), additional_claims=token_claims(admin))}"}
+        group = UserGroup(name="Counted Group")
+        db.session.add(group)
+        db.session.commit()
+        group_id = group.id
+
+    response = client.post(f"/usergroups/{group_id}/assign", json={"user_ids": users + [users[0], 999999]}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["added"] == 2
+    # Assigning again is a no-op rather than a duplicate-key error
+    response = client.post(f"/usergroups/{group_id}/assign", json={"user_ids": users}, headers=headers)
+    assert response.get_json()["added"] == 0
+
+    response = client.post(f"/usergroups/{group_id}/remove", json={"user_ids": [users[0]]}, headers=headers)
+    assert response.get_json()["removed"] == 1
+    with app.app_context():
+        assert [u.id for u in db.session.get(UserGroup, group_id).users] == [users[1]]
+
+    response = client.post(f"/usergroups/{group_id}/assign", json={"user_ids": [999999]}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_membership_changes_keep_tokens_valid(client, app, admin_user, users):
+    from app.utils.current_user import token_claims
+    with app.app_context():
+        admin = db.session.get(User, admin_user)
+        admin_headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id), additional_claims=token_claims(admin))}"}
+        member = db.session.get(User, users[0])
+        member_headers = {"Authorization": f"Bearer {create_access_token(identity=str(member.id), additional_claims=token_claims(member))}"}
+        version = member.token_version
+        group = UserGroup(name="Claims Group")
+        db.session.add(group)
+        db.session.commit()
+        group_id = group.id
+
+    # Membership is not an authorization input, so nobody is logged out
+    assert client.post(f"/usergroups/{group_id}/assign", json={"user_ids": [users[0]]}, headers=admin_headers).status_code == 200
+    assert client.get("/auth/protected", headers=member_headers).status_code == 200
+    assert client.post(f"/usergroups/{group_id}/remove", json={"user_ids": [users[0]]}, headers=admin_headers).status_code == 200
+    assert client.delete(f"/usergroups/{group_id}", headers=admin_headers).status_code == 200
+    assert client.get("/auth/protected", headers=member_headers).status_code == 200
+    with app.app_context():
+        assert db.session.get(User, users[0]).token_version == version
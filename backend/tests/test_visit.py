@@ -128,3 +128,249 @@ def test_get_visits_unauthorized(client, token, expected_status, expected_error,
 
     assert response.status_code == expected_status
     assert expected_error in response.json["error"]
+
+
+@pytest.fixture
+def admin_headers(app):
+    """
+    Creates an admin and returns Authorization headers for them.
+    """
+    with app.app_context():
+        admin = User(username="visitadmin", email="visitadmin@test.com", role="admin",
+                     first_name="Ada", last_name="Admin")
+        admin.set_password("admin123")
+        db.session.add(admin)
+        db.session.commit()
+
+        from flask_jwt_extended import create_access_token
+        return {"Authorization": f"Bearer {create_access_token(identity=str(admin.id))}"}
+
+
+@pytest.fixture
+def seeded_visits(app, admin_headers):
+    """
+    Logs seven visits for the admin, several sharing the same visit_date.
+    """
+    with app.app_context():
+        admin = User.query.filter_by(username="visitadmin").first()
+        for i in range(7):
+            db.session.add(Visit(
+                user_id=admin.id,
+                doctor_name=f"Dr {i}",
+                location="Nairobi",
+                visit_date=datetime(2025, 1, 1 + i % 3, 9, 0, 0),
+            ))
+        db.session.commit()
+
+
+def test_get_visits_cursor_pagination(client, admin_headers, seeded_visits):
+    """
+    Walking next_cursor returns every visit exactly once, newest first.
+    """
+    seen, cursor = [], None
+    while True:
+        url = "/visit/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=admin_headers)
+        assert response.status_code == 200
+        page = response.json["visits"]
+        assert len(page) <= 3
+        seen.extend(page)
+        cursor = response.json["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 7
+    assert len({v["id"] for v in seen}) == 7
+    keys = [(v["visit_date"], v["id"]) for v in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_get_visits_unpaged_unless_asked(client, admin_headers, seeded_visits, monkeypatch):
+    """
+    Without limit or cursor the whole list comes back, as the dashboard expects.
+    """
+    monkeypatch.setattr("app.routes.visits.limit_param", lambda: 2)
+    response = client.get("/visit/", headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.json["visits"]) == 7 and response.json["next_cursor"] is None
+    assert len(client.get("/visit/?limit=2", headers=admin_headers).json["visits"]) == 2
+
+
+def test_get_visits_invalid_cursor(client, admin_headers):
+    response = client.get("/visit/?cursor=not-a-cursor", headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_get_visits_query_count_is_constant(client, app, admin_headers):
+    """
+    Listing visits from many different marketers must not lazy-load each
+    marketer: one SELECT for the caller, one joined SELECT for the page.
+    """
+    from sqlalchemy import event
+
+    with app.app_context():
+        for i in range(10):
+            marketer = User(username=f"marketer{i}", email=f"marketer{i}@test.com", role="user",
+                            first_name="Field", last_name=f"Rep{i}")
+            marketer.set_password("marketer123")
+            db.session.add(marketer)
+            db.session.flush()
+            db.session.add(Visit(user_id=marketer.id, doctor_name="Dr Who", location="Mombasa",
+                                 visit_date=datetime(2025, 2, 1, 10, 0, i)))
+        db.session.commit()
+        engine = db.engine
+
+    statements = []
+
+    def count_select(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_select)
+    try:
+        response = client.get("/visit/?limit=100", headers=admin_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_select)
+
+    assert response.status_code == 200
+    assert len(response.json["visits"]) == 10
+    assert {v["user_name"] for v in response.json["visits"]} == {f"Field Rep{i}" for i in range(10)}
+    assert len(statements) == 2, statements
+
+
+def test_log_visit_notifications_single_insert(client, app, admin_headers):
+    """
+    Logging a visit notifies the caller and every admin with one INSERT and no
+    write to their users rows.
+    """
+    from sqlalchemy import event
+    from app.models.notification import Notification
+
+    app.config["NOTIFICATION_DISPATCH_MODE"] = "sync"
+    with app.app_context():
+        for i in range(3):
+            extra = User(username=f"extraadmin{i}", email=f"extraadmin{i}@test.com", role="admin")
+            extra.set_password("admin123")
+            db.session.add(extra)
+        db.session.commit()
+        engine = db.engine
+
+    inserts, user_updates = [], []
+
+    def count_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO NOTIFICATIONS"):
+            inserts.append(statement)
+        if statement.lstrip().upper().startswith("UPDATE USERS"):
+            user_updates.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_insert)
+    try:
+        response = client.post(
+            "/visit/",
+            json={"doctor_name": "Dr Who", "location": "Kisumu", "visit_date": "2025-03-01 09:30:00"},
+            headers=admin_headers,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count_insert)
+
+    assert response.status_code == 201
+    assert len(inserts) == 1
+    # Recipients' users rows are not locked by the fan-out
+    assert user_updates == []
+    with app.app_context():
+        # The caller (an admin) gets their own copy plus one per admin.
+        assert Notification.query.count() == 5
+
+
+def test_bulk_log_visits_is_idempotent(client, app, admin_headers):
+    """
+    Bulk upload reports per-item status and skips replayed client_refs.
+    """
+    visits = [
+        {"doctor_name": "Dr A", "location": "Nairobi", "visit_date": "2025-03-01 09:30:00", "client_ref": "dev-1"},
+        {"doctor_name": "Dr B", "location": "Nairobi", "visit_date": "not-a-date", "client_ref": "dev-2"},
+        {"doctor_name": "Dr C", "location": "Mombasa", "visit_date": "2025-03-02 10:00:00", "client_ref": "dev-3"},
+    ]
+    response = client.post("/visit/bulk", json=visits, headers=admin_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data["created"], data["duplicates"], data["invalid"]) == (2, 0, 1)
+    assert [r["status"] for r in data["results"]] == ["created", "invalid", "created"]
+
+    replay = client.post("/visit/bulk", json={"visits": visits}, headers=admin_headers).get_json()
+    assert replay["created"] == 0
+    assert replay["duplicates"] == 2
+    assert replay["results"][0]["id"] == data["results"][0]["id"]
+    with app.app_context():
+        assert Visit.query.count() == 2
+
+
+def test_doctor_suggestions(client, app, admin_headers, user_token):
+    """
+    Distinct doctor names by prefix, shortest first; non-admins only see their own visits.
+    """
+    with app.app_context():
+        admin = User.query.filter_by(username="visitadmin").first()
+        user = User.query.filter_by(username="user").first()
+        for user_id, doctor in [(admin.id, "Dr Amina Otieno"), (admin.id, "Dr Amani"), (admin.id, "Dr Amani"),
+                                (admin.id, "Dr Bob"), (user.id, "Dr Ann")]:
+            db.session.add(Visit(user_id=user_id, doctor_name=doctor, location="Nairobi",
+                                 visit_date=datetime(2025, 4, 1, 9, 0, 0)))
+        db.session.commit()
+        from flask_jwt_extended import create_access_token
+        from app.utils.current_user import token_claims
+        user_headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id), additional_claims=token_claims(user))}"}
+
+    response = client.get("/visit/doctors/suggest?q=dr a", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json["suggestions"] == ["Dr Ann", "Dr Amani", "Dr Amina Otieno"]
+
+    own = client.get("/visit/doctors/suggest?q=DR", headers=user_headers)
+    assert own.json["suggestions"] == ["Dr Ann"]
+
+
+def test_bulk_log_visits_ndjson(client, app, admin_headers):
+    """
+    NDJSON bodies are read line by line; bad lines and oversized fields are
+    reported per item, and a body over VISIT_BULK_MAX_ITEMS is rejected.
+    """
+    lines = [
+        json.dumps({"doctor_name": "Dr A", "location": "Nairobi", "visit_date": "2025-03-01 09:30:00", "client_ref": "nd-1"}),
+        "{not json",
+        json.dumps({"doctor_name": "D" * 101, "location": "Nairobi", "visit_date": "2025-03-01 09:30:00"}),
+        json.dumps({"doctor_name": "Dr C", "location": ["Mombasa"], "visit_date": "2025-03-01 09:30:00"}),
+        "",
+        json.dumps({"doctor_name": "Dr D", "location": "Kisumu", "visit_date": "2025-03-02 10:00:00", "notes": None}),
+    ]
+    response = client.post("/visit/bulk", data="\n".join(lines) + "\n",
+                           content_type="application/x-ndjson", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r["status"] for r in data["results"]] == ["created", "invalid", "invalid", "invalid", "created"]
+    assert "at most 100" in data["results"][2]["error"]
+    assert "must be a string" in data["results"][3]["error"]
+
+    app.config["VISIT_BULK_MAX_ITEMS"] = 2
+    too_many = client.post("/visit/bulk", data="\n".join(lines), content_type="application/x-ndjson",
+                           headers=admin_headers)
+    assert too_many.status_code == 413
+    with app.app_context():
+        assert Visit.query.count() == 2
+
+
+def test_bulk_log_visits_conflict_gives_up_with_409(client, app, admin_headers, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+    from app.routes import visits
+
+    attempts = []
+
+    def always_conflicts(user, pending):
+        attempts.append(1)
+        raise IntegrityError("INSERT", {}, Exception("uq_visits_user_id_client_ref"))
+
+    monkeypatch.setattr(visits, "_insert_bulk_visits", always_conflicts)
+    response = client.post("/visit/bulk", headers=admin_headers, json=[
+        {"doctor_name": "Dr A", "location": "Nairobi", "visit_date": "2025-03-01 09:30:00", "client_ref": "c-1"},
+    ])
+    assert response.status_code == 409
+    assert len(attempts) == visits._BULK_INSERT_ATTEMPTS
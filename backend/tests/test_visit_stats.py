@@ -0,0 +1,106 @@
+import pytest
+from database import db
+from app.models.visit import Visit
+from app.models.visit_rollup import VisitRollup
+
+
+@pytest.fixture
+def admin_headers(app, admin_token):
+    app.config["NOTIFICATION_DISPATCH_MODE"] = "sync"
+    return {"Authorization": f"Bearer {admin_token}"}
+
+
+def _log(client, headers, doctor, location, when):
+    response = client.post("/visit/", json={"doctor_name": doctor, "location": location, "visit_date": when},
+                           headers=headers)
+    assert response.status_code == 201
+
+
+def _stats(client, headers, **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    response = client.get(f"/report/stats?{query}", headers=headers)
+    assert response.status_code == 200
+    return response.json["stats"]
+
+
+def _rollups(app):
+    with app.app_context():
+        return {
+            (r.period, r.period_start.isoformat(), r.dimension, r.dimension_key): r.visit_count
+            for r in VisitRollup.query.filter(VisitRollup.visit_count != 0)
+        }
+
+
+def test_rollups_follow_visit_create_update_and_delete(client, app, admin_headers):
+    _log(client, admin_headers, "Dr Who", "Nairobi", "2025-03-03 09:00:00")
+    _log(client, admin_headers, "Dr Who", "Mombasa", "2025-03-04 09:00:00")
+    assert _stats(client, admin_headers, dimension="doctor") == [{"key": "Dr Who", "count": 2}]
+
+    with app.app_context():
+        first, second = [v.id for v in Visit.query.order_by(Visit.id)]
+    response = client.put(f"/visit/{second}", json={"doctor_name": "Dr No", "visit_date": "2025-04-01 09:00:00"},
+                          headers=admin_headers)
+    assert response.status_code == 200
+    doctors = _stats(client, admin_headers, dimension="doctor")
+    assert sorted((s["key"], s["count"]) for s in doctors) == [("Dr No", 1), ("Dr Who", 1)]
+    assert _stats(client, admin_headers, dimension="total", period="month") == [
+        {"period_start": "2025-03-01", "key": "", "count": 1},
+        {"period_start": "2025-04-01", "key": "", "count": 1},
+    ]
+
+    assert client.delete(f"/visit/{first}", headers=admin_headers).status_code == 200
+    assert _stats(client, admin_headers, dimension="location") == [{"key": "Mombasa", "count": 1}]
+    assert _stats(client, admin_headers, dimension="doctor", start_date="2025-03-01", end_date="2025-03-31") == []
+
+
+def test_stats_bucket_by_period(client, app, admin_headers):
+    # Monday, Sunday of the same week, the next Monday, and the next month
+    for when in ("2025-03-03 09:00:00", "2025-03-09 18:00:00", "2025-03-10 08:00:00", "2025-04-01 12:00:00"):
+        _log(client, admin_headers, "Dr Who", "Nairobi", when)
+
+    week = _stats(client, admin_headers, dimension="total", period="week")
+    assert [(s["period_start"], s["count"]) for s in week] == [("2025-03-03", 2), ("2025-03-10", 1), ("2025-03-31", 1)]
+    day = _stats(client, admin_headers, dimension="total", period="day", start_date="2025-03-09", end_date="2025-03-10")
+    assert [(s["period_start"], s["count"]) for s in day] == [("2025-03-09", 1), ("2025-03-10", 1)]
+    users = _stats(client, admin_headers, dimension="user")
+    assert users[0]["count"] == 4 and users[0]["label"] == "admin"
+
+    assert client.get("/report/stats?period=year", headers=admin_headers).status_code == 400
+
+
+def test_rebuild_command_recomputes_rollups(client, app, admin_headers):
+    _log(client, admin_headers, "Dr Who", "Nairobi", "2025-03-03 09:00:00")
+    _log(client, admin_headers, "Dr No", "Nairobi", "2025-03-05 09:00:00")
+    expected = _rollups(app)
+
+    with app.app_context():
+        VisitRollup.query.filter_by(dimension="doctor").delete()
+        VisitRollup.query.filter_by(dimension="user").update({VisitRollup.visit_count: 99})
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["visit-stats", "rebuild", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    assert "from 2 visits" in result.output
+    assert _rollups(app) == expected
+
+
+def test_rollup_upsert_locks_buckets_in_key_order(app, monkeypatch):
+    """
+    Deltas go out sorted by bucket key, so two transactions touching the same
+    buckets lock them in the same order; no bucket is shared by every visit.
+    """
+    from datetime import datetime
+    from app.utils import visit_stats
+
+    batches = []
+    monkeypatch.setattr(visit_stats.db.session, "execute", lambda stmt, *a, **k: batches.append(stmt))
+    with app.app_context():
+        visit_stats.record_visit_changes(
+            added=[(2, "Dr B", "Zanzibar", datetime(2025, 3, 3)), (1, "Dr A", "Arusha", datetime(2025, 3, 3))],
+            removed=[(1, "Dr Z", "Arusha", datetime(2025, 2, 28))],
+        )
+    params = batches[0].compile().params
+    keys = [(params[f"period_m{i}"], params[f"period_start_m{i}"], params[f"dimension_m{i}"], params[f"dimension_key_m{i}"])
+            for i in range(len([k for k in params if k.startswith("period_m")]))]
+    assert keys == sorted(keys)
+    assert all(dimension != "total" for _, _, dimension, _ in keys)